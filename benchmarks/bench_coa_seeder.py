@@ -0,0 +1,244 @@
+"""
+قياس أداء إنشاء شجرة الحسابات على قاعدة SQLite محلية بديلة
+
+يستبدل .database.db و ChartOfAccounts و Currency بنماذج SQLAlchemy على SQLite
+(في الذاكرة أو على القرص) ثم يقيس لكل مجموعة تخصص ولكل طريقة إنشاء:
+الزمن الكلي، عدد الاستعلامات، الصفوف في الثانية، وأقصى استهلاك للذاكرة،
+مع التدرج في عدد المشاريع (1 إلى 10,000)
+
+الاستخدام:
+    python benchmarks/bench_coa_seeder.py
+    python benchmarks/bench_coa_seeder.py --projects 1,10,100,1000,10000 --backends memory,disk
+    python benchmarks/bench_coa_seeder.py --modes per_row,bulk --groups get_energy_extensions --json out.json
+    python benchmarks/bench_coa_seeder.py --memory
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+import sqlalchemy as sa
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = 'coa_bench'
+
+MODES = ('per_row', 'bulk', 'upsert', 'server_side', 'seed_many', 'parallel', 'create_custom_coa')
+
+
+# ==================== بديل .database.db ====================
+
+class StandInDB:
+    """بديل بسيط لكائن Flask-SQLAlchemy (session و engine و Model و أنواع الأعمدة)"""
+    Column = sa.Column
+    Integer = sa.Integer
+    String = sa.String
+    Boolean = sa.Boolean
+    DateTime = sa.DateTime
+    Numeric = sa.Numeric
+    ForeignKey = sa.ForeignKey
+
+    def __init__(self):
+        self.Model = declarative_base()
+        self.session = scoped_session(sessionmaker())
+        self.Model.query = self.session.query_property()
+        self.engine = None
+
+    def bind(self, engine):
+        """ربط الجلسة بقاعدة جديدة وإنشاء الجداول"""
+        self.session.remove()
+        self.session.configure(bind=engine)
+        self.engine = engine
+        self.Model.metadata.create_all(engine)
+
+
+def load_seeder():
+    """تحميل coa_seeder.py كحزمة وهمية تشير وحداتها الداخلية إلى البدائل"""
+    db = StandInDB()
+
+    class ChartOfAccounts(db.Model):
+        __tablename__ = 'chart_of_accounts'
+        __table_args__ = (sa.Index('ix_coa_project_full_code', 'project_id', 'full_code'),)
+
+        id = sa.Column(sa.Integer, primary_key=True)
+        project_id = sa.Column(sa.Integer, nullable=False)
+        name = sa.Column(sa.String(255))
+        name_ar = sa.Column(sa.String(255))
+        name_en = sa.Column(sa.String(255))
+        type = sa.Column(sa.String(50))
+        code = sa.Column(sa.String(50))
+        full_code = sa.Column(sa.String(255))
+        level = sa.Column(sa.Integer)
+        parent_account_id = sa.Column(sa.Integer, sa.ForeignKey('chart_of_accounts.id'))
+        is_group = sa.Column(sa.Boolean)
+        currency_id = sa.Column(sa.Integer)
+        is_active = sa.Column(sa.Boolean)
+        normal_balance = sa.Column(sa.String(10))
+        created_by = sa.Column(sa.Integer)
+
+    class Currency(db.Model):
+        __tablename__ = 'currency'
+
+        id = sa.Column(sa.Integer, primary_key=True)
+        code = sa.Column(sa.String(3))
+
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE] = package
+    for name, attributes in (('database', {'db': db}),
+                             ('db_coa', {'ChartOfAccounts': ChartOfAccounts}),
+                             ('db_currency', {'Currency': Currency})):
+        module = types.ModuleType(f'{PACKAGE}.{name}')
+        module.__dict__.update(attributes)
+        sys.modules[module.__name__] = module
+
+    for name in ('db_coa_template', 'db_coa_project_template', 'db_coa_account_closure',
+                 'db_coa_account_balance', 'db_coa_project_default_account', 'coa_seeder'):
+        spec = importlib.util.spec_from_file_location(f'{PACKAGE}.{name}', ROOT / f'{name}.py')
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+
+    return db, ChartOfAccounts, Currency, sys.modules[f'{PACKAGE}.coa_seeder']
+
+
+# ==================== تشغيل القياس ====================
+
+def fresh_database(db, Currency, backend, workdir):
+    """قاعدة جديدة لكل قياس حتى لا تؤثر القياسات على بعضها"""
+    if backend == 'memory':
+        engine = sa.create_engine('sqlite://', poolclass=StaticPool,
+                                  connect_args={'check_same_thread': False})
+    else:
+        path = os.path.join(workdir, f'bench_{time.perf_counter_ns()}.db')
+        engine = sa.create_engine(f'sqlite:///{path}', connect_args={'timeout': 60})
+    db.bind(engine)
+    db.session.add(Currency(id=1, code='EGP'))
+    db.session.commit()
+    return engine
+
+
+def run_mode(seeder, mode, industry, projects):
+    """إنشاء شجرة الحسابات لـ projects مشروع بالطريقة المطلوبة"""
+    engine = seeder.SmartCOAEngine
+    jobs = [(project_id, industry, 1) for project_id in range(1, projects + 1)]
+    if mode == 'seed_many':
+        engine.seed_many(jobs, chunk_size=500)
+    elif mode == 'parallel':
+        result = engine.seed_parallel(jobs, max_workers=4)
+        if result['failed']:
+            raise RuntimeError(result['failed'][0][1])
+    elif mode == 'create_custom_coa':
+        for project_id, _, _ in jobs:
+            result = seeder.create_custom_coa(project_id, industry)
+            if not result['success']:
+                raise RuntimeError(result['message'])
+    else:
+        for project_id, _, _ in jobs:
+            engine.seed_chart_of_accounts(project_id, industry, 1, bulk=mode == 'bulk',
+                                          upsert=mode == 'upsert', server_side=mode == 'server_side')
+
+
+def benchmark(db, ChartOfAccounts, Currency, seeder, backend, group, industry, mode, projects, workdir,
+              trace_memory=False):
+    engine = seeder.SmartCOAEngine
+    database = fresh_database(db, Currency, backend, workdir)
+    engine.migrate_upsert_index(database)
+    engine.migrate_code_index(database)
+
+    collected = []
+    engine.add_metrics_hook(collected.append)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    error = None
+    try:
+        run_mode(seeder, mode, industry, projects)
+    except Exception as e:
+        error = str(e)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    engine.remove_metrics_hook(collected.append)
+
+    rows = db.session.query(ChartOfAccounts).count()
+    db.session.remove()
+    return {
+        'backend': backend,
+        'group': group,
+        'industry': industry,
+        'mode': mode,
+        'projects': projects,
+        'seconds': elapsed,
+        'rows': rows,
+        'rows_per_second': rows / elapsed if elapsed and rows else 0.0,
+        'queries': sum(metrics.queries for metrics in collected),
+        'peak_memory_kb': peak / 1024,
+        'error': error,
+    }
+
+
+def industry_groups(seeder, wanted):
+    """تخصص ممثل لكل مجموعة قوالب (والإطار الموحد وحده)"""
+    groups = {'STANDARD_FRAMEWORK': None}
+    for industry, extension_name in seeder.SmartCOAEngine.INDUSTRY_GROUPS.items():
+        groups.setdefault(extension_name, industry)
+    if wanted:
+        groups = {name: industry for name, industry in groups.items() if name in wanted}
+    return groups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='memory', help='memory,disk')
+    parser.add_argument('--projects', default='1,10,100', help='أعداد المشاريع، مثل 1,10,100,1000,10000')
+    parser.add_argument('--modes', default=','.join(MODES), help=','.join(MODES))
+    parser.add_argument('--groups', default='', help='أسماء دوال الإضافات (افتراضياً كل المجموعات)')
+    parser.add_argument('--memory', action='store_true',
+                        help='قياس أقصى استهلاك للذاكرة (tracemalloc يبطئ التنفيذ فلا تقارن الأزمنة معه)')
+    parser.add_argument('--json', help='حفظ النتائج في ملف JSON')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    db, ChartOfAccounts, Currency, seeder = load_seeder()
+    groups = industry_groups(seeder, [name for name in args.groups.split(',') if name])
+
+    results = []
+    header = f"{'backend':8} {'group':34} {'mode':18} {'projects':>8} {'seconds':>9} {'rows':>8} {'rows/s':>10} {'queries':>8} {'peak KB':>9}"
+    print(header)
+    print('-' * len(header))
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends.split(','):
+            for group, industry in groups.items():
+                for projects in (int(value) for value in args.projects.split(',')):
+                    for mode in args.modes.split(','):
+                        if mode == 'parallel' and backend == 'memory':
+                            continue
+                        result = benchmark(db, ChartOfAccounts, Currency, seeder, backend,
+                                           group, industry, mode, projects, workdir, args.memory)
+                        results.append(result)
+                        if result['error']:
+                            print(f"{backend:8} {group:34} {mode:18} {projects:>8} ❌ {result['error']}")
+                            continue
+                        print(f"{backend:8} {group:34} {mode:18} {projects:>8} {result['seconds']:>9.3f} "
+                              f"{result['rows']:>8} {result['rows_per_second']:>10.0f} "
+                              f"{result['queries']:>8} {result['peak_memory_kb']:>9.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
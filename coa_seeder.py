@@ -1,8 +1,598 @@
 from .database import db
 from .db_coa import ChartOfAccounts
 from .db_currency import Currency
-from typing import Dict, List, Optional, Tuple
+from .db_coa_template import CoaTemplate
+from .db_coa_project_template import CoaProjectTemplate
+from .db_coa_account_closure import CoaAccountClosure
+from .db_coa_account_balance import CoaAccountBalance
+from .db_coa_project_default_account import CoaProjectDefaultAccount
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import Index, MetaData, and_, bindparam, event, exists, func, inspect, literal, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import os
 import re
+import struct
+import sys
+import threading
+import time
+import weakref
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession
+except ImportError:  # SQLAlchemy بدون دعم asyncio (يُستخدم نقل الإنشاء إلى خيط فقط)
+    AsyncSession = None
+
+logger = logging.getLogger(__name__)
+
+# ملفات القوالب: ملف للإطار الموحد وملف لكل مجموعة تخصص (صف لكل حساب بترتيب "fields")
+TEMPLATES_DIR = Path(__file__).resolve().parent / 'coa_templates'
+
+
+class AccountTemplate(Mapping):
+    """
+    قالب حساب واحد بتمثيل مضغوط (__slots__) بدلاً من قاموس بسبعة مفاتيح
+    
+    يبقى قابلاً للقراءة كقاموس (account['code'], account.get('tag')) للتوافق مع الكود القديم
+    """
+    __slots__ = ('code', 'name_ar', 'name_en', 'type', 'is_group', 'parent_code', 'level', 'tag')
+
+    def __init__(self, code: str, name_ar: str, name_en: str, type: str, is_group: bool,
+                 parent_code: Optional[str], level: int, tag: Optional[str] = None):
+        set_field = object.__setattr__
+        set_field(self, 'code', sys.intern(code) if code else code)
+        set_field(self, 'name_ar', name_ar)
+        set_field(self, 'name_en', name_en)
+        set_field(self, 'type', sys.intern(type))
+        set_field(self, 'is_group', bool(is_group))
+        set_field(self, 'parent_code', sys.intern(parent_code) if parent_code else None)
+        set_field(self, 'level', level)
+        set_field(self, 'tag', sys.intern(tag) if tag else None)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'AccountTemplate':
+        """تحويل قاموس قالب (بالشكل القديم) إلى تمثيل مضغوط"""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            code=data.get('code'),
+            name_ar=data.get('name_ar'),
+            name_en=data.get('name_en'),
+            type=data['type'],
+            is_group=data.get('is_group', False),
+            parent_code=data.get('parent_code'),
+            level=data.get('level', 1),
+            tag=data.get('tag'),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AccountTemplate غير قابل للتعديل")
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if key == 'tag' and value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for key in self.__slots__:
+            if key != 'tag' or self.tag is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self.__slots__) - (self.tag is None)
+
+    def __repr__(self) -> str:
+        return f"AccountTemplate({dict(self)!r})"
+
+    def to_dict(self) -> Dict:
+        """نسخة قاموس قابلة للتعديل"""
+        return dict(self)
+
+
+class CompiledTemplate(Sequence):
+    """
+    شجرة مُجمّعة (الإطار الموحد + إضافات تخصص) بتمثيل عمودي:
+    صفوف AccountTemplate مع مصفوفات مسطحة للأكواد وفهرس الأب، وترتيب طوبولوجي
+    (الأب قبل الابن) مع المستوى و full_code المحسوبين من parent_code
+    """
+    __slots__ = ('extension_name', 'accounts', 'extensions', 'codes', 'parent_index',
+                 'index_by_code', 'order', 'levels', 'full_codes', 'orphan_codes', 'cyclic_codes',
+                 'fingerprint', 'version', 'company_size')
+
+    def __init__(self, extension_name: Optional[str], framework: Tuple[AccountTemplate, ...],
+                 extensions: Tuple[AccountTemplate, ...], version: Optional[str] = None,
+                 company_size: Optional[str] = None):
+        self.extension_name = extension_name
+        # ملف الحجم المطبق (None = القالب كما هو)
+        self.company_size = company_size
+        # رقم النسخة من ملفات القوالب (للعرض)، والبصمة هي المرجع لمعرفة تغيّر المحتوى
+        self.version = version
+        self.extensions = extensions
+        self.accounts = framework + extensions
+        self.codes = tuple(account.code for account in self.accounts)
+        
+        # أول ظهور لكل كود (التكرار يُكتشف في التحقق)
+        self.index_by_code: Dict[str, int] = {}
+        for index, code in enumerate(self.codes):
+            self.index_by_code.setdefault(code, index)
+        
+        # فهرس الأب لكل حساب (-1 للجذر أو الأب غير الموجود)
+        self.parent_index = array('i', (
+            self.index_by_code.get(account.parent_code, -1) if account.parent_code else -1
+            for account in self.accounts
+        ))
+        
+        self._build_order()
+        
+        # بصمة محتوى القالب (تتغير مع أي تعديل في أي حساب)
+        digest = hashlib.sha256()
+        for account in self.accounts:
+            digest.update(repr(tuple(getattr(account, field) for field in account.__slots__)).encode('utf-8'))
+            digest.update(b'\n')
+        self.fingerprint = digest.hexdigest()
+
+    def _build_order(self):
+        """ترتيب عرضي من الجذور (O(n)) يحسب المستوى و full_code ويكشف الأيتام والدورات"""
+        count = len(self.accounts)
+        children: List[List[int]] = [[] for _ in range(count)]
+        roots = []
+        self.orphan_codes: Tuple[str, ...] = tuple(
+            account.code for index, account in enumerate(self.accounts)
+            if account.parent_code and self.parent_index[index] < 0
+        )
+        for index, parent in enumerate(self.parent_index):
+            if parent >= 0:
+                children[parent].append(index)
+            elif not self.accounts[index].parent_code:
+                roots.append(index)
+        
+        levels = array('b', bytes(count))
+        full_codes: List[Optional[str]] = [None] * count
+        order = list(roots)
+        for index in roots:
+            levels[index] = 1
+            full_codes[index] = self.codes[index]
+        # الترتيب العرضي يضمن أن كل مستوى يأتي كاملاً قبل المستوى التالي
+        for index in order:
+            for child in children[index]:
+                levels[child] = levels[index] + 1
+                full_codes[child] = f"{full_codes[index]}.{self.codes[child]}"
+                order.append(child)
+        
+        self.order = tuple(order)
+        self.levels = levels
+        self.full_codes = tuple(full_codes)
+        
+        # الحسابات غير المرتبطة بجذر وليست تحت حساب يتيم تقع في دورة
+        reached = set(order)
+        cyclic = []
+        for index in range(count):
+            if index in reached:
+                continue
+            seen = set()
+            node = index
+            while node >= 0 and node not in seen:
+                seen.add(node)
+                node = self.parent_index[node]
+            if node >= 0:
+                cyclic.append(self.codes[index])
+        self.cyclic_codes: Tuple[str, ...] = tuple(cyclic)
+
+    @property
+    def template_id(self) -> str:
+        """معرف مجموعة القالب (اسم دالة الإضافات أو STANDARD_FRAMEWORK) مع الحجم إن وُجد"""
+        template_id = self.extension_name or 'STANDARD_FRAMEWORK'
+        return f"{template_id}:{self.company_size}" if self.company_size else template_id
+
+    def __getitem__(self, index):
+        return self.accounts[index]
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+
+class TemplateBundle:
+    """
+    حزمة ثنائية لكل القوالب المُجمّعة تُقرأ عبر mmap (للقراءة فقط)
+    
+    الملف نفسه تتشاركه كل العمليات على نفس الجهاز (صفحات الذاكرة من ذاكرة نظام الملفات)،
+    والأعمدة الرقمية (فهرس الأب، الترتيب، المستويات) تُقرأ مباشرة من الملف بدون نسخ.
+    الحسابات والنصوص تُفك عند أول استخدام لكل مجموعة فقط، ولا يُعاد الترتيب أو حساب البصمة أو التحقق
+    
+    التنسيق (little-endian):
+        رأس الملف، ثم دليل المجموعات، ثم بصمة SHA-256 لكل ملف قالب مصدر (لاكتشاف حزمة قديمة)،
+        ثم جدول النصوص (إزاحات + UTF-8)، ثم لكل مجموعة:
+        صفوف حسابات بعرض ثابت ثم أعمدة parent_index / order / full_codes (int32) و levels (int8)
+        ثم أكواد الأيتام والدورات
+    """
+    MAGIC = b'COAB'
+    VERSION = 3
+    HEADER = struct.Struct('<4sHHIII')
+    GROUP = struct.Struct('<ii11I32sB3x')
+    SOURCE = struct.Struct('<i32s')
+    ROW = struct.Struct('<iiiiiiBB2x')
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as bundle_file:
+            self._mmap = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, source_count, string_count, strings_offset, group_count = self.HEADER.unpack_from(self._view)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"ملف حزمة القوالب غير صالح: {self.path}")
+        
+        self._string_offsets = self._view[strings_offset:strings_offset + 4 * (string_count + 1)].cast('I')
+        self._strings_base = strings_offset + 4 * (string_count + 1)
+        self._strings: List[Optional[str]] = [None] * string_count
+        self._groups: Dict[Optional[str], Tuple] = {}
+        for position in range(group_count):
+            record = self.GROUP.unpack_from(self._view, self.HEADER.size + position * self.GROUP.size)
+            self._groups[self._string(record[0])] = record[1:]
+        # اسم ملف القالب المصدر -> بصمة محتواه وقت بناء الحزمة
+        sources_offset = self.HEADER.size + group_count * self.GROUP.size
+        self.sources: Dict[str, bytes] = {
+            self._string(name): digest
+            for name, digest in self.SOURCE.iter_unpack(
+                self._view[sources_offset:sources_offset + source_count * self.SOURCE.size])
+        }
+
+    def _string(self, string_id: int) -> Optional[str]:
+        if string_id < 0:
+            return None
+        value = self._strings[string_id]
+        if value is None:
+            start = self._strings_base + self._string_offsets[string_id]
+            end = self._strings_base + self._string_offsets[string_id + 1]
+            value = self._strings[string_id] = sys.intern(str(self._view[start:end], 'utf-8'))
+        return value
+
+    def _column(self, offset: int, count: int, format: str) -> memoryview:
+        size = count * (1 if format == 'b' else 4)
+        return self._view[offset:offset + size].cast(format)
+
+    @property
+    def extension_names(self) -> Tuple[Optional[str], ...]:
+        return tuple(self._groups)
+
+    def template(self, extension_name: Optional[str]) -> Optional[CompiledTemplate]:
+        """القالب المُجمّع لمجموعة من الحزمة (None إذا لم تكن في الحزمة)"""
+        record = self._groups.get(extension_name)
+        if record is None:
+            return None
+        (version, count, extension_start, rows_offset, parent_offset, order_offset, levels_offset,
+         full_codes_offset, orphans_offset, orphan_count, cyclic_offset, cyclic_count,
+         fingerprint, _) = record
+        
+        string = self._string
+        accounts = tuple(
+            AccountTemplate(string(code), string(name_ar), string(name_en), string(type), is_group,
+                            string(parent_code), level, string(tag))
+            for code, name_ar, name_en, type, parent_code, tag, level, is_group
+            in self.ROW.iter_unpack(self._view[rows_offset:rows_offset + count * self.ROW.size])
+        )
+        template = CompiledTemplate.__new__(CompiledTemplate)
+        template.extension_name = extension_name
+        template.accounts = accounts
+        template.extensions = accounts[extension_start:]
+        template.codes = tuple(account.code for account in accounts)
+        template.index_by_code = {}
+        for index, code in enumerate(template.codes):
+            template.index_by_code.setdefault(code, index)
+        template.parent_index = self._column(parent_offset, count, 'i')
+        template.order = self._column(order_offset, count, 'i')
+        template.levels = self._column(levels_offset, count, 'b')
+        template.full_codes = tuple(string(sid) for sid in self._column(full_codes_offset, count, 'i'))
+        template.orphan_codes = tuple(string(sid) for sid in self._column(orphans_offset, orphan_count, 'i'))
+        template.cyclic_codes = tuple(string(sid) for sid in self._column(cyclic_offset, cyclic_count, 'i'))
+        template.fingerprint = fingerprint.hex()
+        template.version = string(version)
+        template.company_size = None
+        return template
+
+    def is_validated(self, extension_name: Optional[str]) -> bool:
+        """هل اجتاز قالب المجموعة التحقق البنيوي وقت بناء الحزمة"""
+        record = self._groups.get(extension_name)
+        return bool(record and record[-1])
+
+    @classmethod
+    def write(cls, path: str, templates: List[Tuple[CompiledTemplate, bool]], sources: Dict[str, bytes]) -> int:
+        """
+        كتابة الحزمة (بشكل ذري) من قائمة (قالب مُجمّع، اجتاز التحقق) وإرجاع حجمها بالبايت
+        
+        sources: اسم ملف القالب المصدر -> بصمة SHA-256 لمحتواه
+        """
+        string_ids: Dict[str, int] = {}
+
+        def intern_string(value: Optional[str]) -> int:
+            if value is None:
+                return -1
+            return string_ids.setdefault(value, len(string_ids))
+
+        for template, _ in templates:
+            intern_string(template.extension_name)
+            intern_string(template.version)
+        source_records = b''.join(cls.SOURCE.pack(intern_string(name), digest) for name, digest in sources.items())
+        
+        sections = []
+        for template, validated in templates:
+            count = len(template)
+            rows = b''.join(
+                cls.ROW.pack(intern_string(account.code), intern_string(account.name_ar),
+                             intern_string(account.name_en), intern_string(account.type),
+                             intern_string(account.parent_code), intern_string(account.tag),
+                             account.level, account.is_group)
+                for account in template.accounts
+            )
+            columns = [
+                rows,
+                array('i', template.parent_index).tobytes(),
+                array('i', template.order).tobytes(),
+                array('b', template.levels).tobytes(),
+                array('i', (intern_string(code) for code in template.full_codes)).tobytes(),
+                array('i', (intern_string(code) for code in template.orphan_codes)).tobytes(),
+                array('i', (intern_string(code) for code in template.cyclic_codes)).tobytes(),
+            ]
+            sections.append((template, validated, count, columns))
+        
+        encoded = [value.encode('utf-8') for value in string_ids]
+        string_offsets = array('I', [0])
+        for value in encoded:
+            string_offsets.append(string_offsets[-1] + len(value))
+        strings = string_offsets.tobytes() + b''.join(encoded)
+        strings += bytes(-len(strings) % 4)
+        
+        strings_offset = cls.HEADER.size + cls.GROUP.size * len(templates) + len(source_records)
+        offset = strings_offset + len(strings)
+        directory = []
+        body = []
+        for template, validated, count, columns in sections:
+            offsets = []
+            for column in columns:
+                offsets.append(offset)
+                column += bytes(-len(column) % 4)
+                body.append(column)
+                offset += len(column)
+            (rows_offset, parent_offset, order_offset, levels_offset,
+             full_codes_offset, orphans_offset, cyclic_offset) = offsets
+            directory.append(cls.GROUP.pack(
+                intern_string(template.extension_name), intern_string(template.version), count, count - len(template.extensions),
+                rows_offset, parent_offset, order_offset, levels_offset, full_codes_offset,
+                orphans_offset, len(template.orphan_codes), cyclic_offset, len(template.cyclic_codes),
+                bytes.fromhex(template.fingerprint), validated,
+            ))
+        
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(sources), len(string_ids), strings_offset, len(templates))
+        data = header + b''.join(directory) + source_records + strings + b''.join(body)
+        temporary = f"{path}.tmp{os.getpid()}"
+        with open(temporary, 'wb') as bundle_file:
+            bundle_file.write(data)
+        os.replace(temporary, path)
+        return len(data)
+
+
+class AccountTree:
+    """
+    شجرة حسابات مشروع (كما هي في قاعدة البيانات) بتمثيل مصفوفات: معرف الحساب وفهرس الأب والعمق
+    مع ترتيب عرضي من الجذور، لتجميع الأرصدة على كل المستويات في تمريرة واحدة
+    بدلاً من التنقل المتكرر بين كائنات ORM
+    """
+    __slots__ = ('project_id', 'ids', 'index_by_id', 'index_by_full_code', 'parent_index', 'codes',
+                 'full_codes', 'is_group', 'order', 'depths')
+
+    def __init__(self, project_id: int, rows: List[Tuple[int, Optional[int], str, str, bool]]):
+        """rows: (id, parent_account_id, code, full_code, is_group) لكل حسابات المشروع"""
+        self.project_id = project_id
+        self.ids = tuple(row[0] for row in rows)
+        self.index_by_id: Dict[int, int] = {account_id: index for index, account_id in enumerate(self.ids)}
+        self.parent_index = array('i', (
+            self.index_by_id.get(row[1], -1) if row[1] else -1 for row in rows
+        ))
+        self.codes = tuple(row[2] for row in rows)
+        self.full_codes = tuple(row[3] for row in rows)
+        self.index_by_full_code: Dict[str, int] = {
+            full_code: index for index, full_code in enumerate(self.full_codes)
+        }
+        self.is_group = tuple(bool(row[4]) for row in rows)
+        
+        # ترتيب عرضي (الأب قبل الابن) والعمق من parent_account_id (الجذر عمقه 1)
+        children: List[List[int]] = [[] for _ in rows]
+        order = []
+        for index, parent in enumerate(self.parent_index):
+            if parent >= 0:
+                children[parent].append(index)
+            else:
+                order.append(index)
+        depths = array('h', bytes(2 * len(rows)))
+        for index in order:
+            depths[index] = 1
+        for index in order:
+            for child in children[index]:
+                depths[child] = depths[index] + 1
+                order.append(child)
+        self.order = tuple(order)
+        self.depths = depths
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get_account_id(self, full_code: str) -> Optional[int]:
+        """معرف الحساب بكوده الكامل من الذاكرة (None إذا لم يكن في المشروع)"""
+        index = self.index_by_full_code.get(full_code)
+        return None if index is None else self.ids[index]
+
+    def rollup(self, balances: Mapping[int, object]) -> Dict[int, object]:
+        """
+        إجمالي كل حساب = رصيده + أرصدة كل الحسابات تحته (حتى حسابات المستوى الأول)
+        
+        الأرصدة تُجمع بنفس نوعها (int أو float أو Decimal) بتمريرة واحدة من الأعمق إلى الجذور
+        
+        Args:
+            balances: account_id -> الرصيد (عادة للحسابات الفرعية فقط)
+            
+        Returns:
+            Dict[int, رصيد]: الإجمالي لكل حسابات المشروع
+        """
+        values = [0] * len(self.ids)
+        for account_id, amount in balances.items():
+            index = self.index_by_id.get(account_id)
+            if index is None:
+                raise ValueError(f"الحساب {account_id} ليس في شجرة المشروع {self.project_id}")
+            values[index] += amount
+        
+        parent_index = self.parent_index
+        for index in reversed(self.order):
+            parent = parent_index[index]
+            if parent >= 0:
+                values[parent] += values[index]
+        return dict(zip(self.ids, values))
+
+
+class _TemplateFile:
+    """خاصية على مستوى الصنف تقرأ ملف القالب عند أول وصول (SmartCOAEngine.STANDARD_FRAMEWORK)"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner) -> Tuple[AccountTemplate, ...]:
+        return owner._load_template_file(self.name)
+
+
+class SeedPlan:
+    """
+    خطة إنشاء جاهزة لقالب مُجمّع وعملة: صفوف الحسابات مُعدّة مسبقاً لكل مستوى
+    (full_code والمستوى والعملة محسوبة) مع فهرس الأب وخريطة الحسابات الافتراضية
+    
+    الخطة لا تعتمد على المشروع، فتُخزّن مؤقتاً وتُعاد لأي مشروع بإدراج مجمّع مباشر
+    """
+    __slots__ = ('template', 'currency_id', 'levels', 'default_tags')
+
+    def __init__(self, template: CompiledTemplate, currency_id: int,
+                 levels: Tuple[Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[Dict, ...]], ...]):
+        self.template = template
+        self.currency_id = currency_id
+        # لكل مستوى: (فهارس الحسابات في القالب، فهارس آبائها، الصفوف الجاهزة)
+        self.levels = levels
+        self.default_tags: Dict[str, int] = {
+            account.tag: index for index, account in enumerate(template.accounts) if account.tag
+        }
+
+    def __len__(self) -> int:
+        return len(self.template)
+
+
+# قياسات الاستدعاء الجاري في هذا الخيط/السياق (لعدّ الاستعلامات)
+_current_metrics: ContextVar[Optional['SeedMetrics']] = ContextVar('coa_seed_metrics', default=None)
+_instrumented_engines = weakref.WeakSet()
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.queries += 1
+
+
+# إشارة إلغاء لإنشاء يعمل في خيط (من seed_chart_of_accounts_async) تُفحص بين المراحل وبين الحسابات
+_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar('coa_seed_cancel', default=None)
+
+
+def _raise_if_cancelled():
+    cancel = _cancel_event.get()
+    if cancel is not None and cancel.is_set():
+        raise asyncio.CancelledError()
+
+
+# مفتاح session.info لمشاريع عُدلت حساباتها في المعاملة الجارية (تُبطل أشجارها المؤقتة عند انتهائها)
+_TOUCHED_PROJECTS_KEY = 'coa_touched_projects'
+
+
+def _touch_projects(session: Session, project_ids):
+    """تسجيل مشاريع عُدلت حساباتها في الجلسة (None = كل المشاريع)"""
+    session.info.setdefault(_TOUCHED_PROJECTS_KEY, set()).update(project_ids)
+
+
+class SeedMetrics:
+    """
+    قياسات استدعاء واحد لإنشاء شجرة الحسابات: زمن كل مرحلة (بالثواني)،
+    عدد الحسابات المُنشأة والمتخطاة، وعدد الاستعلامات المرسلة لقاعدة البيانات
+    """
+    __slots__ = ('operation', 'project_id', 'industry', 'mode', 'projects',
+                 'phases', 'created', 'skipped', 'queries', 'success', 'error')
+
+    def __init__(self, operation: str, project_id: Optional[int] = None,
+                 industry: Optional[str] = None, mode: Optional[str] = None):
+        self.operation = operation
+        self.project_id = project_id
+        self.industry = industry
+        self.mode = mode
+        self.projects = 1
+        self.phases: Dict[str, float] = {}
+        self.created = 0
+        self.skipped = 0
+        self.queries = 0
+        self.success = False
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """قياس زمن مرحلة (يُجمع إذا تكررت المرحلة)"""
+        _raise_if_cancelled()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def track_queries(self, session: Session):
+        """عدّ الاستعلامات المنفذة في هذا السياق على محرك الجلسة"""
+        engine = session.get_bind()
+        engine = getattr(engine, 'engine', engine)
+        if engine not in _instrumented_engines:
+            event.listen(engine, 'before_cursor_execute', _count_query)
+            _instrumented_engines.add(engine)
+        token = _current_metrics.set(self)
+        try:
+            yield
+        finally:
+            _current_metrics.reset(token)
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.phases.values())
+
+    def as_dict(self) -> Dict:
+        return {
+            'operation': self.operation,
+            'project_id': self.project_id,
+            'industry': self.industry,
+            'mode': self.mode,
+            'projects': self.projects,
+            'phases': dict(self.phases),
+            'total_time': self.total_time,
+            'created': self.created,
+            'skipped': self.skipped,
+            'queries': self.queries,
+            'success': self.success,
+            'error': self.error,
+        }
+
 
 class SmartCOAEngine:
     """
@@ -11,2859 +601,2575 @@ class SmartCOAEngine:
     """
     
     # ==================== القالب الأساسي (إطار موحد) ====================
-    STANDARD_FRAMEWORK = [
-    # 1. الأصول (Assets) - 1000
-    {"code": "1000", "name_ar": "الأصول", "name_en": "Assets", "type": "Asset", 
-     "is_group": True, "parent_code": None, "level": 1},
-    
-    # 1.1 الأصول الثابتة - 1100
-    {"code": "1100", "name_ar": "الأصول الثابتة", "name_en": "Fixed Assets", "type": "Asset", 
-     "is_group": True, "parent_code": "1000", "level": 2},
-    
-    {"code": "1110", "name_ar": "أثاث", "name_en": "Furniture", "type": "Asset", 
-     "is_group": True, "parent_code": "1100", "level": 3},
-    {"code": "1120", "name_ar": "الأجهزة والمعدات", "name_en": "Equipment", "type": "Asset", 
-     "is_group": True, "parent_code": "1100", "level": 3},
-    {"code": "1130", "name_ar": "وسائل النقل", "name_en": "Transportation", "type": "Asset", 
-     "is_group": True, "parent_code": "1100", "level": 3},
-    {"code": "1140", "name_ar": "مباني", "name_en": "Buildings", "type": "Asset", 
-     "is_group": True, "parent_code": "1100", "level": 3},
-    {"code": "1150", "name_ar": "أراضي", "name_en": "Land", "type": "Asset", 
-     "is_group": True, "parent_code": "1100", "level": 3},
-    
-    # 1.2 الأصول المتداولة - 1200
-    {"code": "1200", "name_ar": "الأصول المتداولة", "name_en": "Current Assets", "type": "Asset", 
-     "is_group": True, "parent_code": "1000", "level": 2},
-    
-    {"code": "1210", "name_ar": "الخزينة", "name_en": "Treasury", "type": "Asset", 
-     "is_group": True, "parent_code": "1200", "level": 3},
-    {"code": "1211", "name_ar": "الخزينة الأساسية", "name_en": "Main Treasury", "type": "Asset", 
-     "is_group": False, "parent_code": "1210", "level": 4},
-    
-    {"code": "1220", "name_ar": "البنك", "name_en": "Bank", "type": "Asset", 
-     "is_group": True, "parent_code": "1200", "level": 3},
-    
-    {"code": "1230", "name_ar": "المخزون", "name_en": "Inventory", "type": "Asset", 
-     "is_group": True, "parent_code": "1200", "level": 3},
-    
-    {"code": "1240", "name_ar": "المدينون", "name_en": "Debtors", "type": "Asset", 
-     "is_group": True, "parent_code": "1200", "level": 3},
-    
-    {"code": "1241", "name_ar": "العملاء", "name_en": "Clients", "type": "Asset", 
-     "is_group": True, "parent_code": "1240", "level": 4},
-    {"code": "12411", "name_ar": "POS Client", "name_en": "POS Client", "type": "Asset", 
-     "is_group": False, "parent_code": "1241", "level": 5},
-    
-    {"code": "1242", "name_ar": "أطراف مدينة أخرى", "name_en": "Other Debtors", "type": "Asset", 
-     "is_group": False, "parent_code": "1240", "level": 4},
-    
-    {"code": "1250", "name_ar": "عهد الموظفين", "name_en": "Employee Advances", "type": "Asset", 
-     "is_group": True, "parent_code": "1200", "level": 3},
-    
-    {"code": "1260", "name_ar": "أوراق القبض", "name_en": "Receivables Notes", "type": "Asset", 
-     "is_group": True, "parent_code": "1200", "level": 3},
-    
-    {"code": "1270", "name_ar": "عجز وزيادة الصندوق", "name_en": "Cash Short & Over", "type": "Asset", 
-     "is_group": False, "parent_code": "1200", "level": 3},
-    
-    {"code": "1280", "name_ar": "تغيير عملة", "name_en": "Currency Exchange", "type": "Asset", 
-     "is_group": False, "parent_code": "1200", "level": 3},
-    
-    {"code": "1290", "name_ar": "المشتريات", "name_en": "Purchases", "type": "Asset", 
-     "is_group": False, "parent_code": "1200", "level": 3},
-    
-    # 2. الخصوم (Liabilities) - 2000
-    {"code": "2000", "name_ar": "الخصوم", "name_en": "Liabilities", "type": "Liability", 
-     "is_group": True, "parent_code": None, "level": 1},
-    
-    # 2.1 الخصوم المتداولة - 2100
-    {"code": "2100", "name_ar": "الخصوم المتداولة", "name_en": "Current Liabilities", "type": "Liability", 
-     "is_group": True, "parent_code": "2000", "level": 2},
-    
-    {"code": "2110", "name_ar": "الدائنون", "name_en": "Creditors", "type": "Liability", 
-     "is_group": True, "parent_code": "2100", "level": 3},
-    
-    {"code": "2111", "name_ar": "الموردون", "name_en": "Suppliers", "type": "Liability", 
-     "is_group": True, "parent_code": "2110", "level": 4},
-    {"code": "21110", "name_ar": "اسم المورد التجاري", "name_en": "Trade Supplier", "type": "Liability", 
-     "is_group": False, "parent_code": "2111", "level": 5},
-    
-    {"code": "2112", "name_ar": "شركات الشحن", "name_en": "Shipping Companies", "type": "Liability", 
-     "is_group": True, "parent_code": "2110", "level": 4},
-    {"code": "21120", "name_ar": "شحن مبيعات", "name_en": "Sales Shipping", "type": "Liability", 
-     "is_group": False, "parent_code": "2112", "level": 5},
-    
-    {"code": "2113", "name_ar": "أطراف دائنة أخرى", "name_en": "Other Creditors", "type": "Liability", 
-     "is_group": False, "parent_code": "2110", "level": 4},
-    
-    {"code": "2120", "name_ar": "أوراق الدفع", "name_en": "Payables Notes", "type": "Liability", 
-     "is_group": True, "parent_code": "2100", "level": 3},
-    
-    {"code": "2130", "name_ar": "مجمع الإهلاك", "name_en": "Accumulated Depreciation", "type": "Liability", 
-     "is_group": True, "parent_code": "2100", "level": 3},
-    
-    {"code": "2140", "name_ar": "أرصدة افتتاحية", "name_en": "Opening Balances", "type": "Liability", 
-     "is_group": False, "parent_code": "2100", "level": 3},
-    
-    {"code": "2150", "name_ar": "القيمة المضافة المطلوبة", "name_en": "Required VAT", "type": "Liability", 
-     "is_group": True, "parent_code": "2100", "level": 3},
-    
-    # 2.2 الخصوم طويلة الأجل - 2200
-    {"code": "2200", "name_ar": "الخصوم طويلة الأجل", "name_en": "Long-term Liabilities", "type": "Liability", 
-     "is_group": True, "parent_code": "2000", "level": 2},
-    
-    # 3. رأس المال وحقوق الملكية (Equity) - 3000
-    {"code": "3000", "name_ar": "رأس المال وحقوق الملكية", "name_en": "Capital and Equity", "type": "Equity", 
-     "is_group": True, "parent_code": None, "level": 1},
-    
-    # 4. الإيرادات (Revenue) - 4000
-    {"code": "4000", "name_ar": "الإيرادات", "name_en": "Revenues", "type": "Revenue", 
-     "is_group": True, "parent_code": None, "level": 1},
-    
-    # 4.1 إيرادات المبيعات - 4100
-    {"code": "4100", "name_ar": "إيرادات المبيعات", "name_en": "Sales Revenue", "type": "Revenue", 
-     "is_group": True, "parent_code": "4000", "level": 2},
-    
-    {"code": "4110", "name_ar": "المبيعات", "name_en": "Sales", "type": "Revenue", 
-     "is_group": False, "parent_code": "4100", "level": 3},
-    
-    {"code": "4120", "name_ar": "مردودات المبيعات", "name_en": "Sales Returns", "type": "Revenue", 
-     "is_group": False, "parent_code": "4100", "level": 3},
-    
-    # 4.2 إيرادات أخرى - 4200
-    {"code": "4200", "name_ar": "إيرادات أخرى", "name_en": "Other Revenues", "type": "Revenue", 
-     "is_group": True, "parent_code": "4000", "level": 2},
-    
-    {"code": "4210", "name_ar": "إيرادات أخرى", "name_en": "Other Revenues", "type": "Revenue", 
-     "is_group": False, "parent_code": "4200", "level": 3},
-    
-    {"code": "4220", "name_ar": "أرباح وخسائر رأسمالية", "name_en": "Capital Gains/Losses", "type": "Revenue", 
-     "is_group": False, "parent_code": "4200", "level": 3},
-    
-    # 5. المصروفات (Expenses) - 5000
-    {"code": "5000", "name_ar": "المصروفات", "name_en": "Expenses", "type": "Expense", 
-     "is_group": True, "parent_code": None, "level": 1},
-    
-    # 5.1 تكلفة المبيعات - 5100
-    {"code": "5100", "name_ar": "تكلفة المبيعات", "name_en": "Cost of Sales", "type": "Expense", 
-     "is_group": True, "parent_code": "5000", "level": 2},
-    
-    {"code": "5110", "name_ar": "تكلفة المبيعات", "name_en": "Cost of Sales", "type": "Expense", 
-     "is_group": False, "parent_code": "5100", "level": 3},
-    
-    {"code": "5120", "name_ar": "شحن مشتريات", "name_en": "Purchases Shipping", "type": "Expense", 
-     "is_group": False, "parent_code": "5100", "level": 3},
-    
-    {"code": "5130", "name_ar": "خصم مسموح به", "name_en": "Allowed Discount", "type": "Expense", 
-     "is_group": False, "parent_code": "5100", "level": 3},
-    
-    # 5.2 مصروفات إدارية وعمومية - 5200
-    {"code": "5200", "name_ar": "مصروفات إدارية وعمومية", "name_en": "Administrative Expenses", "type": "Expense", 
-     "is_group": True, "parent_code": "5000", "level": 2},
-    
-    {"code": "5210", "name_ar": "إيجار", "name_en": "Rent", "type": "Expense", 
-     "is_group": False, "parent_code": "5200", "level": 3},
-    
-    {"code": "5220", "name_ar": "كهرباء", "name_en": "Electricity", "type": "Expense", 
-     "is_group": False, "parent_code": "5200", "level": 3},
-    
-    {"code": "5230", "name_ar": "هاتف وانترنت", "name_en": "Phone & Internet", "type": "Expense", 
-     "is_group": False, "parent_code": "5200", "level": 3},
-    
-    {"code": "5240", "name_ar": "صيانة", "name_en": "Maintenance", "type": "Expense", 
-     "is_group": False, "parent_code": "5200", "level": 3},
-    
-    {"code": "5250", "name_ar": "مياه", "name_en": "Water", "type": "Expense", 
-     "is_group": False, "parent_code": "5200", "level": 3},
-    
-    {"code": "5260", "name_ar": "مصاريف حكومية", "name_en": "Government Expenses", "type": "Expense", 
-     "is_group": False, "parent_code": "5200", "level": 3},
-    
-    # 5.3 مصروفات الإهلاك - 5300
-    {"code": "5300", "name_ar": "مصروفات الإهلاك", "name_en": "Depreciation Expenses", "type": "Expense", 
-     "is_group": True, "parent_code": "5000", "level": 2},
-    
-    # 5.4 مصروفات أخرى - 5400
-    {"code": "5400", "name_ar": "مصروفات أخرى", "name_en": "Other Expenses", "type": "Expense", 
-     "is_group": True, "parent_code": "5000", "level": 2},
-    
-    {"code": "5410", "name_ar": "مصروفات أخرى", "name_en": "Other Expenses", "type": "Expense", 
-     "is_group": False, "parent_code": "5400", "level": 3},
-    
-    {"code": "5420", "name_ar": "الديون المعدومة", "name_en": "Bad Debts", "type": "Expense", 
-     "is_group": False, "parent_code": "5400", "level": 3},
-    
-    {"code": "5430", "name_ar": "عجز وزيادة المخزون", "name_en": "Inventory Short & Over", "type": "Expense", 
-     "is_group": False, "parent_code": "5400", "level": 3},
-    
-    {"code": "5440", "name_ar": "إعادة تقييم", "name_en": "Revaluation", "type": "Expense", 
-     "is_group": False, "parent_code": "5400", "level": 3},
-]
+    # القوالب محفوظة كملفات بيانات في coa_templates/ وتُقرأ عند أول استخدام فقط
+    # الإطار الموحد ودوال الإضافات تُرجع قوالب AccountTemplate غير قابلة للتعديل (tuple للإطار):
+    # تُقرأ كقواميس فقط، ولقالب معدل يُنشأ حساب جديد: AccountTemplate.from_dict(dict(account, ...))
+    STANDARD_FRAMEWORK: Tuple[AccountTemplate, ...] = _TemplateFile('standard_framework')
     # ==================== إضافات التخصصات ====================
+    # ملف البيانات في coa_templates/ لكل مجموعة تخصص (اسم دالة الإضافات -> اسم الملف)
+    EXTENSION_FILES: Dict[str, str] = {
+        'get_tech_software_extensions': 'tech_software',
+        'get_construction_extensions': 'construction',
+        'get_manufacturing_extensions': 'manufacturing',
+        'get_healthcare_extensions': 'healthcare',
+        'get_retail_ecommerce_extensions': 'retail_ecommerce',
+        'get_finance_banking_extensions': 'finance_banking',
+        'get_education_extensions': 'education',
+        'get_logistics_extensions': 'logistics',
+        'get_energy_extensions': 'energy',
+        'get_hospitality_extensions': 'hospitality',
+        'get_media_extensions': 'media',
+    }
+
     @classmethod
-    def get_tech_software_extensions(cls) -> List[Dict]:
+    def get_tech_software_extensions(cls) -> List[AccountTemplate]:
         """تكنولوجيا والبرمجيات مع مجموعات فرعية"""
-        return [
-        # أصول تكنولوجية - مجموعة جديدة
-        {"code": "1160", "name_ar": "الأصول التكنولوجية", "name_en": "Technological Assets", 
-         "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-        
-        {"code": "1161", "name_ar": "سيرفرات وأجهزة شبكات", "name_en": "Servers & Network Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1160", "level": 4},
-        
-        {"code": "1162", "name_ar": "تراخيص برمجيات رئيسية", "name_en": "Major Software Licenses", 
-         "type": "Asset", "is_group": False, "parent_code": "1160", "level": 4},
-        
-        # إيرادات تكنولوجية - مجموعة جديدة
-        {"code": "4230", "name_ar": "الإيرادات التكنولوجية", "name_en": "Technology Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4200", "level": 3},
-        
-        {"code": "4231", "name_ar": "إيرادات اشتراكات (SaaS)", "name_en": "Subscription Revenue (SaaS)", 
-         "type": "Revenue", "is_group": False, "parent_code": "4230", "level": 4},
-        
-        {"code": "4232", "name_ar": "إيرادات تنفيذ وتخصيص", "name_en": "Implementation & Customization Fees", 
-         "type": "Revenue", "is_group": False, "parent_code": "4230", "level": 4},
-        
-        {"code": "4233", "name_ar": "إيرادات صيانة ودعم", "name_en": "Maintenance & Support Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4230", "level": 4},
-        
-        {"code": "4234", "name_ar": "إيرادات تراخيص برمجيات", "name_en": "Software Licensing Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4230", "level": 4},
-        
-        {"code": "4235", "name_ar": "إيرادات الاستشارات التقنية", "name_en": "Technical Consulting Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4230", "level": 4},
-        
-        # تكاليف تكنولوجية - مجموعة جديدة
-        {"code": "5140", "name_ar": "التكاليف التكنولوجية", "name_en": "Technology Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5100", "level": 3},
-        
-        {"code": "5141", "name_ar": "تكاليف السيرفرات السحابية", "name_en": "Cloud Server Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5140", "level": 4},
-        
-        {"code": "5142", "name_ar": "تكاليف تراخيص برمجيات تابعة لجهات خارجية", "name_en": "Third-party Software Licenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5140", "level": 4},
-        
-        {"code": "5143", "name_ar": "تكاليف الدعم الفني", "name_en": "Technical Support Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5140", "level": 4},
-        
-        {"code": "5144", "name_ar": "تكاليف ضمان الجودة والاختبار", "name_en": "QA & Testing Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5140", "level": 4},
-        
-        # مصروفات تكنولوجية - مجموعة جديدة
-        {"code": "5270", "name_ar": "المصروفات التكنولوجية", "name_en": "Technology Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5200", "level": 3},
-        
-        {"code": "5271", "name_ar": "مصاريف حضور المؤتمرات التقنية", "name_en": "Tech Conference Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5270", "level": 4},
-        
-        {"code": "5272", "name_ar": "مصاريف استضافة مواقع وتطبيقات", "name_en": "Hosting & Application Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5270", "level": 4},
-        
-        {"code": "5273", "name_ar": "مصاريف تطوير وإنتاج البرمجيات", "name_en": "Software Development Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5270", "level": 4},
-        
-        {"code": "5274", "name_ar": "مصاريف أبحاث وتطوير (R&D)", "name_en": "Research & Development (R&D)", 
-         "type": "Expense", "is_group": False, "parent_code": "5270", "level": 4},
-    ]
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_tech_software_extensions']))
     
     
     @classmethod
-    def get_construction_extensions(cls) -> List[Dict]:
+    def get_construction_extensions(cls) -> List[AccountTemplate]:
         """إنشاءات ومقاولات"""
-        return [
-        # ============ الأصول الثابتة - المقاولات (تحت 1100) ============
-        {"code": "1170", "name_ar": "معدات الإنشاءات", "name_en": "Construction Equipment", 
-         "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-        
-        {"code": "1171", "name_ar": "معدات ثقيلة", "name_en": "Heavy Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1170", "level": 4},
-        
-        {"code": "1172", "name_ar": "معدات خفيفة", "name_en": "Light Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1170", "level": 4},
-        
-        {"code": "1173", "name_ar": "أدوات وأجهزة قياس", "name_en": "Tools & Measuring Devices", 
-         "type": "Asset", "is_group": False, "parent_code": "1170", "level": 4},
-        
-        {"code": "1174", "name_ar": "مركبات الموقع", "name_en": "Site Vehicles", 
-         "type": "Asset", "is_group": False, "parent_code": "1170", "level": 4},
-        
-        # ============ الأصول المتداولة - المقاولات (تحت 1200) ============
-        {"code": "12100", "name_ar": "مستخلصات وأعمال تحت التنفيذ", "name_en": "Billings & Work in Progress", 
-         "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-        
-        {"code": "12101", "name_ar": "مستخلصات معتمدة للتحصيل", "name_en": "Approved Billings", 
-         "type": "Asset", "is_group": False, "parent_code": "12100", "level": 4},
-        
-        {"code": "12102", "name_ar": "مستخلصات تحت الاعتماد", "name_en": "Billings Pending Approval", 
-         "type": "Asset", "is_group": False, "parent_code": "12100", "level": 4},
-        
-        {"code": "12103", "name_ar": "أعمال تحت التنفيذ (WIP)", "name_en": "Work in Progress (WIP)", 
-         "type": "Asset", "is_group": False, "parent_code": "12100", "level": 4},
-        
-        {"code": "12110", "name_ar": "مخزونات المقاولات", "name_en": "Construction Inventory", 
-         "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-        
-        {"code": "12111", "name_ar": "مواد بناء في الموقع", "name_en": "Construction Materials on Site", 
-         "type": "Asset", "is_group": False, "parent_code": "12110", "level": 4},
-        
-        {"code": "12112", "name_ar": "مواد بناء في المخزن الرئيسي", "name_en": "Construction Materials in Main Storage", 
-         "type": "Asset", "is_group": False, "parent_code": "12110", "level": 4},
-        
-        {"code": "12113", "name_ar": "مواد قيد التوريد", "name_en": "Materials in Transit", 
-         "type": "Asset", "is_group": False, "parent_code": "12110", "level": 4},
-        
-        # ============ الخصوم - المقاولات (تحت 2100) ============
-        {"code": "2160", "name_ar": "موردو الإنشاءات", "name_en": "Construction Suppliers", 
-         "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-        
-        {"code": "2161", "name_ar": "موردون مواد بناء", "name_en": "Construction Materials Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2160", "level": 4},
-        
-        {"code": "2162", "name_ar": "موردون معدات وأدوات", "name_en": "Equipment & Tools Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2160", "level": 4},
-        
-        {"code": "2163", "name_ar": "مقاولو باطن", "name_en": "Subcontractors", 
-         "type": "Liability", "is_group": True, "parent_code": "2160", "level": 4},
-        
-        {"code": "21631", "name_ar": "مقاولو هيكل خرساني", "name_en": "Concrete Structure Subcontractors", 
-         "type": "Liability", "is_group": False, "parent_code": "2163", "level": 5},
-        
-        {"code": "21632", "name_ar": "مقاولو تشطيبات", "name_en": "Finishing Subcontractors", 
-         "type": "Liability", "is_group": False, "parent_code": "2163", "level": 5},
-        
-        {"code": "21633", "name_ar": "مقاولو كهرباء", "name_en": "Electrical Subcontractors", 
-         "type": "Liability", "is_group": False, "parent_code": "2163", "level": 5},
-        
-        {"code": "21634", "name_ar": "مقاولو سباكة", "name_en": "Plumbing Subcontractors", 
-         "type": "Liability", "is_group": False, "parent_code": "2163", "level": 5},
-        
-        {"code": "2170", "name_ar": "ضمانات ومحتجَزات", "name_en": "Retention & Warranty Liabilities", 
-         "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-        
-        {"code": "2171", "name_ar": "محتجَز ضمانات الموردين", "name_en": "Supplier Retention", 
-         "type": "Liability", "is_group": False, "parent_code": "2170", "level": 4},
-        
-        {"code": "2172", "name_ar": "محتجَز ضمانات العملاء", "name_en": "Customer Retention", 
-         "type": "Liability", "is_group": False, "parent_code": "2170", "level": 4},
-        
-        {"code": "2173", "name_ar": "ضمانات أداء", "name_en": "Performance Bonds", 
-         "type": "Liability", "is_group": False, "parent_code": "2170", "level": 4},
-        
-        {"code": "2174", "name_ar": "ضمانات صيانة", "name_en": "Maintenance Bonds", 
-         "type": "Liability", "is_group": False, "parent_code": "2170", "level": 4},
-        
-        # ============ الإيرادات - المقاولات (تحت 4000) ============
-        {"code": "4300", "name_ar": "إيرادات الإنشاءات والمقاولات", "name_en": "Construction & Contracting Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-        
-        {"code": "4310", "name_ar": "إيرادات عقود إنشائية رئيسية", "name_en": "Main Construction Contracts", 
-         "type": "Revenue", "is_group": True, "parent_code": "4300", "level": 3},
-        
-        {"code": "4311", "name_ar": "إيرادات بناء مباني سكنية", "name_en": "Residential Building Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4310", "level": 4},
-        
-        {"code": "4312", "name_ar": "إيرادات بناء مباني تجارية", "name_en": "Commercial Building Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4310", "level": 4},
-        
-        {"code": "4313", "name_ar": "إيرادات مشاريع بنية تحتية", "name_en": "Infrastructure Projects Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4310", "level": 4},
-        
-        {"code": "4320", "name_ar": "إيرادات أعمال الصيانة والتشغيل", "name_en": "Maintenance & Operation Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4300", "level": 3},
-        
-        {"code": "4321", "name_ar": "إيرادات صيانة دورية", "name_en": "Regular Maintenance Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4320", "level": 4},
-        
-        {"code": "4322", "name_ar": "إيرادات إصلاحات طارئة", "name_en": "Emergency Repair Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4320", "level": 4},
-        
-        {"code": "4330", "name_ar": "إيرادات الخدمات الهندسية", "name_en": "Engineering Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4300", "level": 3},
-        
-        {"code": "4331", "name_ar": "إيرادات التصميم والاستشارات الهندسية", "name_en": "Design & Engineering Consulting", 
-         "type": "Revenue", "is_group": False, "parent_code": "4330", "level": 4},
-        
-        {"code": "4332", "name_ar": "إيرادات إعداد دراسات الجدوى", "name_en": "Feasibility Studies Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4330", "level": 4},
-        
-        {"code": "4333", "name_ar": "إيرادات الإشراف الهندسي", "name_en": "Engineering Supervision Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4330", "level": 4},
-        
-        # ============ التكاليف - المقاولات (تحت 5000) ============
-        {"code": "5150", "name_ar": "تكاليف الإنشاءات والمقاولات", "name_en": "Construction & Contracting Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5160", "name_ar": "تكاليف مواد البناء", "name_en": "Construction Materials Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5150", "level": 3},
-        
-        {"code": "5161", "name_ar": "تكلفة مواد البناء المستخدمة", "name_en": "Construction Materials Used", 
-         "type": "Expense", "is_group": False, "parent_code": "5160", "level": 4},
-        
-        {"code": "5162", "name_ar": "تكلفة مواد التشطيبات", "name_en": "Finishing Materials Cost", 
-         "type": "Expense", "is_group": False, "parent_code": "5160", "level": 4},
-        
-        {"code": "5163", "name_ar": "تكلفة المواد الكهربائية والسباكة", "name_en": "Electrical & Plumbing Materials", 
-         "type": "Expense", "is_group": False, "parent_code": "5160", "level": 4},
-        
-        {"code": "5170", "name_ar": "تكاليف العمالة المباشرة", "name_en": "Direct Labor Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5150", "level": 3},
-        
-        {"code": "5171", "name_ar": "تكلفة عمالة الموقع المباشرة", "name_en": "Direct Site Labor", 
-         "type": "Expense", "is_group": False, "parent_code": "5170", "level": 4},
-        
-        {"code": "5172", "name_ar": "تكلفة مشرفي الموقع", "name_en": "Site Supervisors Cost", 
-         "type": "Expense", "is_group": False, "parent_code": "5170", "level": 4},
-        
-        {"code": "5173", "name_ar": "تكلفة المهندسين الميدانيين", "name_en": "Field Engineers Cost", 
-         "type": "Expense", "is_group": False, "parent_code": "5170", "level": 4},
-        
-        {"code": "5180", "name_ar": "تكاليف مقاولي الباطن", "name_en": "Subcontractor Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5150", "level": 3},
-        
-        {"code": "5181", "name_ar": "تكلفة مقاولي الهيكل الخرساني", "name_en": "Concrete Structure Subcontractors", 
-         "type": "Expense", "is_group": False, "parent_code": "5180", "level": 4},
-        
-        {"code": "5182", "name_ar": "تكلفة مقاولي التشطيبات", "name_en": "Finishing Subcontractors", 
-         "type": "Expense", "is_group": False, "parent_code": "5180", "level": 4},
-        
-        {"code": "5183", "name_ar": "تكلفة مقاولي الكهرباء", "name_en": "Electrical Subcontractors", 
-         "type": "Expense", "is_group": False, "parent_code": "5180", "level": 4},
-        
-        {"code": "5184", "name_ar": "تكلفة مقاولي السباكة", "name_en": "Plumbing Subcontractors", 
-         "type": "Expense", "is_group": False, "parent_code": "5180", "level": 4},
-        
-        {"code": "5190", "name_ar": "تكاليف المعدات والتشغيل", "name_en": "Equipment & Operation Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5150", "level": 3},
-        
-        {"code": "5191", "name_ar": "تكلفة تأجير المعدات", "name_en": "Equipment Rental Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5190", "level": 4},
-        
-        {"code": "5192", "name_ar": "تكلفة وقود المعدات", "name_en": "Equipment Fuel Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5190", "level": 4},
-        
-        {"code": "5193", "name_ar": "تكلفة النقل والمواصلات للموقع", "name_en": "Site Transportation Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5190", "level": 4},
-        
-        {"code": "5194", "name_ar": "تكلفة تشغيل المعدات", "name_en": "Equipment Operation Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5190", "level": 4},
-        
-        # ============ المصروفات - المقاولات (تحت 5000) ============
-        {"code": "5280", "name_ar": "مصاريف إدارية - مقاولات", "name_en": "Administrative Expenses - Contracting", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5290", "name_ar": "مصاريف موقعية وإشرافية", "name_en": "Site & Supervision Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5280", "level": 3},
-        
-        {"code": "5291", "name_ar": "مصاريف السلامة والأمن في الموقع", "name_en": "Site Safety & Security", 
-         "type": "Expense", "is_group": False, "parent_code": "5290", "level": 4},
-        
-        {"code": "5292", "name_ar": "مصاريف إيجار مواقع مؤقتة", "name_en": "Temporary Site Rental", 
-         "type": "Expense", "is_group": False, "parent_code": "5290", "level": 4},
-        
-        {"code": "5293", "name_ar": "مصاريف مكاتب موقعية", "name_en": "Site Office Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5290", "level": 4},
-        
-        {"code": "5294", "name_ar": "مصاريف إسكان عمال", "name_en": "Workers Housing Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5290", "level": 4},
-        
-        {"code": "5300", "name_ar": "مصاريف صيانة المعدات", "name_en": "Equipment Maintenance Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5280", "level": 3},
-        
-        {"code": "5301", "name_ar": "مصاريف الصيانة الوقائية للمعدات", "name_en": "Equipment Preventive Maintenance", 
-         "type": "Expense", "is_group": False, "parent_code": "5300", "level": 4},
-        
-        {"code": "5302", "name_ar": "مصاريف إصلاح المعدات", "name_en": "Equipment Repair Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5300", "level": 4},
-        
-        {"code": "5303", "name_ar": "إهلاك معدات الإنشاءات", "name_en": "Construction Equipment Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5300", "level": 4},
-        
-        {"code": "5310", "name_ar": "مصاريف تراخيص وموافقات", "name_en": "Licenses & Approvals Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5280", "level": 3},
-        
-        {"code": "5311", "name_ar": "مصاريف تراخيص البناء", "name_en": "Building Permits Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5310", "level": 4},
-        
-        {"code": "5312", "name_ar": "مصاريف فحوصات واختبارات", "name_en": "Inspections & Tests Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5310", "level": 4},
-        
-        {"code": "5313", "name_ar": "مصاريف رسوم هندسية", "name_en": "Engineering Fees", 
-         "type": "Expense", "is_group": False, "parent_code": "5310", "level": 4},
-    ]
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_construction_extensions']))
     
     @classmethod
-    def get_manufacturing_extensions(cls) -> List[Dict]:
+    def get_manufacturing_extensions(cls) -> List[AccountTemplate]:
         """تصنيع وإنتاج"""
-        return [
-        # ============ الأصول الثابتة - التصنيع (تحت 1100) ============
-        {"code": "1180", "name_ar": "معدات وأصول التصنيع", "name_en": "Manufacturing Equipment & Assets", 
-         "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-        
-        {"code": "1181", "name_ar": "آلات ومعدات الإنتاج الرئيسية", "name_en": "Main Production Machinery", 
-         "type": "Asset", "is_group": False, "parent_code": "1180", "level": 4},
-        
-        {"code": "1182", "name_ar": "خطوط الإنتاج الآلية", "name_en": "Automated Production Lines", 
-         "type": "Asset", "is_group": False, "parent_code": "1180", "level": 4},
-        
-        {"code": "1183", "name_ar": "معدات التحكم والجودة", "name_en": "Quality Control Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1180", "level": 4},
-        
-        {"code": "1184", "name_ar": "معدات التعبئة والتغليف", "name_en": "Packaging Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1180", "level": 4},
-        
-        {"code": "1185", "name_ar": "معدات المختبر والبحث", "name_en": "Laboratory & Research Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1180", "level": 4},
-        
-        # ============ الأصول المتداولة - التصنيع (تحت 1200) ============
-        {"code": "12120", "name_ar": "مخزونات التصنيع", "name_en": "Manufacturing Inventory", 
-         "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-        
-        {"code": "12121", "name_ar": "مخزون المواد الخام", "name_en": "Raw Materials Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12120", "level": 4},
-        
-        {"code": "12122", "name_ar": "مخزون إنتاج تحت التشغيل", "name_en": "Work in Process (WIP) Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12120", "level": 4},
-        
-        {"code": "12123", "name_ar": "مخزون المنتجات التامة", "name_en": "Finished Goods Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12120", "level": 4},
-        
-        {"code": "12124", "name_ar": "مخزون مواد التعبئة والتغليف", "name_en": "Packaging Materials Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12120", "level": 4},
-        
-        {"code": "12125", "name_ar": "مخزون قطع الغيار", "name_en": "Spare Parts Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12120", "level": 4},
-        
-        {"code": "12126", "name_ar": "مخزون المواد الوسيطة", "name_en": "Intermediate Materials Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12120", "level": 4},
-        
-        # ============ الخصوم - التصنيع (تحت 2100) ============
-        {"code": "2180", "name_ar": "موردو التصنيع", "name_en": "Manufacturing Suppliers", 
-         "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-        
-        {"code": "2181", "name_ar": "موردون مواد خام", "name_en": "Raw Materials Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2180", "level": 4},
-        
-        {"code": "2182", "name_ar": "موردون مواد تعبئة وتغليف", "name_en": "Packaging Materials Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2180", "level": 4},
-        
-        {"code": "2183", "name_ar": "موردون قطع غيار ومعدات", "name_en": "Spare Parts & Equipment Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2180", "level": 4},
-        
-        # ============ الإيرادات - التصنيع (تحت 4000) ============
-        {"code": "4400", "name_ar": "إيرادات التصنيع والإنتاج", "name_en": "Manufacturing & Production Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-        
-        {"code": "4410", "name_ar": "إيرادات مبيعات المنتجات المصنعة", "name_en": "Manufactured Products Sales", 
-         "type": "Revenue", "is_group": True, "parent_code": "4400", "level": 3},
-        
-        {"code": "4411", "name_ar": "إيرادات مبيعات منتجات تامة", "name_en": "Finished Products Sales", 
-         "type": "Revenue", "is_group": False, "parent_code": "4410", "level": 4},
-        
-        {"code": "4412", "name_ar": "إيرادات مبيعات قطع الغيار", "name_en": "Spare Parts Sales", 
-         "type": "Revenue", "is_group": False, "parent_code": "4410", "level": 4},
-        
-        {"code": "4413", "name_ar": "إيرادات مبيعات مواد وسيطة", "name_en": "Intermediate Materials Sales", 
-         "type": "Revenue", "is_group": False, "parent_code": "4410", "level": 4},
-        
-        {"code": "4420", "name_ar": "إيرادات عقود التصنيع", "name_en": "Contract Manufacturing Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4400", "level": 3},
-        
-        {"code": "4421", "name_ar": "إيرادات تصنيع حسب الطلب", "name_en": "Custom Manufacturing Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4420", "level": 4},
-        
-        {"code": "4422", "name_ar": "إيرادات تصنيع علامات تجارية خاصة", "name_en": "Private Label Manufacturing", 
-         "type": "Revenue", "is_group": False, "parent_code": "4420", "level": 4},
-        
-        {"code": "4430", "name_ar": "إيرادات الخدمات الصناعية", "name_en": "Industrial Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4400", "level": 3},
-        
-        {"code": "4431", "name_ar": "إيرادات خدمات تصنيعية", "name_en": "Manufacturing Services Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4430", "level": 4},
-        
-        {"code": "4432", "name_ar": "إيرادات خدمات صيانة صناعية", "name_en": "Industrial Maintenance Services", 
-         "type": "Revenue", "is_group": False, "parent_code": "4430", "level": 4},
-        
-        # ============ التكاليف - التصنيع (تحت 5000) ============
-        {"code": "5200", "name_ar": "تكاليف التصنيع والإنتاج", "name_en": "Manufacturing & Production Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5210", "name_ar": "تكاليف المواد المباشرة", "name_en": "Direct Materials Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5200", "level": 3},
-        
-        {"code": "5211", "name_ar": "تكلفة المواد الخام المستخدمة", "name_en": "Raw Materials Consumed", 
-         "type": "Expense", "is_group": False, "parent_code": "5210", "level": 4},
-        
-        {"code": "5212", "name_ar": "تكلفة مواد التعبئة والتغليف", "name_en": "Packaging Materials Cost", 
-         "type": "Expense", "is_group": False, "parent_code": "5210", "level": 4},
-        
-        {"code": "5213", "name_ar": "تكلفة المواد الوسيطة المستخدمة", "name_en": "Intermediate Materials Used", 
-         "type": "Expense", "is_group": False, "parent_code": "5210", "level": 4},
-        
-        {"code": "5220", "name_ar": "تكاليف العمالة المباشرة", "name_en": "Direct Labor Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5200", "level": 3},
-        
-        {"code": "5221", "name_ar": "تكلفة عمالة خط الإنتاج", "name_en": "Production Line Labor", 
-         "type": "Expense", "is_group": False, "parent_code": "5220", "level": 4},
-        
-        {"code": "5222", "name_ar": "تكلفة مشرفي الإنتاج", "name_en": "Production Supervisors", 
-         "type": "Expense", "is_group": False, "parent_code": "5220", "level": 4},
-        
-        {"code": "5223", "name_ar": "تكلفة فنيي الصيانة الإنتاجية", "name_en": "Production Maintenance Technicians", 
-         "type": "Expense", "is_group": False, "parent_code": "5220", "level": 4},
-        
-        {"code": "5230", "name_ar": "تكاليف الطاقة والتشغيل", "name_en": "Energy & Operation Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5200", "level": 3},
-        
-        {"code": "5231", "name_ar": "تكلفة الطاقة الكهربائية للإنتاج", "name_en": "Production Electricity Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5230", "level": 4},
-        
-        {"code": "5232", "name_ar": "تكلفة الوقود والمحروقات", "name_en": "Fuel & Combustion Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5230", "level": 4},
-        
-        {"code": "5233", "name_ar": "تكلفة المياه الصناعية", "name_en": "Industrial Water Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5230", "level": 4},
-        
-        {"code": "5234", "name_ar": "تكلفة الغاز والبخار الصناعي", "name_en": "Industrial Gas & Steam", 
-         "type": "Expense", "is_group": False, "parent_code": "5230", "level": 4},
-        
-        {"code": "5240", "name_ar": "مصاريف المصنع العامة", "name_en": "Factory Overhead", 
-         "type": "Expense", "is_group": True, "parent_code": "5200", "level": 3},
-        
-        {"code": "5241", "name_ar": "صيانة وتشغيل الآلات", "name_en": "Machinery Maintenance & Operation", 
-         "type": "Expense", "is_group": False, "parent_code": "5240", "level": 4},
-        
-        {"code": "5242", "name_ar": "مصاريف مراقبة الجودة", "name_en": "Quality Control Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5240", "level": 4},
-        
-        {"code": "5243", "name_ar": "مصاريف البحث والتطوير", "name_en": "Research & Development Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5240", "level": 4},
-        
-        {"code": "5244", "name_ar": "مصاريف السلامة الصناعية", "name_en": "Industrial Safety Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5240", "level": 4},
-        
-        {"code": "5245", "name_ar": "مصاريف النظافة والصيانة العامة", "name_en": "Cleaning & General Maintenance", 
-         "type": "Expense", "is_group": False, "parent_code": "5240", "level": 4},
-        
-        {"code": "5250", "name_ar": "إهلاك أصول التصنيع", "name_en": "Manufacturing Assets Depreciation", 
-         "type": "Expense", "is_group": True, "parent_code": "5200", "level": 3},
-        
-        {"code": "5251", "name_ar": "إهلاك آلات ومعدات الإنتاج", "name_en": "Production Equipment Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5250", "level": 4},
-        
-        {"code": "5252", "name_ar": "إهلاك خطوط الإنتاج الآلية", "name_en": "Automated Lines Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5250", "level": 4},
-        
-        {"code": "5253", "name_ar": "إهلاك معدات الجودة والقياس", "name_en": "Quality Equipment Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5250", "level": 4},
-        
-        # ============ المصروفات - التصنيع (تحت 5000) ============
-        {"code": "5320", "name_ar": "مصاريف إدارية - تصنيع", "name_en": "Administrative Expenses - Manufacturing", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5330", "name_ar": "مصاريف تسويق منتجات صناعية", "name_en": "Industrial Products Marketing", 
-         "type": "Expense", "is_group": True, "parent_code": "5320", "level": 3},
-        
-        {"code": "5331", "name_ar": "مصاريف مشاركة معارض صناعية", "name_en": "Industrial Exhibitions Participation", 
-         "type": "Expense", "is_group": False, "parent_code": "5330", "level": 4},
-        
-        {"code": "5332", "name_ar": "مصاريف عينات واختبارات تسويقية", "name_en": "Samples & Marketing Tests", 
-         "type": "Expense", "is_group": False, "parent_code": "5330", "level": 4},
-        
-        {"code": "5340", "name_ar": "مصاريف تدريب وتأهيل فني", "name_en": "Technical Training & Qualification", 
-         "type": "Expense", "is_group": True, "parent_code": "5320", "level": 3},
-        
-        {"code": "5341", "name_ar": "مصاريف تدريب عمالة إنتاجية", "name_en": "Production Labor Training", 
-         "type": "Expense", "is_group": False, "parent_code": "5340", "level": 4},
-        
-        {"code": "5342", "name_ar": "مصاريف دورات تقنية متخصصة", "name_en": "Specialized Technical Courses", 
-         "type": "Expense", "is_group": False, "parent_code": "5340", "level": 4},
-        
-        {"code": "5350", "name_ar": "مصاريف تراخيص وشهادات جودة", "name_en": "Licenses & Quality Certificates", 
-         "type": "Expense", "is_group": True, "parent_code": "5320", "level": 3},
-        
-        {"code": "5351", "name_ar": "مصاريف شهادات الجودة الدولية", "name_en": "International Quality Certificates", 
-         "type": "Expense", "is_group": False, "parent_code": "5350", "level": 4},
-        
-        {"code": "5352", "name_ar": "مصاريف تراخيص تشغيل صناعية", "name_en": "Industrial Operation Licenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5350", "level": 4},
-    ]
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_manufacturing_extensions']))
     
     @classmethod
-    def get_healthcare_extensions(cls) -> List[Dict]:
+    def get_healthcare_extensions(cls) -> List[AccountTemplate]:
         """صحة وعناية شخصية"""
-        return [
-        # ============ الأصول الثابتة - الصحية (تحت 1100) ============
-        {"code": "1190", "name_ar": "الأصول الطبية والصحية", "name_en": "Medical & Healthcare Assets", 
-         "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-        
-        {"code": "1191", "name_ar": "الأجهزة والمعدات الطبية", "name_en": "Medical Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1190", "level": 4},
-        
-        {"code": "1192", "name_ar": "معدات المعامل الطبية", "name_en": "Medical Laboratory Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1190", "level": 4},
-        
-        {"code": "1193", "name_ar": "معدات الأشعة والتشخيص", "name_en": "Radiology & Diagnostic Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1190", "level": 4},
-        
-        {"code": "1194", "name_ar": "معدات العمليات الجراحية", "name_en": "Surgical Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1190", "level": 4},
-        
-        {"code": "1195", "name_ar": "معدات وأثاث العيادات", "name_en": "Clinic Furniture & Equipment", 
-         "type": "Asset", "is_group": False, "parent_code": "1190", "level": 4},
-        
-        # ============ الأصول المتداولة - الصحية (تحت 1200) ============
-        {"code": "12130", "name_ar": "مخزونات صحية وطبية", "name_en": "Healthcare & Medical Inventory", 
-         "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-        
-        {"code": "12131", "name_ar": "مخزون الأدوية", "name_en": "Pharmaceutical Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12130", "level": 4},
-        
-        {"code": "12132", "name_ar": "مخزون المستلزمات الطبية", "name_en": "Medical Supplies Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12130", "level": 4},
-        
-        {"code": "12133", "name_ar": "مخزون مواد التعقيم والتطهير", "name_en": "Sterilization & Disinfection Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12130", "level": 4},
-        
-        {"code": "12134", "name_ar": "مخزون المستهلكات الطبية", "name_en": "Medical Consumables Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12130", "level": 4},
-        
-        # ============ الخصوم - الصحية (تحت 2100) ============
-        {"code": "2190", "name_ar": "موردو الخدمات الصحية", "name_en": "Healthcare Services Suppliers", 
-         "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-        
-        {"code": "2191", "name_ar": "موردون أدوية ومستلزمات طبية", "name_en": "Pharmaceutical & Medical Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2190", "level": 4},
-        
-        {"code": "2192", "name_ar": "موردون معدات وأجهزة طبية", "name_en": "Medical Equipment Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2190", "level": 4},
-        
-        {"code": "2193", "name_ar": "موردون خدمات معامل وأشعة", "name_en": "Lab & Radiology Services Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "2190", "level": 4},
-        
-        # ============ الإيرادات - الصحية (تحت 4000) ============
-        {"code": "4500", "name_ar": "إيرادات الخدمات الصحية", "name_en": "Healthcare Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-        
-        {"code": "4510", "name_ar": "إيرادات الخدمات الطبية", "name_en": "Medical Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4500", "level": 3},
-        
-        {"code": "4511", "name_ar": "إيرادات الكشفيات والاستشارات الطبية", "name_en": "Medical Consultations Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4510", "level": 4},
-        
-        {"code": "4512", "name_ar": "إيرادات العمليات الجراحية", "name_en": "Surgical Procedures Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4510", "level": 4},
-        
-        {"code": "4513", "name_ar": "إيرادات العيادات الخارجية", "name_en": "Outpatient Clinics Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4510", "level": 4},
-        
-        {"code": "4514", "name_ar": "إيرادات الرعاية الطارئة", "name_en": "Emergency Care Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4510", "level": 4},
-        
-        {"code": "4520", "name_ar": "إيرادات الخدمات التشخيصية", "name_en": "Diagnostic Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4500", "level": 3},
-        
-        {"code": "4521", "name_ar": "إيرادات التحاليل المعملية", "name_en": "Lab Tests Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4520", "level": 4},
-        
-        {"code": "4522", "name_ar": "إيرادات الأشعة والتشخيص", "name_en": "Radiology & Diagnostic Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4520", "level": 4},
-        
-        {"code": "4523", "name_ar": "إيرادات فحوصات خاصة", "name_en": "Special Examinations Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4520", "level": 4},
-        
-        {"code": "4530", "name_ar": "إيرادات الصيدلية والمستلزمات", "name_en": "Pharmacy & Supplies Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4500", "level": 3},
-        
-        {"code": "4531", "name_ar": "إيرادات توريد الأدوية", "name_en": "Pharmacy Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4530", "level": 4},
-        
-        {"code": "4532", "name_ar": "إيرادات مستلزمات طبية", "name_en": "Medical Supplies Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4530", "level": 4},
-        
-        {"code": "4533", "name_ar": "إيرادات منتجات العناية الشخصية", "name_en": "Personal Care Products Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4530", "level": 4},
-        
-        {"code": "4540", "name_ar": "إيرادات الخدمات المساعدة", "name_en": "Ancillary Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4500", "level": 3},
-        
-        {"code": "4541", "name_ar": "إيرادات الإقامة والرعاية", "name_en": "Accommodation & Care Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4540", "level": 4},
-        
-        {"code": "4542", "name_ar": "إيرادات التأهيل والعلاج الطبيعي", "name_en": "Rehabilitation & Physiotherapy Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4540", "level": 4},
-        
-        {"code": "4543", "name_ar": "إيرادات التغذية والحميات", "name_en": "Nutrition & Diet Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4540", "level": 4},
-        
-        # ============ التكاليف - الصحية (تحت 5000) ============
-        {"code": "5360", "name_ar": "تكاليف الخدمات الصحية", "name_en": "Healthcare Services Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5370", "name_ar": "تكاليف الأدوية والمستلزمات", "name_en": "Drugs & Supplies Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5360", "level": 3},
-        
-        {"code": "5371", "name_ar": "تكلفة الأدوية المستخدمة", "name_en": "Pharmaceuticals Consumed", 
-         "type": "Expense", "is_group": False, "parent_code": "5370", "level": 4},
-        
-        {"code": "5372", "name_ar": "تكلفة المستلزمات الطبية", "name_en": "Medical Supplies Cost", 
-         "type": "Expense", "is_group": False, "parent_code": "5370", "level": 4},
-        
-        {"code": "5373", "name_ar": "تكلفة مواد التعقيم والتطهير", "name_en": "Sterilization & Disinfection Cost", 
-         "type": "Expense", "is_group": False, "parent_code": "5370", "level": 4},
-        
-        {"code": "5380", "name_ar": "تكاليف الخدمات الخارجية", "name_en": "External Services Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5360", "level": 3},
-        
-        {"code": "5381", "name_ar": "تكلفة خدمات معامل خارجية", "name_en": "External Lab Services", 
-         "type": "Expense", "is_group": False, "parent_code": "5380", "level": 4},
-        
-        {"code": "5382", "name_ar": "تكلفة خدمات أشعة خارجية", "name_en": "External Radiology Services", 
-         "type": "Expense", "is_group": False, "parent_code": "5380", "level": 4},
-        
-        {"code": "5383", "name_ar": "تكلفة استشارات طبية خارجية", "name_en": "External Medical Consultations", 
-         "type": "Expense", "is_group": False, "parent_code": "5380", "level": 4},
-        
-        # ============ المصروفات - الصحية (تحت 5000) ============
-        {"code": "5400", "name_ar": "مصاريف تشغيلية - صحية", "name_en": "Operational Expenses - Healthcare", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5410", "name_ar": "رواتب ومكافآت الكوادر الصحية", "name_en": "Healthcare Staff Salaries & Bonuses", 
-         "type": "Expense", "is_group": True, "parent_code": "5400", "level": 3},
-        
-        {"code": "5411", "name_ar": "رواتب الأطباء والاستشاريين", "name_en": "Doctors & Consultants Salaries", 
-         "type": "Expense", "is_group": False, "parent_code": "5410", "level": 4},
-        
-        {"code": "5412", "name_ar": "رواتب التمريض والفنيين", "name_en": "Nursing & Technician Salaries", 
-         "type": "Expense", "is_group": False, "parent_code": "5410", "level": 4},
-        
-        {"code": "5413", "name_ar": "رواتب الإداريين والموظفين", "name_en": "Administrative & Staff Salaries", 
-         "type": "Expense", "is_group": False, "parent_code": "5410", "level": 4},
-        
-        {"code": "5414", "name_ar": "مكافآت ومزايا العاملين", "name_en": "Employee Bonuses & Benefits", 
-         "type": "Expense", "is_group": False, "parent_code": "5410", "level": 4},
-        
-        {"code": "5420", "name_ar": "مصاريف التشغيل والصيانة", "name_en": "Operation & Maintenance Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5400", "level": 3},
-        
-        {"code": "5421", "name_ar": "مصاريف التعقيم والصرف الصحي", "name_en": "Sterilization & Sanitation", 
-         "type": "Expense", "is_group": False, "parent_code": "5420", "level": 4},
-        
-        {"code": "5422", "name_ar": "مصاريف صيانة الأجهزة الطبية", "name_en": "Medical Equipment Maintenance", 
-         "type": "Expense", "is_group": False, "parent_code": "5420", "level": 4},
-        
-        {"code": "5423", "name_ar": "مصاريف نفايات طبية", "name_en": "Medical Waste Disposal", 
-         "type": "Expense", "is_group": False, "parent_code": "5420", "level": 4},
-        
-        {"code": "5430", "name_ar": "مصاريف التأمين والامتثال", "name_en": "Insurance & Compliance Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5400", "level": 3},
-        
-        {"code": "5431", "name_ar": "مصاريف التأمين الطبي والمسؤولية", "name_en": "Medical Insurance & Liability", 
-         "type": "Expense", "is_group": False, "parent_code": "5430", "level": 4},
-        
-        {"code": "5432", "name_ar": "مصاريف التراخيص والاعتمادات", "name_en": "Licenses & Accreditations", 
-         "type": "Expense", "is_group": False, "parent_code": "5430", "level": 4},
-        
-        {"code": "5433", "name_ar": "مصاريف تدريب وتأهيل طبي", "name_en": "Medical Training & Qualification", 
-         "type": "Expense", "is_group": False, "parent_code": "5430", "level": 4},
-        
-        {"code": "5440", "name_ar": "إهلاك الأصول الصحية", "name_en": "Healthcare Assets Depreciation", 
-         "type": "Expense", "is_group": True, "parent_code": "5400", "level": 3},
-        
-        {"code": "5441", "name_ar": "إهلاك الأجهزة والمعدات الطبية", "name_en": "Medical Equipment Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5440", "level": 4},
-        
-        {"code": "5442", "name_ar": "إهلاك معدات المعامل والأشعة", "name_en": "Lab & Radiology Equipment Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5440", "level": 4},
-        
-        {"code": "5443", "name_ar": "إهلاك أثاث وتجهيزات العيادات", "name_en": "Clinic Furniture Depreciation", 
-         "type": "Expense", "is_group": False, "parent_code": "5440", "level": 4},
-    ]
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_healthcare_extensions']))
     
     @classmethod
-    def get_retail_ecommerce_extensions(cls) -> List[Dict]:
+    def get_retail_ecommerce_extensions(cls) -> List[AccountTemplate]:
         """تجزئة وتجارة إلكترونية"""
-        return [
-        # ============ الأصول المتداولة - التجزئة (تحت 1200) ============
-        {"code": "12140", "name_ar": "مخزونات التجزئة والتجارة الإلكترونية", "name_en": "Retail & E-commerce Inventory", 
-         "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-        
-        {"code": "12141", "name_ar": "مخزون المنتجات للبيع", "name_en": "Merchandise Inventory for Sale", 
-         "type": "Asset", "is_group": False, "parent_code": "12140", "level": 4},
-        
-        {"code": "12142", "name_ar": "مخزون مواد التغليف والشحن", "name_en": "Shipping & Packaging Materials", 
-         "type": "Asset", "is_group": False, "parent_code": "12140", "level": 4},
-        
-        {"code": "12143", "name_ar": "مخزون المنتجات الموسمية", "name_en": "Seasonal Products Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12140", "level": 4},
-        
-        {"code": "12144", "name_ar": "مخزون البضائع الجديدة", "name_en": "New Arrivals Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12140", "level": 4},
-        
-        {"code": "12145", "name_ar": "مخزون العروض والخصومات", "name_en": "Promotional Items Inventory", 
-         "type": "Asset", "is_group": False, "parent_code": "12140", "level": 4},
-        
-        # ============ الخصوم - التجزئة (تحت 2100) ============
-        {"code": "21100", "name_ar": "موردو التجزئة والتجارة الإلكترونية", "name_en": "Retail & E-commerce Suppliers", 
-         "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-        
-        {"code": "21110", "name_ar": "موردون منتجات تجزئة", "name_en": "Retail Products Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "21100", "level": 4},
-        
-        {"code": "21120", "name_ar": "موردون مواد تعبئة وتغليف", "name_en": "Packaging Materials Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "21100", "level": 4},
-        
-        {"code": "21130", "name_ar": "موردون خدمات لوجستية", "name_en": "Logistics Services Suppliers", 
-         "type": "Liability", "is_group": False, "parent_code": "21100", "level": 4},
-        
-        # ============ الإيرادات - التجزئة (تحت 4000) ============
-        {"code": "4600", "name_ar": "إيرادات التجزئة والتجارة الإلكترونية", "name_en": "Retail & E-commerce Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-        
-        {"code": "4610", "name_ar": "إيرادات مبيعات التجزئة التقليدية", "name_en": "Traditional Retail Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4600", "level": 3},
-        
-        {"code": "4611", "name_ar": "إيرادات مبيعات التجزئة المباشرة", "name_en": "Direct Retail Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4610", "level": 4},
-        
-        {"code": "4612", "name_ar": "إيرادات مبيعات الفروع", "name_en": "Branch Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4610", "level": 4},
-        
-        {"code": "4613", "name_ar": "إيرادات مبيعات الجملة", "name_en": "Wholesale Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4610", "level": 4},
-        
-        {"code": "4620", "name_ar": "إيرادات المبيعات عبر الإنترنت", "name_en": "Online Sales Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4600", "level": 3},
-        
-        {"code": "4621", "name_ar": "إيرادات المبيعات عبر الموقع الإلكتروني", "name_en": "Website Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4620", "level": 4},
-        
-        {"code": "4622", "name_ar": "إيرادات المبيعات عبر التطبيقات", "name_en": "Mobile App Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4620", "level": 4},
-        
-        {"code": "4623", "name_ar": "إيرادات المبيعات عبر منصات التواصل", "name_en": "Social Media Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4620", "level": 4},
-        
-        {"code": "4624", "name_ar": "إيرادات المبيعات عبر المتاجر الإلكترونية", "name_en": "E-marketplace Sales Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4620", "level": 4},
-        
-        {"code": "4630", "name_ar": "إيرادات الخدمات والعمليات", "name_en": "Services & Operations Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4600", "level": 3},
-        
-        {"code": "4631", "name_ar": "إيرادات الشحن والخدمات اللوجستية", "name_en": "Shipping & Logistics Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4630", "level": 4},
-        
-        {"code": "4632", "name_ar": "إيرادات خدمات التركيب والتوصيل", "name_en": "Installation & Delivery Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4630", "level": 4},
-        
-        {"code": "4633", "name_ar": "إيرادات خدمات ما بعد البيع", "name_en": "After-sales Services Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4630", "level": 4},
-        
-        {"code": "4634", "name_ar": "إيرادات خدمات الاشتراكات", "name_en": "Subscription Services Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4630", "level": 4},
-        
-        # ============ التكاليف - التجزئة (تحت 5000) ============
-        {"code": "5450", "name_ar": "تكاليف التجزئة والتجارة الإلكترونية", "name_en": "Retail & E-commerce Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-        
-        {"code": "5460", "name_ar": "تكلفة البضاعة المباعة (COGS)", "name_en": "Cost of Goods Sold (COGS)", 
-         "type": "Expense", "is_group": True, "parent_code": "5450", "level": 3},
-        
-        {"code": "5461", "name_ar": "تكلفة المنتجات المباعة", "name_en": "Products Cost of Sales", 
-         "type": "Expense", "is_group": False, "parent_code": "5460", "level": 4},
-        
-        {"code": "5462", "name_ar": "تكاليف مرتجعات المبيعات", "name_en": "Sales Returns & Allowances", 
-         "type": "Expense", "is_group": False, "parent_code": "5460", "level": 4},
-        
-        {"code": "5463", "name_ar": "تكاليف الخصومات التجارية", "name_en": "Trade Discounts", 
-         "type": "Expense", "is_group": False, "parent_code": "5460", "level": 4},
-        
-        {"code": "5470", "name_ar": "تكاليف الشحن والتوصيل", "name_en": "Shipping & Delivery Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5450", "level": 3},
-        
-        {"code": "5471", "name_ar": "تكاليف التوصيل الداخلي", "name_en": "Local Delivery Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5470", "level": 4},
-        
-        {"code": "5472", "name_ar": "تكاليف الشحن الدولي", "name_en": "International Shipping Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5470", "level": 4},
-        
-        {"code": "5473", "name_ar": "تكالخدمات شركات التوصيل", "name_en": "Courier Services Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5470", "level": 4},
-        
-        {"code": "5480", "name_ar": "تكاليف التغليف والتعبئة", "name_en": "Packaging & Packing Costs", 
-         "type": "Expense", "is_group": True, "parent_code": "5450", "level": 3},
-        
-        {"code": "5481", "name_ar": "تكاليف مواد التغليف", "name_en": "Packaging Materials Costs", 
-         "type": "Expense", "is_group": False, "parent_code": "5480", "level": 4},
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_retail_ecommerce_extensions']))
+    
+    @classmethod
+    def get_finance_banking_extensions(cls) -> List[AccountTemplate]:
+        """خدمات مالية وبنوك"""
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_finance_banking_extensions']))
+    
+    @classmethod
+    def get_education_extensions(cls) -> List[AccountTemplate]:
+        """التعليم والتدريب"""
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_education_extensions']))
+    
+    @classmethod
+    def get_logistics_extensions(cls) -> List[AccountTemplate]:
+        """النقل والخدمات اللوجستية"""
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_logistics_extensions']))
+    
+    @classmethod
+    def get_energy_extensions(cls) -> List[AccountTemplate]:
+        """الطاقة والبيئة"""
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_energy_extensions']))
+    
+    
+    @classmethod
+    def get_hospitality_extensions(cls) -> List[AccountTemplate]:
+        """الضيافة والسياحة"""
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_hospitality_extensions']))
+    
+    
+    @classmethod
+    def get_media_extensions(cls) -> List[AccountTemplate]:
+        """وسائل الإعلام والترفيه"""
+        return list(cls._load_template_file(cls.EXTENSION_FILES['get_media_extensions']))
+
+    # محتوى ملفات القوالب بعد قراءتها مفتاحه اسم الملف، ونسخة كل ملف
+    _template_files: Dict[str, Tuple[AccountTemplate, ...]] = {}
+    _template_versions: Dict[str, int] = {}
+
+    @classmethod
+    def _load_template_file(cls, name: str) -> Tuple[AccountTemplate, ...]:
+        """قراءة ملف قالب من coa_templates/ مرة واحدة لكل عملية"""
+        accounts = cls._template_files.get(name)
+        if accounts is not None:
+            return accounts
+        
+        with open(TEMPLATES_DIR / f'{name}.json', encoding='utf-8') as template_file:
+            data = json.load(template_file)
+        fields = data['fields']
+        accounts = tuple(AccountTemplate(**dict(zip(fields, row))) for row in data['accounts'])
+        cls._template_versions[name] = data.get('version', 0)
+        cls._template_files[name] = accounts
+        return accounts
+
+    # ==================== وسوم الحسابات الافتراضية ====================
+    # كل وسم يُعلَّم به حساب واحد في الإطار الموحد، فيُرجع كل إنشاء (ويُسجِّل للمشروع) خريطة كاملة
+    DEFAULT_ACCOUNT_TAGS: Tuple[str, ...] = (
+        'treasury',              # الخزينة الأساسية
+        'customers',             # العملاء
+        'cash_short_over',       # عجز وزيادة الصندوق
+        'purchases',             # المشتريات
+        'suppliers',             # الموردون
+        'opening_balance',       # الأرصدة الافتتاحية
+        'vat',                   # القيمة المضافة المطلوبة
+        'sales',                 # المبيعات
+        'sales_returns',         # مردودات المبيعات
+        'cogs',                  # تكلفة المبيعات
+        'discount_allowed',      # خصم مسموح به
+        'inventory_adjustment',  # عجز وزيادة المخزون
+    )
+
+    # ==================== ربط التخصصات بالقوالب ====================
+    # كل تخصص يشير إلى اسم دالة الإضافات الخاصة بمجموعته
+    INDUSTRY_GROUPS: Dict[str, str] = {
+        # التكنولوجيا والبرمجيات
+        'software_dev': 'get_tech_software_extensions',
+        'it_services': 'get_tech_software_extensions',
+        'cybersecurity': 'get_tech_software_extensions',
+        'data_analytics': 'get_tech_software_extensions',
+        'data_science': 'get_tech_software_extensions',
+        'cloud_services': 'get_tech_software_extensions',
+        'telecom': 'get_tech_software_extensions',
+        'saas': 'get_tech_software_extensions',
+        'paas': 'get_tech_software_extensions',
+        'iaas': 'get_tech_software_extensions',
+        'hardware': 'get_tech_software_extensions',
+        'gaming': 'get_tech_software_extensions',
+        'mobile_apps': 'get_tech_software_extensions',
+        'web_development': 'get_tech_software_extensions',
+        'ai_ml': 'get_tech_software_extensions',
         
-        {"code": "5482", "name_ar": "تكاليف أدوات التعبئة", "name_en": "Packing Tools & Supplies", 
-         "type": "Expense", "is_group": False, "parent_code": "5480", "level": 4},
+        # الإنشاءات والمقاولات
+        'construction': 'get_construction_extensions',
+        'architecture': 'get_construction_extensions',
+        'civil_engineering': 'get_construction_extensions',
+        'interior_design': 'get_construction_extensions',
+        'building_materials': 'get_construction_extensions',
+        'mep': 'get_construction_extensions',
+        'infrastructure': 'get_construction_extensions',
+        'real_estate_dev': 'get_construction_extensions',
+        'property_management': 'get_construction_extensions',
+        'facility_management': 'get_construction_extensions',
+        'urban_planning': 'get_construction_extensions',
         
-        {"code": "5483", "name_ar": "تكاليف التغليف الخاص والهدايا", "name_en": "Special Packaging & Gift Wrapping", 
-         "type": "Expense", "is_group": False, "parent_code": "5480", "level": 4},
+        # التصنيع والإنتاج
+        'automotive': 'get_manufacturing_extensions',
+        'textile': 'get_manufacturing_extensions',
+        'food_production': 'get_manufacturing_extensions',
+        'chemicals': 'get_manufacturing_extensions',
+        'pharmaceuticals': 'get_manufacturing_extensions',
+        'machinery': 'get_manufacturing_extensions',
+        'plastics': 'get_manufacturing_extensions',
+        'electronics_mfg': 'get_manufacturing_extensions',
+        'furniture_mfg': 'get_manufacturing_extensions',
+        'metal_fabrication': 'get_manufacturing_extensions',
+        'packaging_mfg': 'get_manufacturing_extensions',
+        'aerospace': 'get_manufacturing_extensions',
+        'shipbuilding': 'get_manufacturing_extensions',
         
-        # ============ المصروفات - التجزئة (تحت 5000) ============
-        {"code": "5500", "name_ar": "مصاريف تشغيلية - تجزئة وإلكترونية", "name_en": "Operational Expenses - Retail & E-commerce", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
+        # الصحة والعناية الشخصية
+        'hospital': 'get_healthcare_extensions',
+        'pharmacy': 'get_healthcare_extensions',
+        'dental': 'get_healthcare_extensions',
+        'medical_labs': 'get_healthcare_extensions',
+        'fitness': 'get_healthcare_extensions',
+        'beauty_salon': 'get_healthcare_extensions',
+        'cosmetics': 'get_healthcare_extensions',
+        'wellness': 'get_healthcare_extensions',
+        'spa': 'get_healthcare_extensions',
+        'nutrition': 'get_healthcare_extensions',
+        'mental_health': 'get_healthcare_extensions',
+        'elderly_care': 'get_healthcare_extensions',
+        'veterinary': 'get_healthcare_extensions',
+        'medical_devices': 'get_healthcare_extensions',
         
-        {"code": "5510", "name_ar": "مصاريف التسويق والإعلان", "name_en": "Marketing & Advertising Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5500", "level": 3},
+        # التجارة والتجزئة
+        'ecommerce': 'get_retail_ecommerce_extensions',
+        'retail': 'get_retail_ecommerce_extensions',
+        'fashion_retail': 'get_retail_ecommerce_extensions',
+        'supermarket': 'get_retail_ecommerce_extensions',
+        'electronics_retail': 'get_retail_ecommerce_extensions',
+        'home_goods': 'get_retail_ecommerce_extensions',
+        'jewelry': 'get_retail_ecommerce_extensions',
+        'automotive_sales': 'get_retail_ecommerce_extensions',
+        'wholesale': 'get_retail_ecommerce_extensions',
+        'bookstore': 'get_retail_ecommerce_extensions',
+        'sports_retail': 'get_retail_ecommerce_extensions',
+        'toy_store': 'get_retail_ecommerce_extensions',
+        'pet_supplies': 'get_retail_ecommerce_extensions',
+        'luxury_retail': 'get_retail_ecommerce_extensions',
         
-        {"code": "5511", "name_ar": "مصاريف التسويق الرقمي والإعلانات", "name_en": "Digital Marketing & Ads", 
-         "type": "Expense", "is_group": False, "parent_code": "5510", "level": 4},
+        # الخدمات المالية والمصرفية
+        'banking': 'get_finance_banking_extensions',
+        'investment': 'get_finance_banking_extensions',
+        'insurance': 'get_finance_banking_extensions',
+        'accounting': 'get_finance_banking_extensions',
+        'fintech': 'get_finance_banking_extensions',
+        'legal': 'get_finance_banking_extensions',
+        'consulting': 'get_finance_banking_extensions',
+        'auditing': 'get_finance_banking_extensions',
+        'venture_capital': 'get_finance_banking_extensions',
+        'private_equity': 'get_finance_banking_extensions',
+        'stock_brokerage': 'get_finance_banking_extensions',
+        'microfinance': 'get_finance_banking_extensions',
+        'crowdfunding': 'get_finance_banking_extensions',
         
-        {"code": "5512", "name_ar": "مصاريف التسويق التقليدي", "name_en": "Traditional Marketing", 
-         "type": "Expense", "is_group": False, "parent_code": "5510", "level": 4},
+        # التعليم والتدريب
+        'education': 'get_education_extensions',
+        'training': 'get_education_extensions',
+        'e_learning': 'get_education_extensions',
+        'language_school': 'get_education_extensions',
+        'technical_training': 'get_education_extensions',
+        'university': 'get_education_extensions',
+        'research_institute': 'get_education_extensions',
         
-        {"code": "5513", "name_ar": "مصاريف العروض الترويجية", "name_en": "Promotional Campaigns", 
-         "type": "Expense", "is_group": False, "parent_code": "5510", "level": 4},
+        # النقل والخدمات اللوجستية
+        'logistics': 'get_logistics_extensions',
+        'transportation': 'get_logistics_extensions',
+        'shipping': 'get_logistics_extensions',
+        'freight': 'get_logistics_extensions',
+        'warehousing': 'get_logistics_extensions',
+        'courier': 'get_logistics_extensions',
+        'aviation': 'get_logistics_extensions',
         
-        {"code": "5514", "name_ar": "مصاريف التأثير والتسويق بالمحتوى", "name_en": "Influencer & Content Marketing", 
-         "type": "Expense", "is_group": False, "parent_code": "5510", "level": 4},
+        # الضيافة والسياحة
+        'hospitality': 'get_hospitality_extensions',
+        'tourism': 'get_hospitality_extensions',
+        'hotel': 'get_hospitality_extensions',
+        'restaurant': 'get_hospitality_extensions',
+        'catering': 'get_hospitality_extensions',
+        'event_planning': 'get_hospitality_extensions',
+        'travel_agency': 'get_hospitality_extensions',
         
-        {"code": "5520", "name_ar": "مصاريف العمليات الرقمية", "name_en": "Digital Operations Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5500", "level": 3},
+        # الطاقة والبيئة
+        'energy': 'get_energy_extensions',
+        'renewable_energy': 'get_energy_extensions',
+        'oil_gas': 'get_energy_extensions',
+        'environmental': 'get_energy_extensions',
+        'waste_management': 'get_energy_extensions',
+        'water_treatment': 'get_energy_extensions',
         
-        {"code": "5521", "name_ar": "مصاريف عمليات الدفع الإلكتروني", "name_en": "Payment Gateway Fees", 
-         "type": "Expense", "is_group": False, "parent_code": "5520", "level": 4},
+        # وسائل الإعلام والترفيه
+        'media': 'get_media_extensions',
+        'entertainment': 'get_media_extensions',
+        'publishing': 'get_media_extensions',
+        'broadcasting': 'get_media_extensions',
+        'film_production': 'get_media_extensions',
+        'music': 'get_media_extensions',
+        'gaming_entertainment': 'get_media_extensions',
+    }
+
+    # القوالب المُجمّعة (الإطار الموحد + الإضافات) مفتاحها اسم دالة الإضافات
+    # تُبنى مرة واحدة عند أول استخدام وتتشاركها كل التخصصات في نفس المجموعة
+    _compiled_templates: Dict[Optional[str], CompiledTemplate] = {}
+
+    @classmethod
+    def _compile_template(cls, extension_name: Optional[str],
+                          company_size: Optional[str] = None) -> CompiledTemplate:
+        """بناء القالب المُجمّع لمجموعة تخصص (وملف حجم) وتخزينه مؤقتاً"""
+        if company_size:
+            return cls._compile_sized_template(extension_name, company_size)
+        compiled = cls._compiled_templates.get(extension_name)
+        if compiled is not None:
+            return compiled
+        
+        bundle = cls._template_bundle
+        if bundle is not None:
+            compiled = bundle.template(extension_name)
+            if compiled is not None:
+                if bundle.is_validated(extension_name):
+                    cls._validated_fingerprints.add(compiled.fingerprint)
+                cls._compiled_templates[extension_name] = compiled
+                return compiled
+        
+        extensions: List[AccountTemplate] = []
+        if extension_name:
+            extensions = getattr(cls, extension_name)()
+        
+        framework = tuple(cls.STANDARD_FRAMEWORK)
+        version = str(cls._template_versions.get('standard_framework', 0))
+        if extension_name:
+            version += f".{cls._template_versions.get(cls.EXTENSION_FILES[extension_name], 0)}"
+        compiled = CompiledTemplate(
+            extension_name,
+            framework,
+            tuple(AccountTemplate.from_dict(account) for account in extensions),
+            version,
+        )
+        cls._compiled_templates[extension_name] = compiled
+        return compiled
+
+    # ==================== أحجام الشركات ====================
+    DEFAULT_COMPANY_SIZE = 'medium'
+    # ملفات الأحجام من coa_templates/size_profiles.json والقوالب المُجمّعة مفتاحها (اسم دالة الإضافات، الحجم)
+    _size_profiles: Optional[Dict[str, Dict]] = None
+    _size_profiles_version = 0
+    _sized_templates: Dict[Tuple[Optional[str], str], CompiledTemplate] = {}
+
+    @classmethod
+    def get_size_profiles(cls) -> Dict[str, Dict]:
+        """
+        ملفات أحجام الشركات (تُقرأ مرة واحدة لكل عملية)
         
-        {"code": "5522", "name_ar": "مصاريف منصات التجارة الإلكترونية", "name_en": "E-commerce Platform Fees", 
-         "type": "Expense", "is_group": False, "parent_code": "5520", "level": 4},
+        كل ملف يحدد: prune (أكواد فروع تُحذف بكاملها)، collapse_level (حذف حسابات التخصص
+        الأعمق من هذا المستوى، والمجموعة التي تفقد كل أبنائها تصبح حساباً فرعياً)،
+        و split مع departments (تقسيم الحسابات الفرعية تحت هذه المجموعات على الأقسام)
+        """
+        if cls._size_profiles is None:
+            with open(TEMPLATES_DIR / 'size_profiles.json', encoding='utf-8') as profiles_file:
+                data = json.load(profiles_file)
+            cls._size_profiles_version = data.get('version', 0)
+            cls._size_profiles = data['profiles']
+        return cls._size_profiles
+
+    @classmethod
+    def _resolve_company_size(cls, company_size: Optional[str]) -> Optional[str]:
+        """اسم ملف الحجم المطبق، أو None للقالب كما هو (الحجم المتوسط أو حجم غير معروف)"""
+        if not company_size or company_size == cls.DEFAULT_COMPANY_SIZE:
+            return None
+        profiles = cls.get_size_profiles()
+        if company_size not in profiles:
+            logger.warning("⚠️ حجم الشركة '%s' غير معروف، استخدام القالب الكامل", company_size)
+            return None
+        return company_size if profiles[company_size] else None
+
+    @classmethod
+    def _compile_sized_template(cls, extension_name: Optional[str], company_size: str) -> CompiledTemplate:
+        """تطبيق ملف الحجم على القالب المُجمّع للمجموعة (مرة واحدة لكل (مجموعة، حجم))"""
+        key = (extension_name, company_size)
+        compiled = cls._sized_templates.get(key)
+        if compiled is not None:
+            return compiled
+        
+        profiles = cls.get_size_profiles()
+        if company_size not in profiles:
+            raise ValueError(f"حجم الشركة غير معروف: {company_size}")
+        template = cls._compile_template(extension_name)
+        framework, extensions = cls._apply_size_profile(template, profiles[company_size])
+        compiled = CompiledTemplate(
+            extension_name, framework, extensions,
+            f"{template.version}/{company_size}.{cls._size_profiles_version}", company_size,
+        )
+        cls._sized_templates[key] = compiled
+        return compiled
+
+    @staticmethod
+    def _apply_size_profile(template: CompiledTemplate,
+                            profile: Dict) -> Tuple[Tuple[AccountTemplate, ...], Tuple[AccountTemplate, ...]]:
+        """
+        حسابات القالب بعد تطبيق ملف الحجم
         
-        {"code": "5523", "name_ar": "مصاريف الاستضافة والحلول التقنية", "name_en": "Hosting & Technical Solutions", 
-         "type": "Expense", "is_group": False, "parent_code": "5520", "level": 4},
+        Returns:
+            (حسابات الإطار الموحد، حسابات التخصص مع حسابات الأقسام المضافة)
+        """
+        accounts = template.accounts
+        parent_index = template.parent_index
+        framework_count = len(accounts) - len(template.extensions)
+        pruned = set(profile.get('prune', ()))
+        collapse_level = profile.get('collapse_level')
+        
+        # 1. الحذف بالترتيب الطوبولوجي (الأب قبل الابن) فيُحذف الفرع بكامله
+        removed = [False] * len(accounts)
+        for index in template.order:
+            parent = parent_index[index]
+            removed[index] = (
+                accounts[index].code in pruned
+                or (parent >= 0 and removed[parent])
+                or (collapse_level is not None and index >= framework_count
+                    and template.levels[index] > collapse_level)
+            )
+        had_children, has_children = set(), set()
+        for index, parent in enumerate(parent_index):
+            if parent >= 0:
+                had_children.add(parent)
+                if not removed[index]:
+                    has_children.add(parent)
+        
+        # 2. طي مجموعات التخصص التي فقدت كل أبنائها، وتقسيم الحسابات الفرعية على الأقسام
+        departments = profile.get('departments', ())
+        split = set(profile.get('split', ()))
+        framework, extensions, added = [], [], []
+        for index, account in enumerate(accounts):
+            if removed[index]:
+                continue
+            parent = parent_index[index]
+            if index >= framework_count and index in had_children and index not in has_children:
+                account = AccountTemplate.from_dict(dict(account, is_group=False))
+            elif (departments and not account.is_group and not account.tag
+                  and parent >= 0 and accounts[parent].code in split):
+                account = AccountTemplate.from_dict(dict(account, is_group=True))
+                added.extend(
+                    AccountTemplate(f"{account.code}{suffix}", f"{account.name_ar} - {name_ar}",
+                                    f"{account.name_en} - {name_en}", account.type, False,
+                                    account.code, template.levels[index] + 1)
+                    for suffix, name_ar, name_en in departments
+                )
+            (framework if index < framework_count else extensions).append(account)
+        return tuple(framework), tuple(extensions + added)
+
+    # ==================== حزمة القوالب المشتركة ====================
+    # حزمة ثنائية محمّلة (mmap) تحل محل ملفات JSON والتجميع في كل عملية
+    _template_bundle: Optional[TemplateBundle] = None
+
+    @classmethod
+    def build_template_bundle(cls, path: str) -> int:
+        """
+        تجميع كل القوالب (الإطار الموحد وكل المجموعات) في حزمة ثنائية واحدة مع نتيجة التحقق
         
-        {"code": "5524", "name_ar": "مصاريف التطوير والبرمجة", "name_en": "Development & Programming", 
-         "type": "Expense", "is_group": False, "parent_code": "5520", "level": 4},
+        تُبنى وقت النشر وتُعاد بناؤها مع أي تعديل في ملفات القوالب
         
-        {"code": "5530", "name_ar": "مصاريف الفروع والمخازن", "name_en": "Branches & Warehouses Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5500", "level": 3},
+        Returns:
+            int: حجم الحزمة بالبايت
+        """
+        templates = []
+        for extension_name in [None] + sorted(set(cls.INDUSTRY_GROUPS.values())):
+            try:
+                template = cls._compile_template(extension_name)
+            except Exception as e:
+                logger.error("Error compiling template %s for bundle: %s", extension_name, e)
+                continue
+            try:
+                cls._check_template(template)
+                validated = True
+            except ValueError:
+                validated = False
+            templates.append((template, validated))
+        size = TemplateBundle.write(path, templates, cls._template_source_hashes())
+        logger.info("Template bundle written to %s: %d templates, %d bytes", path, len(templates), size)
+        return size
+
+    @classmethod
+    def _template_source_hashes(cls) -> Dict[str, bytes]:
+        """بصمة SHA-256 لمحتوى كل ملف قالب تُبنى منه الحزمة (الإطار الموحد وملفات المجموعات)"""
+        hashes = {}
+        for name in ['standard_framework'] + sorted(set(cls.EXTENSION_FILES.values())):
+            hashes[name] = hashlib.sha256((TEMPLATES_DIR / f'{name}.json').read_bytes()).digest()
+        return hashes
+
+    @classmethod
+    def load_template_bundle(cls, path: str) -> Optional[TemplateBundle]:
+        """
+        تحميل حزمة القوالب لكل القوالب التالية في هذه العملية
         
-        {"code": "5531", "name_ar": "مصاريف إيجار الفروع والمحلات", "name_en": "Branches & Stores Rent", 
-         "type": "Expense", "is_group": False, "parent_code": "5530", "level": 4},
+        في خوادم prefork (gunicorn) تُستدعى في العملية الأم قبل التفرّع (preload_app)
+        فتقرأ كل العمليات الفرعية نفس الصفحات بدون نسخ ولا تجميع عند أول إنشاء
         
-        {"code": "5532", "name_ar": "مصاريف تشغيل المخازن", "name_en": "Warehouse Operation Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5530", "level": 4},
+        إذا اختلفت ملفات القوالب في coa_templates/ عن التي بُنيت منها الحزمة (نُشرت بدون إعادة
+        بنائها) تُرفض الحزمة ويُسجل خطأ، وتُستخدم ملفات JSON كما لو لم تُحمّل حزمة
         
-        {"code": "5533", "name_ar": "مصاريف أمن المخازن والفروع", "name_en": "Warehouse & Branch Security", 
-         "type": "Expense", "is_group": False, "parent_code": "5530", "level": 4},
+        Returns:
+            الحزمة المحمّلة، أو None إذا كانت قديمة
+        """
+        bundle = TemplateBundle(path)
+        current = cls._template_source_hashes()
+        if bundle.sources != current:
+            stale = sorted(name for name in set(current) | set(bundle.sources)
+                           if bundle.sources.get(name) != current.get(name))
+            logger.error("❌ حزمة القوالب %s لا تطابق ملفات القوالب الحالية (%s)، استخدام ملفات JSON",
+                         path, ', '.join(stale))
+            return None
+        cls._template_bundle = bundle
+        cls._compiled_templates.clear()
+        cls._sized_templates.clear()
+        cls._seed_plans.clear()
+        return bundle
+
+    # ==================== التحقق من القوالب ====================
+    # بصمات القوالب التي اجتازت التحقق البنيوي (لا يُعاد فحصها عند كل إنشاء)
+    _validated_fingerprints: set = set()
+
+    @classmethod
+    def lint_template(cls, template: CompiledTemplate) -> List[str]:
+        """
+        فحص شامل لقالب مُجمّع: أكواد مفقودة أو مكررة، آباء غير موجودين، دورات،
+        اختلاف المستوى المكتوب عن المحسوب، اختلاف نوع الحساب عن أبيه، وأبناء تحت حساب غير تجميعي،
+        ووسوم الحسابات الافتراضية (غير معروفة أو مكررة أو ناقصة)
+        """
+        issues = cls._tag_issues(template)
+        seen = set()
+        for index, account in enumerate(template.accounts):
+            if not account.code:
+                issues.append(f"حساب بدون كود: {account.name_ar}")
+                continue
+            if account.code in seen:
+                issues.append(f"تكرر كود الحساب: {account.code}")
+            seen.add(account.code)
+        
+        for code in template.orphan_codes:
+            parent_code = template.accounts[template.index_by_code[code]].parent_code
+            issues.append(f"الحساب {code}: الأب {parent_code} غير موجود في القالب")
+        for code in template.cyclic_codes:
+            issues.append(f"الحساب {code}: دورة في سلسلة الآباء")
+        
+        for index, account in enumerate(template.accounts):
+            level = template.levels[index]
+            if level and account.level != level:
+                issues.append(f"الحساب {account.code}: المستوى {account.level} والمحسوب {level}")
+            parent = template.parent_index[index]
+            if parent < 0 or parent == index:
+                continue
+            parent_account = template.accounts[parent]
+            if parent_account.type != account.type:
+                issues.append(f"الحساب {account.code}: النوع {account.type} يختلف عن نوع الأب "
+                              f"{parent_account.code} ({parent_account.type})")
+            if not parent_account.is_group:
+                issues.append(f"الحساب {account.code}: الأب {parent_account.code} ليس حساباً تجميعياً")
+        return issues
+
+    @classmethod
+    def _tag_issues(cls, template: CompiledTemplate) -> List[str]:
+        """مشاكل وسوم القالب مقارنة بـ DEFAULT_ACCOUNT_TAGS (كل وسم على حساب واحد بالضبط)"""
+        issues = []
+        tagged: Dict[str, str] = {}
+        for account in template.accounts:
+            if not account.tag:
+                continue
+            if account.tag not in cls.DEFAULT_ACCOUNT_TAGS:
+                issues.append(f"الحساب {account.code}: وسم غير معروف {account.tag}")
+            elif account.tag in tagged:
+                issues.append(f"الوسم {account.tag} مكرر على الحسابين {tagged[account.tag]} و {account.code}")
+            tagged.setdefault(account.tag, account.code)
+        missing = [tag for tag in cls.DEFAULT_ACCOUNT_TAGS if tag not in tagged]
+        if missing:
+            issues.append(f"وسوم حسابات افتراضية غير موجودة في القالب: {', '.join(missing)}")
+        return issues
+
+    @classmethod
+    def validate_templates(cls) -> Dict[str, List[str]]:
+        """
+        التحقق من كل قوالب التخصصات (والإطار الموحد وحده) مرة واحدة - يُستدعى من اختبار أو من سطر الأوامر
         
-        {"code": "5540", "name_ar": "مصاريف خدمات العملاء", "name_en": "Customer Services Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5500", "level": 3},
+        القوالب السليمة بنيوياً تُسجَّل بصمتها فلا يُعاد فحصها في مسار الإنشاء
         
-        {"code": "5541", "name_ar": "مصاريف خدمة العملاء والدعم", "name_en": "Customer Service & Support", 
-         "type": "Expense", "is_group": False, "parent_code": "5540", "level": 4},
+        Returns:
+            Dict[str, List[str]]: المشاكل لكل قالب (اسم دالة الإضافات أو STANDARD_FRAMEWORK)
+        """
+        report = {}
+        for extension_name in [None] + sorted(set(cls.INDUSTRY_GROUPS.values())):
+            name = extension_name or 'STANDARD_FRAMEWORK'
+            try:
+                template = cls._compile_template(extension_name)
+            except Exception as e:
+                report[name] = [f"خطأ في تحميل القالب: {e}"]
+                continue
+            report[name] = cls.lint_template(template)
+            try:
+                cls._check_template(template)
+            except ValueError:
+                pass
+        return report
+
+    @classmethod
+    def get_compiled_template(cls, industry_code: Optional[str],
+                              company_size: Optional[str] = None) -> CompiledTemplate:
+        """
+        الشجرة الكاملة (الإطار الموحد + إضافات التخصص) بعد تطبيق ملف حجم الشركة،
+        للقراءة فقط ومشتركة بين الاستدعاءات
+        """
+        extension_name = cls.INDUSTRY_GROUPS.get(industry_code) if industry_code else None
+        company_size = cls._resolve_company_size(company_size)
+        try:
+            return cls._compile_template(extension_name, company_size)
+        except Exception as e:
+            logger.error("Error loading extensions for industry %s: %s", industry_code, e)
+            return cls._compile_template(None, company_size)
+
+    # خطط الإنشاء الجاهزة مفتاحها (معرف القالب مع الحجم، العملة)
+    _seed_plans: Dict[Tuple[str, int], SeedPlan] = {}
+
+    @classmethod
+    def get_seed_plan(cls, industry_code: Optional[str], currency_id: int = 1,
+                      company_size: Optional[str] = None) -> SeedPlan:
+        """
+        خطة إنشاء جاهزة (ومخزّنة مؤقتاً) للتخصص والعملة وحجم الشركة يمكن إعادتها لأي مشروع
         
-        {"code": "5542", "name_ar": "مصاريف إدارة المرتجعات", "name_en": "Returns Management", 
-         "type": "Expense", "is_group": False, "parent_code": "5540", "level": 4},
+        يتم التحقق من القالب قبل بناء الخطة
+        """
+        return cls._build_seed_plan(cls.get_compiled_template(industry_code, company_size), currency_id)
+
+    @classmethod
+    def _build_seed_plan(cls, template: CompiledTemplate, currency_id: int) -> SeedPlan:
+        """خطة الإنشاء لقالب مُجمّع وعملة (مخزّنة مؤقتاً)"""
+        key = (template.template_id, currency_id)
+        plan = cls._seed_plans.get(key)
+        if plan is not None:
+            return plan
+        
+        cls._check_template(template)
+        levels: Dict[int, Tuple[List[int], List[int], List[Dict]]] = {}
+        for index in template.order:
+            level = template.levels[index]
+            indices, parents, rows = levels.setdefault(level, ([], [], []))
+            indices.append(index)
+            parents.append(template.parent_index[index])
+            rows.append(cls._build_account_row(
+                None, template.accounts[index], template.full_codes[index], level, None, currency_id
+            ))
+        plan = SeedPlan(template, currency_id, tuple(
+            (tuple(indices), tuple(parents), tuple(rows))
+            for indices, parents, rows in (levels[level] for level in sorted(levels))
+        ))
+        cls._seed_plans[key] = plan
+        return plan
+
+    @classmethod
+    def get_industry_extensions(cls, industry_code: str) -> List[AccountTemplate]:
+        """توليد الإضافات حسب التخصص"""
+        extension_name = cls.INDUSTRY_GROUPS.get(industry_code)
+        if extension_name:
+            try:
+                return list(cls._compile_template(extension_name).extensions)
+            except Exception as e:
+                # تسجيل الخطأ وإرجاع قائمة فارغة في حالة وجود مشكلة
+                logger.error("Error loading extensions for industry %s: %s", industry_code, e)
+                return []
+        else:
+            # إرجاع قائمة فارغة إذا لم يتم العثور على التخصص
+            return []
+    # ==================== القياسات ====================
+    # دوال تُستدعى بـ SeedMetrics بعد كل عملية إنشاء (لإرسالها إلى نظام القياسات)
+    metrics_hooks: List[Callable[[SeedMetrics], None]] = []
+
+    @classmethod
+    def add_metrics_hook(cls, hook: Callable[[SeedMetrics], None]):
+        """تسجيل دالة تستقبل SeedMetrics بعد كل عملية إنشاء"""
+        cls.metrics_hooks.append(hook)
+
+    @classmethod
+    def remove_metrics_hook(cls, hook: Callable[[SeedMetrics], None]):
+        cls.metrics_hooks.remove(hook)
+
+    @classmethod
+    def _emit_metrics(cls, metrics: SeedMetrics):
+        """تسجيل القياسات وتمريرها للدوال المسجلة (خطأ في دالة لا يوقف الإنشاء)"""
+        logger.info("coa_seed %s", metrics.operation, extra={'coa_seed': metrics.as_dict()})
+        for hook in list(cls.metrics_hooks):
+            try:
+                hook(metrics)
+            except Exception:
+                logger.exception("خطأ في دالة القياسات %r", hook)
+
+    @classmethod
+    @contextmanager
+    def _measured(cls, operation: str, session: Session, project_id: Optional[int] = None,
+                  industry: Optional[str] = None, mode: Optional[str] = None, projects: int = 1):
+        """
+        قياس عملية كاملة: عدّ الاستعلامات، وتسجيل النجاح أو رسالة الخطأ، ثم تمرير القياسات
+        للدوال المسجلة في كل الأحوال
         
-        {"code": "5543", "name_ar": "مصاريف ضمان الجودة", "name_en": "Quality Assurance", 
-         "type": "Expense", "is_group": False, "parent_code": "5540", "level": 4},
-    ]
+        تُعتبر العملية ناجحة إذا انتهت بدون استثناء (ويمكنها تعيين metrics.success = False
+        عند إخفاقات جزئية)
+        """
+        metrics = SeedMetrics(operation, project_id, industry, mode)
+        metrics.projects = projects
+        metrics.success = True
+        completed = False
+        try:
+            with metrics.track_queries(session):
+                yield metrics
+            completed = True
+        except Exception as e:
+            metrics.error = str(e)
+            raise
+        finally:
+            if not completed:
+                metrics.success = False
+            cls._emit_metrics(metrics)
+
+    # ==================== دالة الإنشاء الرئيسية ====================
     
     @classmethod
-    def get_finance_banking_extensions(cls) -> List[Dict]:
-        """خدمات مالية وبنوك"""
-        return [
-        # ============ الأصول المتداولة - مالية (تحت 1200) ============
-        {"code": "12150", "name_ar": "الاستثمارات والأصول المالية", "name_en": "Investments & Financial Assets", 
-         "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-        
-        {"code": "12151", "name_ar": "محفظة القروض", "name_en": "Loan Portfolio", 
-         "type": "Asset", "is_group": True, "parent_code": "12150", "level": 4},
-        
-        {"code": "121511", "name_ar": "قروض تجارية", "name_en": "Commercial Loans", 
-         "type": "Asset", "is_group": False, "parent_code": "12151", "level": 5},
-        
-        {"code": "121512", "name_ar": "قروض شخصية", "name_en": "Personal Loans", 
-         "type": "Asset", "is_group": False, "parent_code": "12151", "level": 5},
-        
-        {"code": "121513", "name_ar": "قروض عقارية", "name_en": "Mortgage Loans", 
-         "type": "Asset", "is_group": False, "parent_code": "12151", "level": 5},
-        
-        {"code": "12302", "name_ar": "استثمارات في أوراق مالية", "name_en": "Securities Investments", 
-         "type": "Asset", "is_group": True, "parent_code": "12300", "level": 4},
-        
-        {"code": "123021", "name_ar": "أسهم", "name_en": "Stocks", 
-         "type": "Asset", "is_group": False, "parent_code": "12302", "level": 5},
-        
-        {"code": "123022", "name_ar": "سندات", "name_en": "Bonds", 
-         "type": "Asset", "is_group": False, "parent_code": "12302", "level": 5},
-        
-        {"code": "123023", "name_ar": "صكوك", "name_en": "Sukuk", 
-         "type": "Asset", "is_group": False, "parent_code": "12302", "level": 5},
+    def seed_chart_of_accounts(cls, project_id: int, industry: Optional[str] = None, 
+                           currency_id: int = 1, company_size: str = "medium",
+                           bulk: bool = False, session: Optional[Session] = None,
+                           server_side: bool = False, upsert: bool = False) -> Dict[str, int]:
+        """
+    إنشاء شجرة حسابات متكاملة ومتخصصة
+    
+    bulk: إدراج كل مستوى من الشجرة بجملة INSERT واحدة بدلاً من flush لكل حساب
+    server_side: نسخ القالب من جدول coa_template داخل قاعدة البيانات (INSERT ... SELECT)،
+                 على SERVER_SIDE_DIALECTS فقط وإلا يُستخدم الإدراج المجمّع
+    upsert: إدراج كل مستوى مع تجاهل الحسابات الموجودة (ON CONFLICT DO NOTHING) بدون قراءة مسبقة،
+            آمن عند تكرار الطلب أو تزامن طلبين لنفس المشروع
+    company_size: ملف الحجم (small / medium / large) المطبق على القالب
+    session: جلسة قاعدة البيانات المستخدمة (db.session افتراضياً)
+        """
+        if session is None:
+            session = db.session
+    
+    # التحقق من صحة الإدخال
+        if not project_id or project_id <= 0:
+            raise ValueError("معرف المشروع غير صالح")
+    
+        mode = 'server_side' if server_side else 'upsert' if upsert else 'bulk' if bulk else 'per_row'
+        dialect = session.get_bind().dialect.name
+        if mode == 'server_side' and dialect not in cls.SERVER_SIDE_DIALECTS:
+            logger.warning("⚠️ النسخ داخل قاعدة البيانات غير مدعوم على %s، استخدام الإدراج المجمّع", dialect)
+            mode = 'bulk'
+        with cls._measured('seed_chart_of_accounts', session, project_id, industry, mode) as metrics:
+            return cls._seed_project(session, metrics, project_id, industry, currency_id, mode, company_size)
+
+    @classmethod
+    def _seed_project(cls, session: Session, metrics: SeedMetrics, project_id: int,
+                      industry: Optional[str], currency_id: int, mode: str,
+                      company_size: Optional[str] = None) -> Dict[str, int]:
+        """مراحل إنشاء شجرة مشروع واحد مع قياس زمن كل مرحلة"""
+    # التحقق من العملة بأمان
+        with metrics.phase('currency_check'):
+            try:
+                currency = session.get(Currency, currency_id)
+                if not currency:
+                    logger.warning("⚠️ العملة ID %s غير موجودة، استخدام العملة الافتراضية (ID: 1)", currency_id)
+                    currency_id = 1
+            except Exception as e:
+                logger.warning("⚠️ خطأ في الاستعلام عن العملة: %s، استخدام العملة الافتراضية", e)
+                currency_id = 1
+    
+    # 1. تجميع القائمة الكاملة من القالب المُجمّع (الإطار الموحد + إضافات التخصص)
+        with metrics.phase('template_assembly'):
+            template = cls.get_compiled_template(industry, company_size)
+    
+    # 2. إضافة حسابات التخصص
+        if industry and industry != '1':  # تأكد أن industry ليس '1' فقط
+            extensions_count = len(template.extensions)
+            if extensions_count:
+                logger.info("🔧 إضافة %s حساب متخصص لـ '%s'", extensions_count, industry)
+            else:
+                logger.info("ℹ️ لا توجد حسابات متخصصة لـ '%s'، استخدام الشجرة الأساسية", industry)
+        else:
+            logger.info("ℹ️ التخصص غير محدد (%s)، استخدام الشجرة الأساسية", industry)
+    
+    # 3. التحقق من الأكواد وبنية الشجرة (تكرار، أيتام، دورات) قبل أي كتابة
+        with metrics.phase('validation'):
+            accounts_count = cls._check_template(template)
+    
+    # 4. إنشاء الحسابات في قاعدة البيانات (بالترتيب الطوبولوجي للقالب)
+        try:
+            if mode == 'server_side':
+                with metrics.phase('inserts'):
+                    default_accounts, metrics.created = cls._copy_template_server_side(
+                        session, project_id, template, currency_id
+                    )
+                metrics.skipped = accounts_count - metrics.created
+            elif mode == 'upsert':
+                with metrics.phase('parent_resolution'):
+                    plan = cls._build_seed_plan(template, currency_id)
+                    cls._require_upsert_index(session)
+                with metrics.phase('inserts'):
+                    default_accounts, metrics.created = cls._upsert_accounts(session, project_id, plan)
+                metrics.skipped = accounts_count - metrics.created
+            else:
+            # تحميل حسابات المشروع الحالية باستعلام واحد (حل الآباء والحسابات الموجودة من الذاكرة)
+                with metrics.phase('parent_resolution'):
+                    existing = cls._load_existing_accounts(session, [project_id])[project_id]
+                    metrics.skipped = sum(1 for full_code in template.full_codes if full_code in existing)
+                    metrics.created = accounts_count - metrics.skipped
+                    if mode == 'bulk':
+                        plan = cls._build_seed_plan(template, currency_id)
+            
+                with metrics.phase('inserts'):
+                    if mode == 'bulk':
+                        default_accounts = cls._create_accounts_bulk(
+                            session, [(project_id, plan, existing)]
+                        )[project_id]
+                    else:
+                        default_accounts = cls._create_accounts_per_row(
+                            session, project_id, template, currency_id, existing
+                        )
+        
+            with metrics.phase('inserts'):
+                cls._record_template_versions(session, [(project_id, industry, template, currency_id)])
+                cls._record_default_accounts(session, {project_id: default_accounts})
+            with metrics.phase('commit'):
+                session.commit()
+        
+            logger.info("✅ تم إنشاء %s حساب بنجاح (%s موجود مسبقاً)", metrics.created, metrics.skipped)
+            logger.info("📊 الحسابات الافتراضية: %s", default_accounts)
         
-        {"code": "12303", "name_ar": "استثمارات قصيرة الأجل", "name_en": "Short-term Investments", 
-         "type": "Asset", "is_group": False, "parent_code": "12300", "level": 4},
+            return default_accounts
         
-        {"code": "12304", "name_ar": "ودائع لدى بنوك أخرى", "name_en": "Deposits with Other Banks", 
-         "type": "Asset", "is_group": False, "parent_code": "12300", "level": 4},
+        except Exception as e:
+            session.rollback()
+            logger.exception("❌ خطأ في إنشاء شجرة الحسابات: %s", e)
+            raise
+
+    @classmethod
+    def seed_many(cls, projects: List[Tuple[int, Optional[str], int]],
+                  chunk_size: Optional[int] = None,
+                  session: Optional[Session] = None,
+                  company_size: Optional[str] = None) -> Dict[int, Dict[str, int]]:
+        """
+        إنشاء أشجار حسابات لعدة مشاريع دفعة واحدة
         
-        # ============ الخصوم المتداولة - مالية (تحت 2100) ============
-        {"code": "21110", "name_ar": "ودائع العملاء", "name_en": "Customer Deposits", 
-         "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
+        يتم التحقق من العملات باستعلام واحد، واستخدام خطة إنشاء جاهزة لكل تخصص وعملة،
+        وإدراج كل مستوى من الشجرة لكل مشاريع الدفعة بجملة INSERT مجمّعة
         
-        {"code": "21111", "name_ar": "ودائع جارية", "name_en": "Current Deposits", 
-         "type": "Liability", "is_group": False, "parent_code": "21110", "level": 4},
+        Args:
+            projects: قائمة (project_id, industry, currency_id)
+            chunk_size: عدد المشاريع في كل معاملة (None = معاملة واحدة للجميع)
+            session: جلسة قاعدة البيانات المستخدمة (db.session افتراضياً)
+            company_size: ملف الحجم المطبق على كل مشاريع الدفعة
+            
+        Returns:
+            Dict[int, Dict[str, int]]: الحسابات الافتراضية لكل مشروع
+        """
+        if session is None:
+            session = db.session
+        projects = list(projects)
+        seen = set()
+        for project_id, _, _ in projects:
+            if not project_id or project_id <= 0:
+                raise ValueError("معرف المشروع غير صالح")
+            if project_id in seen:
+                raise ValueError(f"المشروع {project_id} مكرر في الدفعة")
+            seen.add(project_id)
+        
+        with cls._measured('seed_many', session, mode='bulk', projects=len(projects)) as metrics:
+            return cls._seed_many_chunks(session, metrics, projects, chunk_size, company_size)
+
+    @classmethod
+    def _seed_many_chunks(cls, session: Session, metrics: SeedMetrics,
+                          projects: List[Tuple[int, Optional[str], int]],
+                          chunk_size: Optional[int],
+                          company_size: Optional[str] = None) -> Dict[int, Dict[str, int]]:
+        """مراحل seed_many مع قياس زمن كل مرحلة (مجمّعة على كل الدفعات)"""
+        # التحقق من كل العملات باستعلام واحد
+        with metrics.phase('currency_check'):
+            valid_currencies = cls._load_valid_currencies(session, {currency_id for _, _, currency_id in projects})
+        
+        # خطة الإنشاء الجاهزة لكل (تخصص، عملة) - يتم التحقق من القالب عند بنائها
+        with metrics.phase('template_assembly'):
+            plans: Dict[Tuple[Optional[str], int], SeedPlan] = {}
+            for _, industry, currency_id in projects:
+                currency_id = currency_id if currency_id in valid_currencies else 1
+                if (industry, currency_id) not in plans:
+                    plans[(industry, currency_id)] = cls.get_seed_plan(industry, currency_id, company_size)
+        
+        results: Dict[int, Dict[str, int]] = {}
+        size = chunk_size or len(projects) or 1
+        for start in range(0, len(projects), size):
+            chunk = projects[start:start + size]
+            try:
+                with metrics.phase('parent_resolution'):
+                    existing = cls._load_existing_accounts(session, [project_id for project_id, _, _ in chunk])
+                    jobs = [
+                        (project_id,
+                         plans[(industry, currency_id if currency_id in valid_currencies else 1)],
+                         existing[project_id])
+                        for project_id, industry, currency_id in chunk
+                    ]
+                    for _, plan, project_existing in jobs:
+                        skipped = sum(1 for full_code in plan.template.full_codes if full_code in project_existing)
+                        metrics.skipped += skipped
+                        metrics.created += len(plan) - skipped
+                with metrics.phase('inserts'):
+                    defaults = cls._create_accounts_bulk(session, jobs)
+                    cls._record_template_versions(session, [
+                        (project_id, industry, plan.template, plan.currency_id)
+                        for (project_id, industry, _), (_, plan, _) in zip(chunk, jobs)
+                    ])
+                    cls._record_default_accounts(session, defaults)
+                    results.update(defaults)
+                with metrics.phase('commit'):
+                    session.commit()
+                logger.info("✅ تم إنشاء شجرة الحسابات لـ %s/%s مشروع", start + len(chunk), len(projects))
+            except Exception as e:
+                session.rollback()
+                logger.exception("❌ خطأ في إنشاء أشجار الحسابات للدفعة: %s", e)
+                raise
         
-        {"code": "21112", "name_ar": "ودائع توفير", "name_en": "Savings Deposits", 
-         "type": "Liability", "is_group": False, "parent_code": "21110", "level": 4},
+        return results
+
+    @classmethod
+    def seed_from_plan(cls, project_id: int, plan: SeedPlan,
+                       session: Optional[Session] = None) -> Dict[str, int]:
+        """
+        إعادة خطة إنشاء جاهزة لمشروع (إدراج مجمّع لكل مستوى بدون منطق لكل حساب
+        إذا كان المشروع جديداً)
         
-        {"code": "21113", "name_ar": "ودائع لأجل", "name_en": "Term Deposits", 
-         "type": "Liability", "is_group": False, "parent_code": "21110", "level": 4},
+        Returns:
+            Dict[str, int]: الحسابات الافتراضية
+        """
+        if session is None:
+            session = db.session
+        if not project_id or project_id <= 0:
+            raise ValueError("معرف المشروع غير صالح")
+        with cls._measured('seed_from_plan', session, project_id, mode='bulk') as metrics:
+            try:
+                with metrics.phase('parent_resolution'):
+                    existing = cls._load_existing_accounts(session, [project_id])[project_id]
+                    metrics.skipped = sum(1 for full_code in plan.template.full_codes if full_code in existing)
+                    metrics.created = len(plan) - metrics.skipped
+                with metrics.phase('inserts'):
+                    default_accounts = cls._create_accounts_bulk(session, [(project_id, plan, existing)])[project_id]
+                    cls._record_template_versions(session, [(project_id, None, plan.template, plan.currency_id)])
+                    cls._record_default_accounts(session, {project_id: default_accounts})
+                with metrics.phase('commit'):
+                    session.commit()
+                return default_accounts
+            except Exception as e:
+                session.rollback()
+                logger.exception("❌ خطأ في إنشاء شجرة الحسابات: %s", e)
+                raise
+
+    @classmethod
+    def reseed_chart_of_accounts(cls, project_id: int, industry: Optional[str] = None,
+                                 currency_id: int = 1, session: Optional[Session] = None,
+                                 dry_run: bool = False, company_size: Optional[str] = None) -> Dict:
+        """
+        تطبيق فرق القالب فقط على مشروع قائم (بعد إضافة حسابات لقالب التخصص)
         
-        # ============ الخصوم طويلة الأجل - مالية (تحت 2200) ============
-        {"code": "2210", "name_ar": "قروض طويلة الأجل", "name_en": "Long-term Loans Payable", 
-         "type": "Liability", "is_group": True, "parent_code": "2200", "level": 3},
+        تُقرأ حسابات المشروع باستعلام واحد وتُقارن بالقالب المُجمّع في الذاكرة حسب full_code
+        (ثم حسب الكود للحسابات التي نُقلت لأب آخر)، ويُدرج الناقص فقط بإدراج مجمّع
+        (جملة واحدة لكل مستوى فيه حسابات جديدة). الحسابات الموجودة لا تُعدّل
         
-        {"code": "2211", "name_ar": "قروض من بنوك أخرى", "name_en": "Loans from Other Banks", 
-         "type": "Liability", "is_group": False, "parent_code": "2210", "level": 4},
+        dry_run: حساب الفرق فقط بدون أي إدراج
+        company_size: ملف الحجم (None = الحجم المسجل للمشروع عند إنشائه)
         
-        {"code": "2212", "name_ar": "سندات قابلة للتحويل", "name_en": "Convertible Bonds", 
-         "type": "Liability", "is_group": False, "parent_code": "2210", "level": 4},
+        Returns:
+            {'added': [full_code للحسابات المضافة], 'unchanged': عدد المتطابقة،
+             'moved': [(full_code في القالب، full_code في المشروع)]،
+             'changed': [full_code لحسابات يختلف اسمها أو نوعها أو كونها تجميعية عن القالب]،
+             'extra': [full_code لحسابات المشروع غير الموجودة في القالب]،
+             'defaults': الحسابات الافتراضية للمشروع}
+        """
+        if session is None:
+            session = db.session
+        if not project_id or project_id <= 0:
+            raise ValueError("معرف المشروع غير صالح")
         
-        {"code": "2213", "name_ar": "صكوك إسلامية", "name_en": "Islamic Sukuk", 
-         "type": "Liability", "is_group": False, "parent_code": "2210", "level": 4},
+        with cls._measured('reseed_chart_of_accounts', session, project_id, industry, 'incremental') as metrics:
+            return cls._apply_template_delta(session, metrics, project_id, industry, currency_id,
+                                             dry_run, company_size)
+
+    @classmethod
+    def _apply_template_delta(cls, session: Session, metrics: SeedMetrics, project_id: int,
+                              industry: Optional[str], currency_id: int, dry_run: bool,
+                              company_size: Optional[str] = None) -> Dict:
+        """مراحل reseed_chart_of_accounts مع قياس زمن كل مرحلة"""
+        with metrics.phase('template_assembly'):
+            if company_size is None:
+                template_id = session.query(CoaProjectTemplate.template_id).filter(
+                    CoaProjectTemplate.project_id == project_id
+                ).scalar()
+                company_size = template_id.partition(':')[2] if template_id else None
+            template = cls.get_compiled_template(industry, company_size)
+        with metrics.phase('validation'):
+            cls._check_template(template)
+        
+        with metrics.phase('parent_resolution'):
+            rows = cls._load_project_accounts(session, [project_id])[project_id]
+            existing, report = cls._diff_template(template, rows)
+            metrics.created = len(report['added'])
+            metrics.skipped = len(existing)
+        
+        report['defaults'] = {
+            account.tag: existing[full_code]
+            for account, full_code in zip(template.accounts, template.full_codes)
+            if account.tag and full_code in existing
+        }
+        if not dry_run:
+            try:
+                if report['added']:
+                    with metrics.phase('currency_check'):
+                        if currency_id not in cls._load_valid_currencies(session, {currency_id}):
+                            logger.warning("⚠️ العملة ID %s غير موجودة، استخدام العملة الافتراضية (ID: 1)", currency_id)
+                            currency_id = 1
+                        plan = cls._build_seed_plan(template, currency_id)
+                    with metrics.phase('inserts'):
+                        report['defaults'] = cls._create_accounts_bulk(
+                            session, [(project_id, plan, existing)]
+                        )[project_id]
+                with metrics.phase('inserts'):
+                    cls._record_template_versions(session, [(project_id, industry, template, currency_id)])
+                    cls._record_default_accounts(session, {project_id: report['defaults']})
+                with metrics.phase('commit'):
+                    session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.exception("❌ خطأ في تطبيق فرق القالب: %s", e)
+                raise
+        
+        logger.info("🔄 فرق القالب للمشروع %s: %s مضاف، %s منقول، %s مختلف، %s إضافي",
+                    project_id, len(report['added']), len(report['moved']),
+                    len(report['changed']), len(report['extra']))
+        return report
+
+    @staticmethod
+    def _load_project_accounts(session: Session, project_ids: List[int]) -> Dict[int, List]:
+        """تحميل الأعمدة اللازمة لمقارنة القالب لكل حسابات المشاريع المطلوبة باستعلام واحد"""
+        accounts: Dict[int, List] = {project_id: [] for project_id in project_ids}
+        rows = (
+            session.query(ChartOfAccounts.project_id, ChartOfAccounts.id, ChartOfAccounts.code,
+                          ChartOfAccounts.full_code, ChartOfAccounts.name_ar, ChartOfAccounts.name_en,
+                          ChartOfAccounts.type, ChartOfAccounts.is_group)
+            .filter(ChartOfAccounts.project_id.in_(project_ids))
+            .order_by(ChartOfAccounts.id)
+            .all()
+        )
+        for row in rows:
+            accounts[row.project_id].append(row)
+        return accounts
+
+    @staticmethod
+    def _diff_template(template: CompiledTemplate, rows: List) -> Tuple[Dict[str, int], Dict]:
+        """
+        مقارنة حسابات مشروع بالقالب المُجمّع في الذاكرة
         
-        # ============ الإيرادات - مالية (تحت 4000) ============
-        {"code": "4700", "name_ar": "إيرادات الخدمات المالية", "name_en": "Financial Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
+        Returns:
+            (full_code في القالب -> معرف الحساب المقابل في المشروع، تقرير الفرق)
+        """
+        by_full_code = {}
+        by_code = {}
+        for row in rows:
+            by_full_code.setdefault(row.full_code, row)
+            by_code.setdefault(row.code, row)
+        
+        existing: Dict[str, int] = {}
+        template_full_codes = set(template.full_codes)
+        matched = set()
+        added, moved, changed = [], [], []
+        unchanged = 0
+        for account, full_code in zip(template.accounts, template.full_codes):
+            row = by_full_code.get(full_code)
+            if row is None:
+                row = by_code.get(account.code)
+                if row is None or row.full_code in template_full_codes or row.id in matched:
+                    added.append(full_code)
+                    continue
+                moved.append((full_code, row.full_code))
+            existing[full_code] = row.id
+            matched.add(row.id)
+            if (row.name_ar, row.name_en, row.type, bool(row.is_group)) != \
+                    (account.name_ar, account.name_en, account.type, account.is_group):
+                changed.append(full_code)
+            elif row.full_code == full_code:
+                unchanged += 1
+        
+        return existing, {
+            'added': added,
+            'unchanged': unchanged,
+            'moved': moved,
+            'changed': changed,
+            'extra': [row.full_code for row in rows if row.id not in matched],
+        }
+
+    @classmethod
+    def _record_template_versions(cls, session: Session,
+                                  records: List[Tuple[int, Optional[str], CompiledTemplate, int]]):
+        """
+        تسجيل نسخة القالب وبصمته لكل مشروع
         
-        {"code": "4710", "name_ar": "إيرادات الفوائد والمكاسب المالية", "name_en": "Interest & Financial Gains Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4700", "level": 3},
+        PostgreSQL و SQLite: INSERT ... ON CONFLICT (project_id) DO UPDATE فلا يتعارض إنشاءان متزامنان
+        لنفس المشروع، وباقي قواعد البيانات: حذف السجلات السابقة ثم إدراج مجمّع
         
-        {"code": "4711", "name_ar": "إيرادات الفوائد", "name_en": "Interest Income", 
-         "type": "Revenue", "is_group": False, "parent_code": "4710", "level": 4},
+        Args:
+            records: قائمة (project_id, industry, القالب المُجمّع، currency_id)
+        """
+        if not records:
+            return
+        table = CoaProjectTemplate.__table__
+        now = datetime.utcnow()
+        # سجل واحد لكل مشروع (الأخير) حتى لا تحدّث جملة ON CONFLICT نفس الصف مرتين
+        rows = list({
+            project_id: {
+                'project_id': project_id,
+                'template_id': template.template_id,
+                'industry': industry,
+                'version': template.version,
+                'fingerprint': template.fingerprint,
+                'currency_id': currency_id,
+                'updated_at': now,
+            }
+            for project_id, industry, template, currency_id in records
+        }.values())
+        insert = cls._dialect_insert(session)
+        if insert is None:
+            session.execute(table.delete().where(table.c.project_id.in_([row['project_id'] for row in rows])))
+            session.execute(table.insert(), rows)
+            return
+        for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+            statement = insert(table).values(rows[start:start + cls.BULK_INSERT_CHUNK_SIZE])
+            session.execute(statement.on_conflict_do_update(
+                index_elements=['project_id'],
+                set_={column: statement.excluded[column] for column in rows[0] if column != 'project_id'},
+            ))
+
+    @classmethod
+    def _record_default_accounts(cls, session: Session, defaults: Dict[int, Dict[str, int]]):
+        """
+        تسجيل الحسابات الافتراضية لكل مشروع
         
-        {"code": "4712", "name_ar": "إيرادات التداول والاستثمار", "name_en": "Trading & Investment Income", 
-         "type": "Revenue", "is_group": False, "parent_code": "4710", "level": 4},
+        PostgreSQL و SQLite: INSERT ... ON CONFLICT (project_id, tag) DO UPDATE فلا يتعارض إنشاءان
+        متزامنان لنفس المشروع (مع حذف الوسوم التي لم تعد مستخدمة)، وباقي قواعد البيانات:
+        حذف السابقة ثم إدراج مجمّع
         
-        {"code": "4713", "name_ar": "أرباح توزيعات الأسهم", "name_en": "Dividend Income", 
-         "type": "Revenue", "is_group": False, "parent_code": "4710", "level": 4},
+        Args:
+            defaults: project_id -> (وسم -> معرف الحساب)، ويجب أن تغطي كل DEFAULT_ACCOUNT_TAGS
+        """
+        if not defaults:
+            return
+        for project_id, accounts in defaults.items():
+            missing = [tag for tag in cls.DEFAULT_ACCOUNT_TAGS if tag not in accounts]
+            if missing:
+                raise ValueError(f"حسابات افتراضية ناقصة للمشروع {project_id}: {', '.join(missing)}")
+        table = CoaProjectDefaultAccount.__table__
+        rows = [
+            {'project_id': project_id, 'tag': tag, 'account_id': account_id}
+            for project_id, accounts in defaults.items()
+            for tag, account_id in accounts.items()
+        ]
+        insert = cls._dialect_insert(session)
+        if insert is None:
+            session.execute(table.delete().where(table.c.project_id.in_(list(defaults))))
+            session.execute(table.insert(), rows)
+            return
+        session.execute(table.delete().where(table.c.project_id.in_(list(defaults)),
+                                             table.c.tag.notin_({row['tag'] for row in rows})))
+        for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+            statement = insert(table).values(rows[start:start + cls.BULK_INSERT_CHUNK_SIZE])
+            session.execute(statement.on_conflict_do_update(
+                index_elements=['project_id', 'tag'],
+                set_={'account_id': statement.excluded.account_id},
+            ))
+
+    @staticmethod
+    def get_default_accounts(project_id: int, session: Optional[Session] = None) -> Dict[str, int]:
+        """
+        الحسابات الافتراضية المسجلة للمشروع عند إنشاء شجرته
         
-        {"code": "4714", "name_ar": "مكاسب بيع الأصول المالية", "name_en": "Financial Assets Sales Gains", 
-         "type": "Revenue", "is_group": False, "parent_code": "4710", "level": 4},
+        Returns:
+            Dict[str, int]: وسم -> معرف الحساب (فارغ للمشاريع التي لم تُنشأ أو تُرقَّ بعد)
+        """
+        if session is None:
+            session = db.session
+        return dict(
+            session.query(CoaProjectDefaultAccount.tag, CoaProjectDefaultAccount.account_id)
+            .filter(CoaProjectDefaultAccount.project_id == project_id)
+            .all()
+        )
+
+    @classmethod
+    def rollout_templates(cls, industry: Optional[str] = None, chunk_size: int = 100,
+                          session: Optional[Session] = None, after_project_id: int = 0,
+                          progress: Optional[Callable[[int, int, int], None]] = None) -> Dict:
+        """
+        ترقية المشاريع المسجلة على نسخة أقدم من قالبها إلى النسخة الحالية (إضافة الحسابات الناقصة فقط)
         
-        {"code": "4720", "name_ar": "إيرادات العمولات والرسوم", "name_en": "Commissions & Fees Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4700", "level": 3},
+        المشاريع تُعالج على دفعات بترتيب project_id: قراءة حسابات الدفعة باستعلام واحد، إدراج مجمّع
+        لكل مستوى، وتحديث بصمة المشاريع في نفس المعاملة. لذلك إعادة التشغيل بعد أي توقف
+        تكمل المشاريع المتبقية فقط (أو من after_project_id مباشرة)، وفشل دفعة لا يوقف الباقي
         
-        {"code": "4721", "name_ar": "إيرادات عمولات الخدمات", "name_en": "Service Commission Income", 
-         "type": "Revenue", "is_group": False, "parent_code": "4720", "level": 4},
+        المشاريع التي أُنشئت قبل تسجيل النسخ تُسجّل بتطبيق reseed_chart_of_accounts عليها مرة واحدة
         
-        {"code": "4722", "name_ar": "رسوم التحويل والحوالات", "name_en": "Transfer & Remittance Fees", 
-         "type": "Revenue", "is_group": False, "parent_code": "4720", "level": 4},
+        Args:
+            industry: ترقية مجموعة هذا التخصص فقط (None = كل المجموعات)
+            chunk_size: عدد المشاريع في كل دفعة (معاملة)
+            session: جلسة قاعدة البيانات المستخدمة (db.session افتراضياً)
+            after_project_id: استكمال الترقية بعد هذا المشروع
+            progress: دالة تُستدعى بعد كل دفعة بـ (عدد المعالج، الإجمالي، آخر project_id)
+            
+        Returns:
+            {'upgraded': عدد المشاريع المرقّاة، 'accounts_added': عدد الحسابات المضافة،
+             'failed': [(project_id, رسالة الخطأ)]، 'last_project_id': آخر مشروع تمت معالجته}
+        """
+        if session is None:
+            session = db.session
+        if chunk_size <= 0:
+            raise ValueError("حجم الدفعة غير صالح")
         
-        {"code": "4723", "name_ar": "رسوم الحسابات والبطاقات", "name_en": "Account & Card Fees", 
-         "type": "Revenue", "is_group": False, "parent_code": "4720", "level": 4},
+        if industry:
+            extension_names = [cls.get_compiled_template(industry).extension_name]
+        else:
+            extension_names = [None] + sorted(set(cls.INDUSTRY_GROUPS.values()))
+        sizes = [None] + [size for size, profile in sorted(cls.get_size_profiles().items()) if profile]
+        templates: Dict[str, CompiledTemplate] = {}
+        for extension_name in extension_names:
+            for company_size in sizes:
+                try:
+                    template = cls._compile_template(extension_name, company_size)
+                    cls._check_template(template)
+                except Exception as e:
+                    logger.warning("⚠️ تخطي ترقية القالب %s (%s): %s", extension_name or 'STANDARD_FRAMEWORK',
+                                   company_size or cls.DEFAULT_COMPANY_SIZE, e)
+                    continue
+                templates[template.template_id] = template
+        
+        result = {'upgraded': 0, 'accounts_added': 0, 'failed': [], 'last_project_id': after_project_id}
+        if not templates:
+            return result
+        
+        records = CoaProjectTemplate.__table__
+        stale = or_(*(
+            and_(records.c.template_id == template_id, records.c.fingerprint != template.fingerprint)
+            for template_id, template in templates.items()
+        ))
+        with cls._measured('rollout_templates', session, industry=industry, mode='incremental',
+                           projects=0) as metrics:
+            total = session.execute(
+                select(func.count()).select_from(records)
+                .where(stale, records.c.project_id > after_project_id)
+            ).scalar()
+            done = 0
+            while True:
+                with metrics.phase('template_assembly'):
+                    chunk = session.execute(
+                        select(records.c.project_id, records.c.template_id,
+                               records.c.industry, records.c.currency_id)
+                        .where(stale, records.c.project_id > result['last_project_id'])
+                        .order_by(records.c.project_id)
+                        .limit(chunk_size)
+                    ).all()
+                if not chunk:
+                    break
+                project_ids = [row.project_id for row in chunk]
+                try:
+                    with metrics.phase('parent_resolution'):
+                        accounts = cls._load_project_accounts(session, project_ids)
+                        jobs, versions, added = [], [], 0
+                        for row in chunk:
+                            template = templates[row.template_id]
+                            existing, report = cls._diff_template(template, accounts[row.project_id])
+                            jobs.append((row.project_id, cls._build_seed_plan(template, row.currency_id), existing))
+                            versions.append((row.project_id, row.industry, template, row.currency_id))
+                            added += len(report['added'])
+                    with metrics.phase('inserts'):
+                        defaults = cls._create_accounts_bulk(session, jobs)
+                        cls._record_template_versions(session, versions)
+                        cls._record_default_accounts(session, defaults)
+                    with metrics.phase('commit'):
+                        session.commit()
+                    result['upgraded'] += len(chunk)
+                    result['accounts_added'] += added
+                    metrics.created += added
+                    metrics.projects += len(chunk)
+                except Exception as e:
+                    session.rollback()
+                    logger.exception("❌ خطأ في ترقية دفعة المشاريع %s-%s: %s", project_ids[0], project_ids[-1], e)
+                    result['failed'].extend((project_id, str(e)) for project_id in project_ids)
+                
+                done += len(chunk)
+                result['last_project_id'] = project_ids[-1]
+                logger.info("🔄 ترقية القوالب: %s/%s مشروع", done, total)
+                if progress:
+                    progress(done, total, result['last_project_id'])
+            metrics.success = not result['failed']
+            return result
+
+    @classmethod
+    def seed_parallel(cls, projects: List[Tuple[int, Optional[str], int]],
+                      max_workers: int = 4, bulk: bool = True,
+                      session_factory: Optional[Callable[[], Session]] = None,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      company_size: Optional[str] = None) -> Dict:
+        """
+        إنشاء أشجار حسابات لعدد كبير من المشاريع بالتوازي عبر مجموعة خيوط محدودة
+        
+        كل خيط يستخدم جلسة مستقلة (واتصالاً من مجمّع الاتصالات)، وفشل مشروع
+        لا يوقف بقية المشاريع بل يُسجّل في قائمة الإخفاقات
+        
+        Args:
+            projects: قائمة (project_id, industry, currency_id)
+            max_workers: أقصى عدد مشاريع تُنشأ في نفس الوقت
+            bulk: استخدام الإدراج المجمّع لكل مستوى
+            session_factory: دالة تُنشئ جلسة جديدة (افتراضياً جلسة على db.engine)
+            progress: دالة تُستدعى بعد كل مشروع بـ (عدد المنتهي، الإجمالي)
+            company_size: ملف الحجم المطبق على كل المشاريع
+            
+        Returns:
+            {'succeeded': {project_id: الحسابات الافتراضية}, 'failed': [(project_id, رسالة الخطأ)]}
+        """
+        projects = list(projects)
+        if session_factory is None:
+            # يُقرأ db.engine هنا (داخل سياق التطبيق) وليس داخل الخيوط
+            session_factory = sessionmaker(bind=db.engine)
+        
+        local = threading.local()
+        sessions: List[Session] = []
+        lock = threading.Lock()
+        
+        def seed_one(project_id: int, industry: Optional[str], currency_id: int) -> Dict[str, int]:
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = session_factory()
+                with lock:
+                    sessions.append(session)
+            return cls.seed_chart_of_accounts(
+                project_id, industry, currency_id, company_size, bulk=bulk, session=session
+            )
+        
+        succeeded: Dict[int, Dict[str, int]] = {}
+        failed: List[Tuple[int, str]] = []
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(seed_one, project_id, industry, currency_id): project_id
+                    for project_id, industry, currency_id in projects
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    project_id = futures[future]
+                    try:
+                        succeeded[project_id] = future.result()
+                    except Exception as e:
+                        failed.append((project_id, str(e)))
+                    if progress:
+                        progress(done, len(projects))
+        finally:
+            for session in sessions:
+                session.close()
+        
+        logger.info("✅ تم إنشاء %s شجرة حسابات، ❌ فشل %s", len(succeeded), len(failed))
+        return {'succeeded': succeeded, 'failed': failed}
+
+    # ==================== واجهة asyncio ====================
+    @classmethod
+    async def seed_chart_of_accounts_async(cls, project_id: int, industry: Optional[str] = None,
+                                           currency_id: int = 1, company_size: str = "medium",
+                                           bulk: bool = True, session=None, server_side: bool = False,
+                                           session_factory: Optional[Callable] = None) -> Dict[str, int]:
+        """
+        النسخة غير المتزامنة من seed_chart_of_accounts لخدمات asyncio (لا تحجب حلقة الأحداث)
         
-        {"code": "4724", "name_ar": "رسوم الصرف الأجنبي", "name_en": "Foreign Exchange Fees", 
-         "type": "Revenue", "is_group": False, "parent_code": "4720", "level": 4},
+        مع AsyncSession يُنفذ نفس مسار الإنشاء عبر run_sync على الاتصال غير المتزامن،
+        ومع الجلسات المتزامنة يُنقل الإنشاء إلى خيط منفصل
         
-        {"code": "4725", "name_ar": "رسوم الضمانات والكفالات", "name_en": "Guarantee & Surety Fees", 
-         "type": "Revenue", "is_group": False, "parent_code": "4720", "level": 4},
+        إلغاء المهمة (task.cancel) يتراجع عن المعاملة: مباشرة مع AsyncSession، وفي الخيط عند
+        أول نقطة فحص (بين المراحل أو الحسابات)، ولا يُعاد الإلغاء قبل انتهاء التراجع.
+        إذا كان الحفظ (commit) قد تم بالفعل تبقى الحسابات المُنشأة
         
-        {"code": "4730", "name_ar": "إيرادات الخدمات المصرفية", "name_en": "Banking Services Revenue", 
-         "type": "Revenue", "is_group": True, "parent_code": "4700", "level": 3},
+        session: AsyncSession أو Session (افتراضياً جلسة جديدة لكل استدعاء من session_factory)
+        session_factory: دالة تُنشئ الجلسة (async_sessionmaker أو sessionmaker، افتراضياً على db.engine)
+        """
+        if not project_id or project_id <= 0:
+            raise ValueError("معرف المشروع غير صالح")
         
-        {"code": "4731", "name_ar": "إيرادات خدمات الصرافة", "name_en": "Exchange Services Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4730", "level": 4},
+        own_session = session is None
+        if own_session:
+            if session_factory is None:
+                session_factory = sessionmaker(bind=db.engine)
+            session = session_factory()
         
-        {"code": "4732", "name_ar": "إيرادات خدمات الخزينة", "name_en": "Treasury Services Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4730", "level": 4},
+        def seed(sync_session: Session) -> Dict[str, int]:
+            return cls.seed_chart_of_accounts(
+                project_id, industry, currency_id, company_size,
+                bulk=bulk, session=sync_session, server_side=server_side
+            )
         
-        {"code": "4733", "name_ar": "إيرادات خدمات الاستيراد والتصدير", "name_en": "Import/Export Services Revenue", 
-         "type": "Revenue", "is_group": False, "parent_code": "4730", "level": 4},
+        if AsyncSession is not None and isinstance(session, AsyncSession):
+            try:
+                return await session.run_sync(seed)
+            except asyncio.CancelledError:
+                await session.rollback()
+                raise
+            finally:
+                if own_session:
+                    await session.close()
+        
+        cancel = threading.Event()
+
+        def run() -> Dict[str, int]:
+            _cancel_event.set(cancel)
+            try:
+                return seed(session)
+            except asyncio.CancelledError:
+                session.rollback()
+                raise
+            finally:
+                if own_session:
+                    session.close()
+        
+        future = asyncio.get_running_loop().run_in_executor(None, copy_context().run, run)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.set()
+            # انتظار التراجع في الخيط قبل إعادة الإلغاء
+            await asyncio.wait([future])
+            raise
+
+    @classmethod
+    async def seed_parallel_async(cls, projects: List[Tuple[int, Optional[str], int]],
+                                  max_concurrency: int = 10, bulk: bool = True,
+                                  session_factory: Optional[Callable] = None,
+                                  progress: Optional[Callable[[int, int], None]] = None,
+                                  company_size: Optional[str] = None) -> Dict:
+        """
+        إنشاء أشجار حسابات لعدة مشاريع بالتزامن على نفس حلقة الأحداث (جلسة لكل مشروع)
+        
+        Args:
+            projects: قائمة (project_id, industry, currency_id)
+            max_concurrency: أقصى عدد مشاريع تُنشأ في نفس الوقت
+            bulk: استخدام الإدراج المجمّع لكل مستوى
+            session_factory: دالة تُنشئ جلسة لكل مشروع (async_sessionmaker أو sessionmaker)
+            progress: دالة تُستدعى بعد كل مشروع بـ (عدد المنتهي، الإجمالي)
+            company_size: ملف الحجم المطبق على كل المشاريع
+            
+        Returns:
+            {'succeeded': {project_id: الحسابات الافتراضية}, 'failed': [(project_id, رسالة الخطأ)]}
+        """
+        projects = list(projects)
+        if session_factory is None:
+            session_factory = sessionmaker(bind=db.engine)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def seed_one(project_id: int, industry: Optional[str], currency_id: int):
+            async with semaphore:
+                try:
+                    return project_id, await cls.seed_chart_of_accounts_async(
+                        project_id, industry, currency_id, company_size,
+                        bulk=bulk, session_factory=session_factory
+                    ), None
+                except Exception as e:
+                    return project_id, None, str(e)
+        
+        succeeded: Dict[int, Dict[str, int]] = {}
+        failed: List[Tuple[int, str]] = []
+        tasks = [asyncio.ensure_future(seed_one(*project)) for project in projects]
+        try:
+            for done, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+                project_id, defaults, error = await next_result
+                if error is None:
+                    succeeded[project_id] = defaults
+                else:
+                    failed.append((project_id, error))
+                if progress:
+                    progress(done, len(projects))
+        finally:
+            # عند إلغاء الدفعة: إلغاء المشاريع الجارية وانتظار تراجعها
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        logger.info("✅ تم إنشاء %s شجرة حسابات، ❌ فشل %s", len(succeeded), len(failed))
+        return {'succeeded': succeeded, 'failed': failed}
+
+    @staticmethod
+    def _load_valid_currencies(session: Session, currency_ids: set) -> set:
+        """معرفات العملات الموجودة من بين المعرفات المطلوبة (استعلام واحد)"""
+        try:
+            found = {
+                currency_id for (currency_id,) in
+                session.query(Currency.id).filter(Currency.id.in_(currency_ids)).all()
+            }
+        except Exception as e:
+            logger.warning("⚠️ خطأ في الاستعلام عن العملات: %s، استخدام العملة الافتراضية", e)
+            return set()
+        for currency_id in currency_ids - found:
+            logger.warning("⚠️ العملة ID %s غير موجودة، استخدام العملة الافتراضية (ID: 1)", currency_id)
+        return found
+
+    @classmethod
+    def _check_template(cls, template: CompiledTemplate) -> int:
+        """
+        التحقق من وجود كود لكل حساب وعدم تكرار الأكواد ومن أن كل حساب
+        مرتبط بجذر (لا أيتام ولا دورات)، وإرجاع عدد الحسابات
         
-        # ============ المصروفات - مالية (تحت 5000) ============
-        {"code": "5550", "name_ar": "مصاريف الخدمات المالية", "name_en": "Financial Services Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
+        القوالب التي سبق التحقق من بصمتها لا يُعاد فحصها
+        """
+        if template.fingerprint in cls._validated_fingerprints:
+            return len(template)
         
-        {"code": "5560", "name_ar": "مصاريف الفوائد والرسوم المالية", "name_en": "Interest & Financial Fees Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5550", "level": 3},
+        code_set = set()
+        for index, code in enumerate(template.codes):
+            if not code:
+                raise ValueError(f"حساب بدون كود: {template.accounts[index].name_ar}")
+            if code in code_set:
+                raise ValueError(f"تكرر كود الحساب: {code}")
+            code_set.add(code)
+        if template.orphan_codes:
+            raise ValueError(f"حسابات أبوها غير موجود في القالب: {', '.join(template.orphan_codes)}")
+        if template.cyclic_codes:
+            raise ValueError(f"دورة في شجرة الحسابات: {', '.join(template.cyclic_codes)}")
+        tag_issues = cls._tag_issues(template)
+        if tag_issues:
+            raise ValueError(tag_issues[0])
+        
+        cls._validated_fingerprints.add(template.fingerprint)
+        return len(code_set)
+
+    @staticmethod
+    def _build_account_row(project_id: int, account_data: AccountTemplate, full_code: str,
+                           level: int, parent_id: Optional[int], currency_id: int) -> Dict:
+        """قيم أعمدة حساب واحد كما يتم إدراجها في جدول الحسابات"""
+        return {
+            'project_id': project_id,
+            'name': account_data['name_ar'],
+            'name_ar': account_data['name_ar'],
+            'name_en': account_data['name_en'],
+            'type': account_data['type'],
+            'code': account_data['code'],
+            'full_code': full_code,
+            'level': level,
+            'parent_account_id': parent_id,
+            'is_group': account_data['is_group'],
+            'currency_id': currency_id,
+            'is_active': True,
+            'normal_balance': None,
+            'created_by': None,
+        }
+
+    @staticmethod
+    def _load_existing_accounts(session: Session, project_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        """
+        تحميل (full_code, id) لكل حسابات المشاريع المطلوبة باستعلام واحد
         
-        {"code": "5561", "name_ar": "مصاريف الفوائد", "name_en": "Interest Expense", 
-         "type": "Expense", "is_group": False, "parent_code": "5560", "level": 4},
+        Returns:
+            لكل مشروع: full_code -> id
+        """
+        existing: Dict[int, Dict[str, int]] = {project_id: {} for project_id in project_ids}
+        rows = (
+            session.query(ChartOfAccounts.project_id, ChartOfAccounts.full_code, ChartOfAccounts.id)
+            .filter(ChartOfAccounts.project_id.in_(project_ids))
+            .order_by(ChartOfAccounts.id)
+            .all()
+        )
+        for project_id, full_code, account_id in rows:
+            existing[project_id].setdefault(full_code, account_id)
+        return existing
+
+    @classmethod
+    def _create_accounts_per_row(cls, session: Session, project_id: int, template: CompiledTemplate,
+                                 currency_id: int, existing: Dict[str, int]) -> Dict[str, int]:
+        """إنشاء الحسابات حساباً حساباً (add + flush لكل حساب)"""
+        account_ids: List[Optional[int]] = [None] * len(template)
+        default_accounts = {}
+        created: List[Tuple[int, int, Optional[int]]] = []
         
-        {"code": "5562", "name_ar": "مصاريف الرسوم البنكية", "name_en": "Banking Fees Expense", 
-         "type": "Expense", "is_group": False, "parent_code": "5560", "level": 4},
+        # صفوف الإغلاق تُضاف دفعة واحدة في النهاية بدلاً من مستمع الحفظ بعد كل flush
+        session.info[_CLOSURE_MANAGED_KEY] = True
+        try:
+            for index in template.order:
+                _raise_if_cancelled()
+                account_data = template.accounts[index]
+                full_code = template.full_codes[index]
+                parent = template.parent_index[index]
+                parent_id = account_ids[parent] if parent >= 0 else None
+            
+            # التحقق من أن الحساب غير موجود مسبقاً
+                existing_id = existing.get(full_code)
+            
+                if existing_id:
+                    logger.debug("⏭️ الحساب %s موجود مسبقاً، تخطي", full_code)
+                    account_ids[index] = existing_id
+                    if account_data.tag:
+                        default_accounts[account_data.tag] = existing_id
+                    continue
+            
+            # إنشاء كائن الحساب
+                account = ChartOfAccounts(**cls._build_account_row(
+                    project_id, account_data, full_code, template.levels[index], parent_id, currency_id
+                ))
+            
+                session.add(account)
+                session.flush()  # للحصول على ID فوراً
+            
+                account_ids[index] = account.id
+                created.append((project_id, account.id, parent_id))
+            
+            # التقاط الحسابات الافتراضية المهمة
+                if account_data.tag:
+                    default_accounts[account_data.tag] = account.id
+        finally:
+            session.info.pop(_CLOSURE_MANAGED_KEY, None)
         
-        {"code": "5563", "name_ar": "مصاريف عمولات الوساطة", "name_en": "Brokerage Commissions", 
-         "type": "Expense", "is_group": False, "parent_code": "5560", "level": 4},
+        cls._insert_closure_rows(session, created)
+        return default_accounts
+
+    @classmethod
+    def _create_accounts_bulk(cls, session: Session, jobs: List[Tuple[int, SeedPlan, Dict[str, int]]]
+                              ) -> Dict[int, Dict[str, int]]:
+        """
+        إنشاء الحسابات من خطط الإنشاء بجملة INSERT متعددة الصفوف لكل مستوى من الشجرة
+        (لكل مشاريع الدفعة معاً) بدلاً من flush لكل حساب، مع ربط parent_account_id من المعرفات المُرجعة
         
-        {"code": "5570", "name_ar": "مصاريف المخصصات والاحتياطيات", "name_en": "Provisions & Reserves Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5550", "level": 3},
+        المشاريع الجديدة (بدون حسابات سابقة) تُدرج صفوف الخطة كما هي دون أي فحص لكل حساب
         
-        {"code": "5571", "name_ar": "مصاريف الديون المعدومة", "name_en": "Bad Debt Expense", 
-         "type": "Expense", "is_group": False, "parent_code": "5570", "level": 4},
+        Args:
+            jobs: قائمة (project_id, خطة الإنشاء, الحسابات الموجودة full_code -> id)
+            
+        Returns:
+            Dict[int, Dict[str, int]]: الحسابات الافتراضية لكل مشروع
+        """
+        account_ids: Dict[int, List[Optional[int]]] = {
+            project_id: [None] * len(plan) for project_id, plan, _ in jobs
+        }
+        depth = max((len(plan.levels) for _, plan, _ in jobs), default=0)
+        
+        for level in range(depth):
+            _raise_if_cancelled()
+            rows = []
+            pending = []
+            for project_id, plan, existing in jobs:
+                if level >= len(plan.levels):
+                    continue
+                indices, parents, base_rows = plan.levels[level]
+                ids = account_ids[project_id]
+                
+                if not existing:
+                    rows.extend(
+                        dict(base, project_id=project_id,
+                             parent_account_id=ids[parent] if parent >= 0 else None)
+                        for base, parent in zip(base_rows, parents)
+                    )
+                    pending.append((project_id, plan, indices))
+                    continue
+                
+                inserted = []
+                for index, parent, base in zip(indices, parents, base_rows):
+                    existing_id = existing.get(base['full_code'])
+                    if existing_id:
+                        logger.debug("⏭️ الحساب %s موجود مسبقاً، تخطي", base['full_code'])
+                        ids[index] = existing_id
+                        continue
+                    rows.append(dict(base, project_id=project_id,
+                                     parent_account_id=ids[parent] if parent >= 0 else None))
+                    inserted.append(index)
+                pending.append((project_id, plan, inserted))
+            
+            created = cls._bulk_insert_rows(session, rows)
+            for project_id, plan, indices in pending:
+                ids = account_ids[project_id]
+                codes = plan.template.codes
+                for index in indices:
+                    ids[index] = created.get((project_id, codes[index]))
+        
+        # الحسابات الافتراضية المهمة (المُنشأة والموجودة مسبقاً)
+        default_accounts: Dict[int, Dict[str, int]] = {}
+        created: List[Tuple[int, int, Optional[int]]] = []
+        for project_id, plan, existing in jobs:
+            ids = account_ids[project_id]
+            template = plan.template
+            full_codes = template.full_codes
+            default_accounts[project_id] = {
+                tag: ids[index] for tag, index in plan.default_tags.items() if ids[index]
+            }
+            for index in template.order:
+                if ids[index] and full_codes[index] not in existing:
+                    parent = template.parent_index[index]
+                    created.append((project_id, ids[index], ids[parent] if parent >= 0 else None))
+        cls._insert_closure_rows(session, created)
+        return default_accounts
+
+    # ==================== فهرس الشجرة (closure table) ====================
+    @classmethod
+    def _insert_closure_rows(cls, session: Session, accounts: List[Tuple[int, int, Optional[int]]]):
+        """
+        إضافة صفوف جدول الإغلاق لحسابات جديدة (project_id, account_id, parent_id) مرتبة الأب قبل الابن
         
-        {"code": "5572", "name_ar": "مصاريف مخصص الديون المشكوك فيها", "name_en": "Allowance for Doubtful Accounts", 
-         "type": "Expense", "is_group": False, "parent_code": "5570", "level": 4},
+        آباء الحسابات الموجودة مسبقاً تُقرأ سلاسلها باستعلام واحد، وسلاسل الحسابات الجديدة تُبنى في الذاكرة
+        """
+        if not accounts:
+            return
+        new_ids = {account_id for _, account_id, _ in accounts}
+        existing_parents = {parent_id for _, _, parent_id in accounts if parent_id and parent_id not in new_ids}
+        
+        # account_id -> [(ancestor_id, depth)] بما فيها الحساب نفسه
+        ancestors: Dict[int, List[Tuple[int, int]]] = {}
+        if existing_parents:
+            for ancestor_id, descendant_id, depth in (
+                session.query(CoaAccountClosure.ancestor_id, CoaAccountClosure.descendant_id,
+                              CoaAccountClosure.depth)
+                .filter(CoaAccountClosure.descendant_id.in_(existing_parents))
+            ):
+                ancestors.setdefault(descendant_id, []).append((ancestor_id, depth))
+        
+        # آباء بلا صفوف إغلاق (مشاريع أُنشئت قبل جدول الإغلاق أو عُدلت خارج المحرك):
+        # يُعاد بناء فهرس المشروع كاملاً من parent_account_id بدلاً من سلسلة ناقصة
+        missing = existing_parents.difference(ancestors)
+        if missing:
+            stale_projects = {project_id for project_id, _, parent_id in accounts if parent_id in missing}
+            logger.warning("⚠️ فهرس الشجرة ناقص للمشاريع %s، إعادة بنائه", sorted(stale_projects))
+            for project_id in stale_projects:
+                cls.rebuild_account_hierarchy(project_id, session)
+            accounts = [account for account in accounts if account[0] not in stale_projects]
+        
+        rows = []
+        for project_id, account_id, parent_id in accounts:
+            chain = [(account_id, 0)]
+            if parent_id:
+                chain.extend((ancestor_id, depth + 1) for ancestor_id, depth in ancestors.get(parent_id, ()))
+            ancestors[account_id] = chain
+            rows.extend(
+                {'project_id': project_id, 'ancestor_id': ancestor_id, 'descendant_id': account_id, 'depth': depth}
+                for ancestor_id, depth in chain
+            )
+        
+        table = CoaAccountClosure.__table__
+        for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+            session.execute(table.insert().values(rows[start:start + cls.BULK_INSERT_CHUNK_SIZE]))
+
+    @classmethod
+    def rebuild_account_hierarchy(cls, project_id: int, session: Optional[Session] = None) -> int:
+        """
+        إعادة بناء جدول الإغلاق لمشروع من parent_account_id (للمشاريع القديمة أو بعد تعديل الشجرة خارج المحرك)
         
-        {"code": "5573", "name_ar": "مصاريف مخصص مخاطر الائتمان", "name_en": "Credit Risk Provision", 
-         "type": "Expense", "is_group": False, "parent_code": "5570", "level": 4},
+        إضافة الحسابات أو نقلها أو حذفها عبر كائنات ORM تُحدّث الجدول تلقائياً عند الحفظ (flush)،
+        أما query.update()/delete() أو SQL مباشر على الحسابات فتتطلب استدعاءه
         
-        {"code": "5574", "name_ar": "مصاريف مخصص خسائر السوق", "name_en": "Market Loss Provision", 
-         "type": "Expense", "is_group": False, "parent_code": "5570", "level": 4},
+        لا يتم الحفظ (commit) هنا
         
-        {"code": "5580", "name_ar": "مصاريف التشغيل والامتثال", "name_en": "Operation & Compliance Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5550", "level": 3},
+        Returns:
+            int: عدد الحسابات المفهرسة
+        """
+        if session is None:
+            session = db.session
+        session.execute(CoaAccountClosure.__table__.delete().where(CoaAccountClosure.project_id == project_id))
+        rows = (
+            session.query(ChartOfAccounts.id, ChartOfAccounts.parent_account_id)
+            .filter(ChartOfAccounts.project_id == project_id)
+            .all()
+        )
+        children: Dict[Optional[int], List[int]] = {}
+        for account_id, parent_id in rows:
+            children.setdefault(parent_id, []).append(account_id)
+        account_ids = {account_id for account_id, _ in rows}
+        
+        # ترتيب عرضي من الجذور (والحسابات التي أبوها خارج المشروع تُعامل كجذور)
+        order = [(account_id, None) for parent_id, ids in children.items()
+                 if parent_id is None or parent_id not in account_ids for account_id in ids]
+        for account_id, _ in order:
+            order.extend((child, account_id) for child in children.get(account_id, ()))
+        cls._insert_closure_rows(session, [(project_id, account_id, parent_id) for account_id, parent_id in order])
+        return len(order)
+
+    @classmethod
+    def _index_flushed_accounts(cls, session: Session, accounts: List[Tuple[int, int, Optional[int]]],
+                                restructured: Dict[int, Tuple[Dict[int, Optional[int]], Dict[str, Dict[int, object]]]]):
+        """
+        تحديث جدول الإغلاق بعد flush: إعادة بناء المشاريع التي نُقل أو حُذف فيها حساب (وإعادة
+        توزيع أرصدتها المُجمّعة)، وإضافة سلاسل الحسابات الجديدة (project_id, account_id, parent_id)
+        في باقي المشاريع
+        """
+        for project_id, (parents, balances) in restructured.items():
+            cls.rebuild_account_hierarchy(project_id, session)
+            cls._redistribute_balances(session, project_id, parents, balances)
+        accounts = [account for account in accounts if account[0] not in restructured]
+        if not accounts:
+            return
+        
+        # ترتيب الأب قبل الابن: عمق كل حساب بين الحسابات الجديدة نفسها
+        parents = {account_id: parent_id for _, account_id, parent_id in accounts}
+        depths: Dict[int, int] = {}
+        for account_id in parents:
+            chain = []
+            while account_id in parents and account_id not in depths:
+                chain.append(account_id)
+                account_id = parents[account_id]
+            depth = depths.get(account_id, -1)
+            for item in reversed(chain):
+                depth += 1
+                depths[item] = depth
+        cls._insert_closure_rows(session, sorted(accounts, key=lambda account: depths[account[1]]))
+
+    @staticmethod
+    def _snapshot_balances(session: Session, project_id: int
+                           ) -> Tuple[Dict[int, Optional[int]], Dict[str, Dict[int, object]]]:
+        """(account_id -> الأب، الفترة -> account_id -> الرصيد المُجمّع) لمشروع قبل نقل أو حذف حسابات فيه"""
+        table = CoaAccountBalance.__table__
+        balances: Dict[str, Dict[int, object]] = {}
+        for account_id, period, balance in session.execute(
+            select(table.c.account_id, table.c.period, table.c.balance).where(table.c.project_id == project_id)
+        ):
+            balances.setdefault(period, {})[account_id] = balance
+        if not balances:
+            return {}, balances
+        parents = dict(session.execute(
+            select(ChartOfAccounts.id, ChartOfAccounts.parent_account_id)
+            .where(ChartOfAccounts.project_id == project_id)
+        ).all())
+        return parents, balances
+
+    @classmethod
+    def _redistribute_balances(cls, session: Session, project_id: int, parents: Dict[int, Optional[int]],
+                               balances: Dict[str, Dict[int, object]]):
+        """
+        الأرصدة المُجمّعة بعد نقل أو حذف حسابات: رصيد كل حساب وحده = رصيده المُجمّع ناقص المُجمّع
+        لأبنائه في الشجرة القديمة، ثم يُعاد تجميعه على الشجرة الجديدة (رصيد الحساب المحذوف يُحذف معه)
+        """
+        if not balances:
+            return
+        tree = cls.load_account_tree(project_id, session)
+        for period, totals in balances.items():
+            own = dict(totals)
+            for account_id, total in totals.items():
+                parent_id = parents.get(account_id)
+                if parent_id is not None:
+                    own[parent_id] = own.get(parent_id, 0) - total
+            cls._write_balance_cache(session, project_id, period, tree.rollup({
+                account_id: amount for account_id, amount in own.items()
+                if amount and account_id in tree.index_by_id
+            }))
+
+    @staticmethod
+    def get_descendant_ids(account_id: int, session: Optional[Session] = None,
+                           include_self: bool = True) -> List[int]:
+        """كل الحسابات تحت حساب (بأي عمق) باستعلام واحد، الأقرب أولاً"""
+        if session is None:
+            session = db.session
+        query = session.query(CoaAccountClosure.descendant_id).filter(CoaAccountClosure.ancestor_id == account_id)
+        if not include_self:
+            query = query.filter(CoaAccountClosure.depth > 0)
+        return [descendant_id for descendant_id, in query.order_by(CoaAccountClosure.depth)]
+
+    @staticmethod
+    def get_ancestor_ids(account_id: int, session: Optional[Session] = None) -> List[int]:
+        """آباء الحساب حتى الجذر باستعلام واحد (الأب المباشر أولاً)"""
+        if session is None:
+            session = db.session
+        query = (
+            session.query(CoaAccountClosure.ancestor_id)
+            .filter(CoaAccountClosure.descendant_id == account_id, CoaAccountClosure.depth > 0)
+            .order_by(CoaAccountClosure.depth)
+        )
+        return [ancestor_id for ancestor_id, in query]
+
+    # ==================== تجميع الأرصدة ====================
+    @staticmethod
+    def load_account_tree(project_id: int, session: Optional[Session] = None) -> AccountTree:
+        """تحميل شجرة حسابات المشروع باستعلام واحد"""
+        if session is None:
+            session = db.session
+        rows = (
+            session.query(ChartOfAccounts.id, ChartOfAccounts.parent_account_id, ChartOfAccounts.code,
+                          ChartOfAccounts.full_code, ChartOfAccounts.is_group)
+            .filter(ChartOfAccounts.project_id == project_id)
+            .order_by(ChartOfAccounts.id)
+            .all()
+        )
+        return AccountTree(project_id, rows)
+
+    # ==================== حل أكواد الحسابات دفعة واحدة ====================
+    @classmethod
+    def migrate_code_index(cls, engine=None):
+        """
+        ترحيل لمرة واحدة (من سكربت النشر وليس من مسار الطلبات): إنشاء الفهرس ix_coa_project_code
+        على (project_id, code) في جدول الحسابات إذا لم يكن موجوداً، في معاملة مستقلة
         
-        {"code": "5581", "name_ar": "مصاريف الامتثال التنظيمي", "name_en": "Regulatory Compliance Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5580", "level": 4},
+        يغطي استعلام resolve_code_pairs: في PostgreSQL يُضمَّن id في الفهرس (INCLUDE)،
+        وفي SQLite و MySQL يحمل كل فهرس المفتاح الأساسي أصلاً
+        """
+        if engine is None:
+            engine = db.engine
+        with engine.begin() as connection:
+            cls._create_account_index(connection, 'ix_coa_project_code', ['project_id', 'code'],
+                                      postgresql_include=['id'])
+
+    @classmethod
+    def resolve_codes(cls, project_id: int, codes: List[str],
+                      session: Optional[Session] = None) -> Dict[str, int]:
+        """
+        معرفات حسابات المشروع لعدة أكواد (مثل 1211 الخزينة، 4110 المبيعات، 2150 الضريبة) باستعلام واحد
         
-        {"code": "5582", "name_ar": "مصاريف التدقيق والمراجعة", "name_en": "Audit & Review Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5580", "level": 4},
+        Returns:
+            Dict[str, int]: code -> id للأكواد الموجودة في المشروع فقط
+        """
+        resolved = cls.resolve_code_pairs([(project_id, code) for code in codes], session)
+        return {code: account_id for (_, code), account_id in resolved.items()}
+
+    @staticmethod
+    def resolve_code_pairs(pairs: List[Tuple[int, str]],
+                           session: Optional[Session] = None) -> Dict[Tuple[int, str], int]:
+        """
+        معرفات الحسابات لأزواج (project_id, code) من عدة مشاريع باستعلام واحد (مثل كل سطور ملف استيراد فواتير)
         
-        {"code": "5583", "name_ar": "مصاريف أنظمة وتقنيات مصرفية", "name_en": "Banking Systems & Technology", 
-         "type": "Expense", "is_group": False, "parent_code": "5580", "level": 4},
+        إذا تكرر الكود في نفس المشروع يُعاد الحساب الأقدم. يعتمد أداؤه على الفهرس
+        الذي ينشئه migrate_code_index
         
-        {"code": "5584", "name_ar": "مصاريف تأمين الودائع والأصول", "name_en": "Deposit & Asset Insurance", 
-         "type": "Expense", "is_group": False, "parent_code": "5580", "level": 4},
+        Returns:
+            Dict[Tuple[int, str], int]: (project_id, code) -> id للأزواج الموجودة فقط
+        """
+        if session is None:
+            session = db.session
+        wanted = set(pairs)
+        if not wanted:
+            return {}
+        project_ids = {project_id for project_id, _ in wanted}
+        query = session.query(ChartOfAccounts.project_id, ChartOfAccounts.code, ChartOfAccounts.id)
+        if len(project_ids) == 1:
+            query = query.filter(ChartOfAccounts.project_id == next(iter(project_ids)))
+        else:
+            query = query.filter(ChartOfAccounts.project_id.in_(project_ids))
+        query = query.filter(ChartOfAccounts.code.in_({code for _, code in wanted}))
+        
+        # الاستعلام يقرأ حاصل ضرب المشاريع في الأكواد فتُستبعد الأزواج غير المطلوبة هنا
+        resolved: Dict[Tuple[int, str], int] = {}
+        for project_id, code, account_id in query:
+            key = (project_id, code)
+            if key in wanted and (key not in resolved or account_id < resolved[key]):
+                resolved[key] = account_id
+        return resolved
+
+    # ==================== ذاكرة مؤقتة لشجرة كل مشروع ====================
+    # أقصى عدد مشاريع في الذاكرة (يُحذف الأقدم استخداماً)
+    PROJECT_TREE_CACHE_SIZE = 256
+    # أقصى عمر (بالثواني) لشجرة في الذاكرة: حد تأخر رؤية تعديلات العمليات الأخرى
+    PROJECT_TREE_TTL = 60.0
+    # project_id -> (وقت التحميل بـ time.monotonic، الشجرة)
+    _project_trees: 'OrderedDict[int, Tuple[float, AccountTree]]' = OrderedDict()
+    # عدّاد الأجيال: يزداد مع كل إبطال، ويُسجل لكل مشروع جيل آخر إبطال له
+    # (_tree_floor: جيل إبطال كل المشاريع أو اختصار السجل عند تضخمه)
+    _tree_generation = 0
+    _tree_generations: Dict[int, int] = {}
+    _tree_floor = 0
+    _tree_lock = threading.Lock()
+
+    @classmethod
+    def get_project_tree(cls, project_id: int, session: Optional[Session] = None) -> AccountTree:
+        """
+        شجرة حسابات المشروع من الذاكرة المؤقتة، وتُحمّل باستعلام واحد عند أول طلب فقط
         
-        {"code": "5590", "name_ar": "مصاريف الفروع والشبكات", "name_en": "Branches & Networks Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5550", "level": 3},
+        الذاكرة خاصة بكل عملية: تُبطل فوراً عند انتهاء أي معاملة في هذه العملية عدّلت حسابات
+        المشروع عبر جلسة SQLAlchemy (المحرك أو كائنات ORM)، أما تعديلات العمليات الأخرى (عمال
+        gunicorn آخرون أو خوادم أخرى) فلا تظهر إلا بعد انتهاء عمر الشجرة PROJECT_TREE_TTL،
+        أي أن الذاكرة متسقة مع قاعدة البيانات في النهاية فقط. التعديل بـ SQL مباشر داخل هذه
+        العملية يُبطل بـ invalidate_project_tree
         
-        {"code": "5591", "name_ar": "مصاريف تشغيل الفروع", "name_en": "Branch Operation Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5590", "level": 4},
+        الشجرة مشتركة بين الطلبات فلا يجب تعديلها
+        """
+        if session is None:
+            session = db.session
+        # جلسة عدّلت حسابات المشروع ولم تحفظها بعد: تقرأ تعديلاتها ولا تشاركها
+        touched = session.info.get(_TOUCHED_PROJECTS_KEY)
+        if touched and (project_id in touched or None in touched):
+            return cls.load_account_tree(project_id, session)
+        
+        now = time.monotonic()
+        with cls._tree_lock:
+            entry = cls._project_trees.get(project_id)
+            if entry is not None:
+                if now - entry[0] < cls.PROJECT_TREE_TTL:
+                    cls._project_trees.move_to_end(project_id)
+                    return entry[1]
+                del cls._project_trees[project_id]
+            generation = cls._tree_generation
+        
+        # لا تُخزن شجرة أُبطلت أثناء تحميلها، ويُحسب عمرها من بداية التحميل
+        tree = cls.load_account_tree(project_id, session)
+        with cls._tree_lock:
+            if max(cls._tree_generations.get(project_id, 0), cls._tree_floor) <= generation:
+                cls._project_trees[project_id] = (now, tree)
+                while len(cls._project_trees) > cls.PROJECT_TREE_CACHE_SIZE:
+                    cls._project_trees.popitem(last=False)
+        return tree
+
+    @classmethod
+    def invalidate_project_tree(cls, project_id: Optional[int] = None):
+        """
+        إبطال شجرة مشروع في ذاكرة هذه العملية (أو كل المشاريع عند None) بعد تعديل حساباته من خارج الجلسة
         
-        {"code": "5592", "name_ar": "مصاريف أجهزة الصراف الآلي", "name_en": "ATM Expenses", 
-         "type": "Expense", "is_group": False, "parent_code": "5590", "level": 4},
+        لا يصل الإبطال إلى العمليات الأخرى، فهي ترى التعديل بعد انتهاء PROJECT_TREE_TTL
+        """
+        cls._invalidate_project_trees({project_id})
+
+    @classmethod
+    def _invalidate_project_trees(cls, project_ids):
+        with cls._tree_lock:
+            cls._tree_generation += 1
+            if None in project_ids:
+                cls._tree_floor = cls._tree_generation
+                cls._tree_generations.clear()
+                cls._project_trees.clear()
+                return
+            for project_id in project_ids:
+                cls._tree_generations[project_id] = cls._tree_generation
+                cls._project_trees.pop(project_id, None)
+            if len(cls._tree_generations) > 4 * cls.PROJECT_TREE_CACHE_SIZE:
+                # اختصار السجل: يكفي أن تُرفض أشجار كانت قيد التحميل قبل الآن
+                cls._tree_floor = cls._tree_generation
+                cls._tree_generations.clear()
+
+    @classmethod
+    def rollup_balances(cls, project_id: int, balances: Mapping[int, object],
+                        session: Optional[Session] = None) -> Dict[int, object]:
+        """
+        إجمالي كل حسابات المشروع (والمجموعات حتى المستوى الأول) من أرصدة الحسابات الفرعية
         
-        {"code": "5593", "name_ar": "مصاريف البنية التحتية للشبكات", "name_en": "Network Infrastructure", 
-         "type": "Expense", "is_group": False, "parent_code": "5590", "level": 4},
+        Args:
+            balances: account_id -> الرصيد
+            
+        Returns:
+            Dict[int, رصيد]: الإجمالي لكل حساب
+        """
+        return cls.load_account_tree(project_id, session).rollup(balances)
+
+    @classmethod
+    def post_balance_deltas(cls, project_id: int, period: str, deltas: Mapping[int, object],
+                            session: Optional[Session] = None) -> int:
+        """
+        ترحيل فروق أرصدة حسابات إلى الأرصدة المُجمّعة للفترة: كل فرق يُضاف للحساب ولكل آبائه
         
-        # ============ المصروفات - أخرى (تحت 5000) ============
-        {"code": "5600", "name_ar": "مصاريف إدارية - مالية", "name_en": "Administrative Expenses - Financial", 
-         "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
+        سلاسل الآباء تُقرأ من جدول الإغلاق باستعلام واحد، والتحديث جملة واحدة لكل الحسابات المتأثرة.
+        نقل الحسابات أو حذفها عبر كائنات ORM يعيد توزيع الأرصدة المُجمّعة تلقائياً عند الحفظ.
+        لا يتم الحفظ (commit) هنا حتى يكون التحديث جزءاً من معاملة الترحيل نفسها
         
-        {"code": "5610", "name_ar": "مصاريف التسويق المصرفي", "name_en": "Banking Marketing Expenses", 
-         "type": "Expense", "is_group": True, "parent_code": "5600", "level": 3},
+        Args:
+            period: مفتاح الفترة (مثل '2026-10')
+            deltas: account_id -> الفرق (مدين موجب / دائن سالب حسب اصطلاح الخدمة)
+            
+        Returns:
+            int: عدد صفوف الأرصدة المُحدّثة
+        """
+        if session is None:
+            session = db.session
+        deltas = {account_id: amount for account_id, amount in deltas.items() if amount}
+        if not deltas:
+            return 0
+        
+        def chains() -> List[Tuple[int, int]]:
+            return (
+                session.query(CoaAccountClosure.ancestor_id, CoaAccountClosure.descendant_id)
+                .filter(CoaAccountClosure.project_id == project_id,
+                        CoaAccountClosure.descendant_id.in_(list(deltas)))
+                .all()
+            )
+        
+        rows = chains()
+        missing = set(deltas).difference(descendant_id for _, descendant_id in rows)
+        if missing:
+            # حسابات أُضيفت بـ SQL مباشر بلا صفوف إغلاق: يُعاد بناء فهرس المشروع مرة واحدة
+            logger.warning("⚠️ حسابات غير مفهرسة في شجرة المشروع %s: %s، إعادة بنائها",
+                           project_id, sorted(missing))
+            cls.rebuild_account_hierarchy(project_id, session)
+            rows = chains()
+            missing = set(deltas).difference(descendant_id for _, descendant_id in rows)
+            if missing:
+                raise ValueError(f"الحسابات {sorted(missing)} ليست في شجرة المشروع {project_id}")
+        
+        totals: Dict[int, object] = {}
+        for ancestor_id, descendant_id in rows:
+            totals[ancestor_id] = totals.get(ancestor_id, 0) + deltas[descendant_id]
+        
+        cls._add_to_balances(session, [
+            {'account_id': account_id, 'period': period, 'project_id': project_id, 'balance': amount}
+            for account_id, amount in totals.items()
+        ])
+        return len(totals)
+
+    @classmethod
+    def _add_to_balances(cls, session: Session, rows: List[Dict]):
+        """
+        إضافة مبالغ لصفوف الأرصدة (وإنشاء الناقص منها)
         
-        {"code": "5611", "name_ar": "مصاريف الإعلانات البنكية", "name_en": "Banking Advertising", 
-         "type": "Expense", "is_group": False, "parent_code": "5610", "level": 4},
+        PostgreSQL و SQLite: INSERT ... ON CONFLICT DO UPDATE بجملة واحدة،
+        وباقي قواعد البيانات: UPDATE للموجود ثم INSERT للباقي
+        """
+        table = CoaAccountBalance.__table__
+        insert = cls._dialect_insert(session)
+        if insert is not None:
+            for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+                statement = insert(table).values(rows[start:start + cls.BULK_INSERT_CHUNK_SIZE])
+                session.execute(statement.on_conflict_do_update(
+                    index_elements=['account_id', 'period'],
+                    set_={'balance': table.c.balance + statement.excluded.balance},
+                ))
+            return
+        
+        period = rows[0]['period']
+        present = {
+            account_id for account_id, in session.query(CoaAccountBalance.account_id)
+            .filter(CoaAccountBalance.period == period,
+                    CoaAccountBalance.account_id.in_([row['account_id'] for row in rows]))
+        }
+        updates = [row for row in rows if row['account_id'] in present]
+        if updates:
+            session.execute(
+                table.update()
+                .where(table.c.account_id == bindparam('b_account_id'), table.c.period == bindparam('b_period'))
+                .values(balance=table.c.balance + bindparam('b_balance')),
+                [{'b_account_id': row['account_id'], 'b_period': row['period'], 'b_balance': row['balance']}
+                 for row in updates]
+            )
+        inserts = [row for row in rows if row['account_id'] not in present]
+        if inserts:
+            session.execute(table.insert(), inserts)
+
+    @staticmethod
+    def get_account_balances(account_ids: List[int], period: str,
+                             session: Optional[Session] = None) -> Dict[int, object]:
+        """الأرصدة المُجمّعة لحسابات (أو مجموعات) في فترة باستعلام واحد (0 لما لا رصيد له)"""
+        if session is None:
+            session = db.session
+        balances = dict.fromkeys(account_ids, 0)
+        balances.update(
+            session.query(CoaAccountBalance.account_id, CoaAccountBalance.balance)
+            .filter(CoaAccountBalance.period == period, CoaAccountBalance.account_id.in_(account_ids))
+            .all()
+        )
+        return balances
+
+    @classmethod
+    def rebuild_balance_cache(cls, project_id: int, period: str, balances: Mapping[int, object],
+                              session: Optional[Session] = None) -> int:
+        """
+        إعادة بناء الأرصدة المُجمّعة لفترة من أرصدة الحسابات (لأول مرة، أو بعد تعديل الشجرة
+        بـ query.update()/delete() أو SQL مباشر؛ النقل والحذف عبر كائنات ORM يعيد توزيعها تلقائياً)
         
-        {"code": "5612", "name_ar": "مصاريف العلاقات العامة", "name_en": "Public Relations", 
-         "type": "Expense", "is_group": False, "parent_code": "5610", "level": 4},
+        لا يتم الحفظ (commit) هنا
         
-        {"code": "5613", "name_ar": "مصاريف الفعاليات والمؤتمرات", "name_en": "Events & Conferences", 
-         "type": "Expense", "is_group": False, "parent_code": "5610", "level": 4},
-    ]
-    
-    @classmethod
-    def get_education_extensions(cls) -> List[Dict]:
-        """التعليم والتدريب"""
-        return [
-			# ============ الأصول الثابتة - التعليمية (تحت 1100) ============
-			{"code": "11100", "name_ar": "الأصول التعليمية", "name_en": "Educational Assets", 
-			 "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-			
-			{"code": "11101", "name_ar": "معدات وأجهزة تعليمية", "name_en": "Educational Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11100", "level": 4},
-			
-			{"code": "11102", "name_ar": "مختبرات ومعامل", "name_en": "Laboratories & Labs", 
-			 "type": "Asset", "is_group": False, "parent_code": "11100", "level": 4},
-			
-			{"code": "11103", "name_ar": "تجهيزات فصول ومدرجات", "name_en": "Classroom & Auditorium Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11100", "level": 4},
-			
-			{"code": "11104", "name_ar": "مكتبات ومصادر تعلم", "name_en": "Libraries & Learning Resources", 
-			 "type": "Asset", "is_group": False, "parent_code": "11100", "level": 4},
-			
-			{"code": "11105", "name_ar": "منصات التعلم الإلكتروني", "name_en": "E-learning Platforms", 
-			 "type": "Asset", "is_group": False, "parent_code": "11100", "level": 4},
-			
-			# ============ الأصول المتداولة - التعليمية (تحت 1200) ============
-			{"code": "12160", "name_ar": "مخزونات تعليمية", "name_en": "Educational Inventory", 
-			 "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-			
-			{"code": "12161", "name_ar": "كتب ومراجع علمية", "name_en": "Books & Scientific References", 
-			 "type": "Asset", "is_group": False, "parent_code": "12160", "level": 4},
-			
-			{"code": "12162", "name_ar": "مستلزمات تدريبية ومعملية", "name_en": "Training & Lab Supplies", 
-			 "type": "Asset", "is_group": False, "parent_code": "12160", "level": 4},
-			
-			{"code": "12163", "name_ar": "مواد وأدوات تعليمية", "name_en": "Educational Materials & Tools", 
-			 "type": "Asset", "is_group": False, "parent_code": "12160", "level": 4},
-			
-			{"code": "12164", "name_ar": "معدات وألعاب تعليمية", "name_en": "Educational Games & Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "12160", "level": 4},
-			
-			# ============ الخصوم - التعليمية (تحت 2100) ============
-			{"code": "21120", "name_ar": "موردو الخدمات التعليمية", "name_en": "Educational Services Suppliers", 
-			 "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-			
-			{"code": "21121", "name_ar": "موردون كتب ومراجع", "name_en": "Books & References Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21120", "level": 4},
-			
-			{"code": "21122", "name_ar": "موردون معدات تعليمية", "name_en": "Educational Equipment Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21120", "level": 4},
-			
-			{"code": "21123", "name_ar": "موردون برامج ومنصات تعليمية", "name_en": "Educational Software & Platforms", 
-			 "type": "Liability", "is_group": False, "parent_code": "21120", "level": 4},
-			
-			{"code": "21124", "name_ar": "موردون خدمات تدريب واستشارات", "name_en": "Training & Consulting Services", 
-			 "type": "Liability", "is_group": False, "parent_code": "21120", "level": 4},
-			
-			# ============ الإيرادات - التعليمية (تحت 4000) ============
-			{"code": "4800", "name_ar": "إيرادات الخدمات التعليمية", "name_en": "Educational Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-			
-			{"code": "4810", "name_ar": "إيرادات الرسوم الدراسية", "name_en": "Tuition Fees Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4800", "level": 3},
-			
-			{"code": "4811", "name_ar": "رسوم التسجيل والقبول", "name_en": "Registration & Admission Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4810", "level": 4},
-			
-			{"code": "4812", "name_ar": "رسوم الفصول الدراسية", "name_en": "Semester/Course Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4810", "level": 4},
-			
-			{"code": "4813", "name_ar": "رسوم برامج خاصة", "name_en": "Special Program Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4810", "level": 4},
-			
-			{"code": "4814", "name_ar": "رسوم الدراسات العليا", "name_en": "Graduate Studies Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4810", "level": 4},
-			
-			{"code": "4820", "name_ar": "إيرادات التدريب والدورات", "name_en": "Training & Courses Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4800", "level": 3},
-			
-			{"code": "4821", "name_ar": "رسوم دورات تدريبية", "name_en": "Training Course Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4820", "level": 4},
-			
-			{"code": "4822", "name_ar": "رسوم ورش عمل", "name_en": "Workshop Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4820", "level": 4},
-			
-			{"code": "4823", "name_ar": "رسوم شهادات مهنية", "name_en": "Professional Certification Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4820", "level": 4},
-			
-			{"code": "4830", "name_ar": "إيرادات خدمات تعليمية إضافية", "name_en": "Additional Educational Services", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4800", "level": 3},
-			
-			{"code": "4831", "name_ar": "رسوم النقل المدرسي", "name_en": "School Transportation Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4830", "level": 4},
-			
-			{"code": "4832", "name_ar": "رسوم الأنشطة والرحلات", "name_en": "Activities & Trips Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4830", "level": 4},
-			
-			{"code": "4833", "name_ar": "رسوم الكافتيريا والمطاعم", "name_en": "Cafeteria & Restaurant Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4830", "level": 4},
-			
-			{"code": "4834", "name_ar": "رسوم السكن والإقامة", "name_en": "Housing & Accommodation Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4830", "level": 4},
-			
-			{"code": "4840", "name_ar": "إيرادات التعلم الإلكتروني", "name_en": "E-learning Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4800", "level": 3},
-			
-			{"code": "4841", "name_ar": "رسوم اشتراكات التعلم الإلكتروني", "name_en": "E-learning Subscriptions", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4840", "level": 4},
-			
-			{"code": "4842", "name_ar": "رسوم دورات أونلاين", "name_en": "Online Course Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4840", "level": 4},
-			
-			{"code": "4843", "name_ar": "رسوم اختبارات إلكترونية", "name_en": "Electronic Testing Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4840", "level": 4},
-			
-			{"code": "4844", "name_ar": "رسوم شهادات رقمية", "name_en": "Digital Certificates Fees", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4840", "level": 4},
-			
-			{"code": "4850", "name_ar": "إيرادات البحوث والاستشارات", "name_en": "Research & Consulting Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4800", "level": 3},
-			
-			{"code": "4851", "name_ar": "إيرادات المشاريع البحثية", "name_en": "Research Projects Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4850", "level": 4},
-			
-			{"code": "4852", "name_ar": "إيرادات الاستشارات الأكاديمية", "name_en": "Academic Consulting Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4850", "level": 4},
-			
-			{"code": "4853", "name_ar": "إيرادات النشر العلمي", "name_en": "Scientific Publishing Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4850", "level": 4},
-			
-			# ============ التكاليف - التعليمية (تحت 5000) ============
-			{"code": "5620", "name_ar": "تكاليف الخدمات التعليمية", "name_en": "Educational Services Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5630", "name_ar": "تكاليف المواد التعليمية", "name_en": "Educational Materials Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5620", "level": 3},
-			
-			{"code": "5631", "name_ar": "تكلفة الكتب والمراجع", "name_en": "Books & References Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5630", "level": 4},
-			
-			{"code": "5632", "name_ar": "تكلفة المستلزمات التعليمية", "name_en": "Educational Supplies Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5630", "level": 4},
-			
-			{"code": "5633", "name_ar": "تكلفة برامج ومنصات تعليمية", "name_en": "Educational Software & Platforms", 
-			 "type": "Expense", "is_group": False, "parent_code": "5630", "level": 4},
-			
-			{"code": "5640", "name_ar": "تكاليف التدريب والتطوير", "name_en": "Training & Development Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5620", "level": 3},
-			
-			{"code": "5641", "name_ar": "تكلفة دورات تدريبية خارجية", "name_en": "External Training Courses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5640", "level": 4},
-			
-			{"code": "5642", "name_ar": "تكلفة استشارات تعليمية", "name_en": "Educational Consulting Costs", 
-			 "type": "Expense", "is_group": False, "parent_code": "5640", "level": 4},
-			
-			{"code": "5643", "name_ar": "تكلفة تراخيص وشهادات", "name_en": "Licenses & Certifications Costs", 
-			 "type": "Expense", "is_group": False, "parent_code": "5640", "level": 4},
-			
-			# ============ المصروفات - التعليمية (تحت 5000) ============
-			{"code": "5650", "name_ar": "مصاريف تشغيلية - تعليمية", "name_en": "Operational Expenses - Educational", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5660", "name_ar": "رواتب ومكافآت الكوادر التعليمية", "name_en": "Educational Staff Salaries", 
-			 "type": "Expense", "is_group": True, "parent_code": "5650", "level": 3},
-			
-			{"code": "5661", "name_ar": "رواتب الأساتذة والمعلمين", "name_en": "Teachers & Professors Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5660", "level": 4},
-			
-			{"code": "5662", "name_ar": "رواتب الإداريين والمشرفين", "name_en": "Administrators & Supervisors", 
-			 "type": "Expense", "is_group": False, "parent_code": "5660", "level": 4},
-			
-			{"code": "5663", "name_ar": "رواتب الفنيين والمساعدين", "name_en": "Technicians & Assistants", 
-			 "type": "Expense", "is_group": False, "parent_code": "5660", "level": 4},
-			
-			{"code": "5664", "name_ar": "مكافآت وحوافز تعليمية", "name_en": "Educational Bonuses & Incentives", 
-			 "type": "Expense", "is_group": False, "parent_code": "5660", "level": 4},
-			
-			{"code": "5670", "name_ar": "مصاريف التشغيل والصيانة", "name_en": "Operation & Maintenance Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5650", "level": 3},
-			
-			{"code": "5671", "name_ar": "مصاريف صيانة المباني التعليمية", "name_en": "Educational Buildings Maintenance", 
-			 "type": "Expense", "is_group": False, "parent_code": "5670", "level": 4},
-			
-			{"code": "5672", "name_ar": "مصاريف صيانة المعدات التعليمية", "name_en": "Educational Equipment Maintenance", 
-			 "type": "Expense", "is_group": False, "parent_code": "5670", "level": 4},
-			
-			{"code": "5673", "name_ar": "مصاريف النظافة والتعقيم", "name_en": "Cleaning & Sterilization", 
-			 "type": "Expense", "is_group": False, "parent_code": "5670", "level": 4},
-			
-			{"code": "5680", "name_ar": "مصاريف الأنشطة والبرامج", "name_en": "Activities & Programs Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5650", "level": 3},
-			
-			{"code": "5681", "name_ar": "مصاريف الرحلات والزيارات", "name_en": "Trips & Visits Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5680", "level": 4},
-			
-			{"code": "5682", "name_ar": "مصاريف الفعاليات والاحتفالات", "name_en": "Events & Celebrations", 
-			 "type": "Expense", "is_group": False, "parent_code": "5680", "level": 4},
-			
-			{"code": "5683", "name_ar": "مصاريف المسابقات والمنافسات", "name_en": "Competitions & Contests", 
-			 "type": "Expense", "is_group": False, "parent_code": "5680", "level": 4},
-			
-			{"code": "5684", "name_ar": "مصاريف المخيمات والأنشطة الصيفية", "name_en": "Camps & Summer Activities", 
-			 "type": "Expense", "is_group": False, "parent_code": "5680", "level": 4},
-			
-			{"code": "5690", "name_ar": "مصاريف التكنولوجيا والتطوير", "name_en": "Technology & Development Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5650", "level": 3},
-			
-			{"code": "5691", "name_ar": "مصاريف منصات التعلم الإلكتروني", "name_en": "E-learning Platforms Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5690", "level": 4},
-			
-			{"code": "5692", "name_ar": "مصاريف تراخيص برامج تعليمية", "name_en": "Educational Software Licenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5690", "level": 4},
-			
-			{"code": "5693", "name_ar": "مصاريف البحث والتطوير التعليمي", "name_en": "Educational R&D Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5690", "level": 4},
-			
-			{"code": "5700", "name_ar": "إهلاك الأصول التعليمية", "name_en": "Educational Assets Depreciation", 
-			 "type": "Expense", "is_group": True, "parent_code": "5650", "level": 3},
-			
-			{"code": "5701", "name_ar": "إهلاك المعدات التعليمية", "name_en": "Educational Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5700", "level": 4},
-			
-			{"code": "5702", "name_ar": "إهلاك المنصات الإلكترونية", "name_en": "Electronic Platforms Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5700", "level": 4},
-			
-			{"code": "5703", "name_ar": "إهلاك المكتبات والمصادر", "name_en": "Libraries & Resources Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5700", "level": 4},
-			
-			{"code": "5710", "name_ar": "مصاريف الاعتماد والجودة", "name_en": "Accreditation & Quality Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5650", "level": 3},
-			
-			{"code": "5711", "name_ar": "مصاريف الاعتماد الأكاديمي", "name_en": "Academic Accreditation Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5710", "level": 4},
-			
-			{"code": "5712", "name_ar": "مصاريف ضمان الجودة التعليمية", "name_en": "Educational Quality Assurance", 
-			 "type": "Expense", "is_group": False, "parent_code": "5710", "level": 4},
-			
-			{"code": "5713", "name_ar": "مصاريف التقييم والاختبارات", "name_en": "Assessment & Testing Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5710", "level": 4},
-		]
-    
-    @classmethod
-    def get_logistics_extensions(cls) -> List[Dict]:
-        """النقل والخدمات اللوجستية"""
-        return [
-			# ============ الأصول الثابتة - لوجستية (تحت 1100) ============
-			{"code": "11116", "name_ar": "الأصول اللوجستية والنقل", "name_en": "Logistics & Transportation Assets", 
-			 "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-			
-			{"code": "11961", "name_ar": "مركبات النقل البري", "name_en": "Ground Transportation Vehicles", 
-			 "type": "Asset", "is_group": False, "parent_code": "11116", "level": 4},
-			
-			{"code": "11962", "name_ar": "معدات الموانئ والمطارات", "name_en": "Ports & Airports Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11116", "level": 4},
-			
-			{"code": "11963", "name_ar": "معدات التحميل والتفريغ", "name_en": "Loading & Unloading Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11116", "level": 4},
-			
-			{"code": "11964", "name_ar": "مركبات النقل الثقيل", "name_en": "Heavy Transport Vehicles", 
-			 "type": "Asset", "is_group": False, "parent_code": "11116", "level": 4},
-			
-			{"code": "11965", "name_ar": "أنظمة التتبع والمراقبة", "name_en": "Tracking & Monitoring Systems", 
-			 "type": "Asset", "is_group": False, "parent_code": "11116", "level": 4},
-			
-			# ============ الأصول المتداولة - لوجستية (تحت 1200) ============
-			{"code": "12170", "name_ar": "مخزونات لوجستية", "name_en": "Logistics Inventory", 
-			 "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-			
-			{"code": "12171", "name_ar": "وقود وزيوت تشغيل", "name_en": "Fuel & Operating Oils", 
-			 "type": "Asset", "is_group": False, "parent_code": "12170", "level": 4},
-			
-			{"code": "12172", "name_ar": "قطع غيار ولوازم صيانة", "name_en": "Spare Parts & Maintenance Supplies", 
-			 "type": "Asset", "is_group": False, "parent_code": "12170", "level": 4},
-			
-			{"code": "12173", "name_ar": "مواد التعبئة والتغليف", "name_en": "Packaging & Wrapping Materials", 
-			 "type": "Asset", "is_group": False, "parent_code": "12170", "level": 4},
-			
-			{"code": "12174", "name_ar": "أدوات وأجهزة السلامة", "name_en": "Safety Tools & Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "12170", "level": 4},
-			
-			{"code": "12175", "name_ar": "بضائع تحت النقل", "name_en": "Goods in Transit", 
-			 "type": "Asset", "is_group": False, "parent_code": "12170", "level": 4},
-			
-			# ============ الخصوم - لوجستية (تحت 2100) ============
-			{"code": "21130", "name_ar": "موردو الخدمات اللوجستية", "name_en": "Logistics Services Suppliers", 
-			 "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-			
-			{"code": "21131", "name_ar": "موردون وقود وزيوت", "name_en": "Fuel & Oils Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21130", "level": 4},
-			
-			{"code": "21132", "name_ar": "موردون قطع غيار", "name_en": "Spare Parts Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21130", "level": 4},
-			
-			{"code": "21133", "name_ar": "مقاولو نقل وبضائع", "name_en": "Transport & Freight Contractors", 
-			 "type": "Liability", "is_group": True, "parent_code": "21130", "level": 4},
-			
-			{"code": "223031", "name_ar": "مقاولو نقل بري", "name_en": "Road Transport Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "22303", "level": 5},
-			
-			{"code": "223032", "name_ar": "مقاولو نقل بحري", "name_en": "Maritime Transport Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "22303", "level": 5},
-			
-			{"code": "223033", "name_ar": "مقاولو نقل جوي", "name_en": "Air Transport Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "22303", "level": 5},
-			
-			{"code": "22304", "name_ar": "موردون تأمينات لوجستية", "name_en": "Logistics Insurance Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "2230", "level": 4},
-			
-			# ============ الإيرادات - لوجستية (تحت 4000) ============
-			{"code": "4900", "name_ar": "إيرادات الخدمات اللوجستية", "name_en": "Logistics Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-			
-			{"code": "4910", "name_ar": "إيرادات النقل البري", "name_en": "Road Transport Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4900", "level": 3},
-			
-			{"code": "4911", "name_ar": "إيرادات نقل البضائع", "name_en": "Freight Transport Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4910", "level": 4},
-			
-			{"code": "4912", "name_ar": "إيرادات نقل الركاب", "name_en": "Passenger Transport Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4910", "level": 4},
-			
-			{"code": "4913", "name_ar": "إيرادات النقل السريع", "name_en": "Express Delivery Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4910", "level": 4},
-			
-			{"code": "4920", "name_ar": "إيرادات النقل البحري", "name_en": "Maritime Transport Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4900", "level": 3},
-			
-			{"code": "4921", "name_ar": "إيرادات نقل الحاويات", "name_en": "Container Shipping Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4920", "level": 4},
-			
-			{"code": "4922", "name_ar": "إيرادات نقل البضائع السائبة", "name_en": "Bulk Cargo Shipping Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4920", "level": 4},
-			
-			{"code": "4923", "name_ar": "إيرادات خدمات الموانئ", "name_en": "Port Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4920", "level": 4},
-			
-			{"code": "4930", "name_ar": "إيرادات النقل الجوي", "name_en": "Air Transport Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4900", "level": 3},
-			
-			{"code": "4931", "name_ar": "إيرادات الشحن الجوي", "name_en": "Air Cargo Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4930", "level": 4},
-			
-			{"code": "4932", "name_ar": "إيرادات خدمات الشحن الجوي", "name_en": "Air Freight Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4930", "level": 4},
-			
-			{"code": "4933", "name_ar": "إيرادات خدمات المطارات", "name_en": "Airport Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4930", "level": 4},
-			
-			{"code": "4940", "name_ar": "إيرادات خدمات التخزين", "name_en": "Storage Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4900", "level": 3},
-			
-			{"code": "4941", "name_ar": "إيرادات تخزين البضائع", "name_en": "Goods Storage Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4940", "level": 4},
-			
-			{"code": "4942", "name_ar": "إيرادات تخزين مبرد", "name_en": "Cold Storage Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4940", "level": 4},
-			
-			{"code": "4943", "name_ar": "إيرادات تخزين خطير", "name_en": "Hazardous Materials Storage", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4940", "level": 4},
-			
-			{"code": "4950", "name_ar": "إيرادات الخدمات المساندة", "name_en": "Support Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4900", "level": 3},
-			
-			{"code": "4951", "name_ar": "إيرادات التغليف والتعبئة", "name_en": "Packaging & Packing Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4950", "level": 4},
-			
-			{"code": "4952", "name_ar": "إيرادات التوزيع والتوصيل", "name_en": "Distribution & Delivery Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4950", "level": 4},
-			
-			{"code": "4953", "name_ar": "إيرادات التخليص الجمركي", "name_en": "Customs Clearance Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4950", "level": 4},
-			
-			{"code": "4954", "name_ar": "إيرادات خدمات التتبع", "name_en": "Tracking Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4950", "level": 4},
-			
-			# ============ التكاليف - لوجستية (تحت 5000) ============
-			{"code": "5720", "name_ar": "تكاليف الخدمات اللوجستية", "name_en": "Logistics Services Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5730", "name_ar": "تكاليف الوقود والطاقة", "name_en": "Fuel & Energy Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5720", "level": 3},
-			
-			{"code": "5731", "name_ar": "تكلفة وقود الديزل", "name_en": "Diesel Fuel Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5730", "level": 4},
-			
-			{"code": "5732", "name_ar": "تكلفة وقود البنزين", "name_en": "Gasoline Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5730", "level": 4},
-			
-			{"code": "5733", "name_ar": "تكلفة الزيوت والشحوم", "name_en": "Oils & Lubricants Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5730", "level": 4},
-			
-			{"code": "5734", "name_ar": "تكلفة الغاز الطبيعي", "name_en": "Natural Gas Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5730", "level": 4},
-			
-			{"code": "5740", "name_ar": "تكاليف الصيانة والإصلاح", "name_en": "Maintenance & Repair Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5720", "level": 3},
-			
-			{"code": "5741", "name_ar": "تكلفة صيانة المركبات", "name_en": "Vehicle Maintenance Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5740", "level": 4},
-			
-			{"code": "5742", "name_ar": "تكلفة قطع الغيار", "name_en": "Spare Parts Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5740", "level": 4},
-			
-			{"code": "5743", "name_ar": "تكلفة إصلاح المعدات", "name_en": "Equipment Repair Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5740", "level": 4},
-			
-			{"code": "5744", "name_ar": "تكلفة الإطارات والبطاريات", "name_en": "Tires & Batteries Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5740", "level": 4},
-			
-			{"code": "5750", "name_ar": "تكاليف التشغيل والعمليات", "name_en": "Operation & Processing Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5720", "level": 3},
-			
-			{"code": "5751", "name_ar": "تكلفة استئجار المركبات", "name_en": "Vehicle Rental Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5750", "level": 4},
-			
-			{"code": "5752", "name_ar": "تكلفة رسوم الطرق والجسور", "name_en": "Road & Bridge Tolls", 
-			 "type": "Expense", "is_group": False, "parent_code": "5750", "level": 4},
-			
-			{"code": "5753", "name_ar": "تكلفة خدمات الموانئ والمطارات", "name_en": "Ports & Airports Services", 
-			 "type": "Expense", "is_group": False, "parent_code": "5750", "level": 4},
-			
-			{"code": "5754", "name_ar": "تكلفة التخليص الجمركي", "name_en": "Customs Clearance Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5750", "level": 4},
-			
-			# ============ المصروفات - لوجستية (تحت 5000) ============
-			{"code": "5760", "name_ar": "مصاريف تشغيلية - لوجستية", "name_en": "Operational Expenses - Logistics", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5770", "name_ar": "رواتب ومكافآت العاملين", "name_en": "Employee Salaries & Bonuses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5760", "level": 3},
-			
-			{"code": "5771", "name_ar": "رواتب السائقين والمشغلين", "name_en": "Drivers & Operators Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5770", "level": 4},
-			
-			{"code": "5772", "name_ar": "رواتب فنيي الصيانة", "name_en": "Maintenance Technicians Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5770", "level": 4},
-			
-			{"code": "5773", "name_ar": "رواتب الإداريين والمشرفين", "name_en": "Administrators & Supervisors", 
-			 "type": "Expense", "is_group": False, "parent_code": "5770", "level": 4},
-			
-			{"code": "5774", "name_ar": "مكافآت وحوافز الأداء", "name_en": "Performance Bonuses & Incentives", 
-			 "type": "Expense", "is_group": False, "parent_code": "5770", "level": 4},
-			
-			{"code": "5780", "name_ar": "مصاريف التأمين والامتثال", "name_en": "Insurance & Compliance Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5760", "level": 3},
-			
-			{"code": "5781", "name_ar": "مصاريف تأمين المركبات", "name_en": "Vehicle Insurance", 
-			 "type": "Expense", "is_group": False, "parent_code": "5780", "level": 4},
-			
-			{"code": "5782", "name_ar": "مصاريف تأمين البضائع", "name_en": "Cargo Insurance", 
-			 "type": "Expense", "is_group": False, "parent_code": "5780", "level": 4},
-			
-			{"code": "5783", "name_ar": "مصاريف تأمين المسؤولية", "name_en": "Liability Insurance", 
-			 "type": "Expense", "is_group": False, "parent_code": "5780", "level": 4},
-			
-			{"code": "5784", "name_ar": "مصاريف التراخيص والتصاريح", "name_en": "Licenses & Permits", 
-			 "type": "Expense", "is_group": False, "parent_code": "5780", "level": 4},
-			
-			{"code": "5790", "name_ar": "مصاريف السلامة والبيئة", "name_en": "Safety & Environmental Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5760", "level": 3},
-			
-			{"code": "5791", "name_ar": "مصاريف أدوات السلامة", "name_en": "Safety Equipment Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5790", "level": 4},
-			
-			{"code": "5792", "name_ar": "مصاريف التدريب على السلامة", "name_en": "Safety Training Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5790", "level": 4},
-			
-			{"code": "5793", "name_ar": "مصاريف الحماية البيئية", "name_en": "Environmental Protection", 
-			 "type": "Expense", "is_group": False, "parent_code": "5790", "level": 4},
-			
-			{"code": "5794", "name_ar": "مصاريف التخلص من النفايات", "name_en": "Waste Disposal Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5790", "level": 4},
-			
-			{"code": "5800", "name_ar": "مصاريف التكنولوجيا والتتبع", "name_en": "Technology & Tracking Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5760", "level": 3},
-			
-			{"code": "5801", "name_ar": "مصاريف أنظمة التتبع", "name_en": "Tracking Systems Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5800", "level": 4},
-			
-			{"code": "5802", "name_ar": "مصاريف برامج إدارة النقل", "name_en": "Transport Management Software", 
-			 "type": "Expense", "is_group": False, "parent_code": "5800", "level": 4},
-			
-			{"code": "5803", "name_ar": "مصاريف أنظمة الاتصالات", "name_en": "Communication Systems Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5800", "level": 4},
-			
-			{"code": "5810", "name_ar": "إهلاك الأصول اللوجستية", "name_en": "Logistics Assets Depreciation", 
-			 "type": "Expense", "is_group": True, "parent_code": "5760", "level": 3},
-			
-			{"code": "5811", "name_ar": "إهلاك مركبات النقل", "name_en": "Transport Vehicles Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5810", "level": 4},
-			
-			{"code": "5812", "name_ar": "إهلاك معدات الموانئ", "name_en": "Port Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5810", "level": 4},
-			
-			{"code": "5813", "name_ar": "إهلاك معدات التحميل", "name_en": "Loading Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5810", "level": 4},
-			
-			{"code": "5814", "name_ar": "إهلاك أنظمة التتبع", "name_en": "Tracking Systems Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5810", "level": 4},
-		]
-    
-    @classmethod
-    def get_energy_extensions(cls) -> List[Dict]:
-        """الطاقة والبيئة"""
-        return [
-			# ============ الأصول الثابتة - الطاقة (تحت 1100) ============
-			{"code": "11128", "name_ar": "الأصول الطاقية والبيئية", "name_en": "Energy & Environmental Assets", 
-			 "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-			
-			{"code": "11981", "name_ar": "معدات ومحطات توليد الطاقة", "name_en": "Power Generation Equipment & Plants", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			{"code": "11982", "name_ar": "محطات الطاقة المتجددة", "name_en": "Renewable Energy Plants", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			{"code": "11983", "name_ar": "معدات النقل والتوزيع", "name_en": "Transmission & Distribution Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			{"code": "11984", "name_ar": "معدات المعالجة والتكرير", "name_en": "Processing & Refining Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			{"code": "11985", "name_ar": "معدات الرصد والمراقبة", "name_en": "Monitoring & Surveillance Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			{"code": "11986", "name_ar": "معدات إدارة النفايات", "name_en": "Waste Management Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			{"code": "11987", "name_ar": "معدات معالجة المياه", "name_en": "Water Treatment Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11128", "level": 4},
-			
-			# ============ الأصول المتداولة - الطاقة (تحت 1200) ============
-			{"code": "12180", "name_ar": "مخزونات الطاقة والمواد", "name_en": "Energy & Materials Inventory", 
-			 "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-			
-			{"code": "12181", "name_ar": "مخزون الوقود التقليدي", "name_en": "Conventional Fuel Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12180", "level": 4},
-			
-			{"code": "12182", "name_ar": "مخزون المواد الخام الطاقة", "name_en": "Energy Raw Materials Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12180", "level": 4},
-			
-			{"code": "12183", "name_ar": "مخزون المواد الكيميائية", "name_en": "Chemical Materials Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12180", "level": 4},
-			
-			{"code": "12184", "name_ar": "مخزون قطع الغيار", "name_en": "Spare Parts Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12180", "level": 4},
-			
-			{"code": "12185", "name_ar": "مخزون مواد الصيانة", "name_en": "Maintenance Materials Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12180", "level": 4},
-			
-			# ============ الخصوم - الطاقة (تحت 2100) ============
-			{"code": "21140", "name_ar": "موردو الطاقة والبيئة", "name_en": "Energy & Environmental Suppliers", 
-			 "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-			
-			{"code": "21141", "name_ar": "موردون وقود وطاقة", "name_en": "Fuel & Energy Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21140", "level": 4},
-			
-			{"code": "21142", "name_ar": "موردون معدات طاقية", "name_en": "Energy Equipment Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21140", "level": 4},
-			
-			{"code": "21143", "name_ar": "موردون مواد كيميائية", "name_en": "Chemical Materials Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21140", "level": 4},
-			
-			{"code": "21144", "name_ar": "موردون خدمات بيئية", "name_en": "Environmental Services Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21140", "level": 4},
-			
-			{"code": "21145", "name_ar": "مقاولو الصيانة والتشغيل", "name_en": "Maintenance & Operation Contractors", 
-			 "type": "Liability", "is_group": True, "parent_code": "21140", "level": 4},
-			
-			{"code": "211451", "name_ar": "مقاولو صيانة المعدات", "name_en": "Equipment Maintenance Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "21145", "level": 5},
-			
-			{"code": "211452", "name_ar": "مقاولو عمليات التشغيل", "name_en": "Operation Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "21145", "level": 5},
-			
-			# ============ الإيرادات - الطاقة (تحت 4000) ============
-			{"code": "5010", "name_ar": "إيرادات الطاقة والبيئة", "name_en": "Energy & Environmental Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-			
-			{"code": "5020", "name_ar": "إيرادات توليد الطاقة", "name_en": "Power Generation Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5010", "level": 3},
-			
-			{"code": "5021", "name_ar": "إيرادات الطاقة التقليدية", "name_en": "Conventional Energy Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5020", "level": 4},
-			
-			{"code": "5022", "name_ar": "إيرادات الطاقة المتجددة", "name_en": "Renewable Energy Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5020", "level": 4},
-			
-			{"code": "5023", "name_ar": "إيرادات بيع الكهرباء", "name_en": "Electricity Sales Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5020", "level": 4},
-			
-			{"code": "5024", "name_ar": "إيرادات الطاقة الحرارية", "name_en": "Thermal Energy Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5020", "level": 4},
-			
-			{"code": "5030", "name_ar": "إيرادات النفط والغاز", "name_en": "Oil & Gas Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5010", "level": 3},
-			
-			{"code": "5031", "name_ar": "إيرادات بيع النفط الخام", "name_en": "Crude Oil Sales Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5030", "level": 4},
-			
-			{"code": "5032", "name_ar": "إيرادات بيع المنتجات البترولية", "name_en": "Petroleum Products Sales Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5030", "level": 4},
-			
-			{"code": "5033", "name_ar": "إيرادات بيع الغاز الطبيعي", "name_en": "Natural Gas Sales Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5030", "level": 4},
-			
-			{"code": "5034", "name_ar": "إيرادات خدمات التكرير", "name_en": "Refining Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5030", "level": 4},
-			
-			{"code": "5040", "name_ar": "إيرادات الخدمات البيئية", "name_en": "Environmental Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5010", "level": 3},
-			
-			{"code": "5041", "name_ar": "إيرادات معالجة المياه", "name_en": "Water Treatment Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5040", "level": 4},
-			
-			{"code": "5042", "name_ar": "إيرادات إدارة النفايات", "name_en": "Waste Management Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5040", "level": 4},
-			
-			{"code": "5043", "name_ar": "إيرادات إعادة التدوير", "name_en": "Recycling Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5040", "level": 4},
-			
-			{"code": "5044", "name_ar": "إيرادات الاستشارات البيئية", "name_en": "Environmental Consulting Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5040", "level": 4},
-			
-			{"code": "5050", "name_ar": "إيرادات الخدمات الفنية", "name_en": "Technical Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5010", "level": 3},
-			
-			{"code": "5051", "name_ar": "إيرادات الصيانة والتشغيل", "name_en": "Maintenance & Operation Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5050", "level": 4},
-			
-			{"code": "5052", "name_ar": "إيرادات الفحوصات والاختبارات", "name_en": "Inspections & Tests Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5050", "level": 4},
-			
-			{"code": "5053", "name_ar": "إيرادات تركيب المعدات", "name_en": "Equipment Installation Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5050", "level": 4},
-			
-			{"code": "5054", "name_ar": "إيرادات التدريب والاستشارات", "name_en": "Training & Consulting Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5050", "level": 4},
-			
-			# ============ التكاليف - الطاقة (تحت 5000) ============
-			{"code": "5920", "name_ar": "تكاليف الطاقة والبيئة", "name_en": "Energy & Environmental Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5930", "name_ar": "تكاليف الوقود والطاقة", "name_en": "Fuel & Energy Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5920", "level": 3},
-			
-			{"code": "5931", "name_ar": "تكلفة الوقود التقليدي", "name_en": "Conventional Fuel Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5930", "level": 4},
-			
-			{"code": "5932", "name_ar": "تكلفة المواد الخام", "name_en": "Raw Materials Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5930", "level": 4},
-			
-			{"code": "5933", "name_ar": "تكلفة الطاقة المشتراة", "name_en": "Purchased Energy Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5930", "level": 4},
-			
-			{"code": "5934", "name_ar": "تكلفة المواد الكيميائية", "name_en": "Chemical Materials Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5930", "level": 4},
-			
-			{"code": "5940", "name_ar": "تكاليف التشغيل والإنتاج", "name_en": "Operation & Production Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5920", "level": 3},
-			
-			{"code": "5941", "name_ar": "تكلفة معالجة المواد", "name_en": "Materials Processing Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5940", "level": 4},
-			
-			{"code": "5942", "name_ar": "تكلفة عمليات التكرير", "name_en": "Refining Operations Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5940", "level": 4},
-			
-			{"code": "5943", "name_ar": "تكلفة توليد الطاقة", "name_en": "Power Generation Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5940", "level": 4},
-			
-			{"code": "5944", "name_ar": "تكلفة النقل والتوزيع", "name_en": "Transportation & Distribution Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5940", "level": 4},
-			
-			# ============ المصروفات - الطاقة (تحت 5000) ============
-			{"code": "5950", "name_ar": "مصاريف تشغيلية - طاقة", "name_en": "Operational Expenses - Energy", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5960", "name_ar": "رواتب ومكافآت العاملين", "name_en": "Employee Salaries & Bonuses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5950", "level": 3},
-			
-			{"code": "5961", "name_ar": "رواتب المهندسين والفنيين", "name_en": "Engineers & Technicians Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5960", "level": 4},
-			
-			{"code": "5962", "name_ar": "رواتب مشغلي المعدات", "name_en": "Equipment Operators Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5960", "level": 4},
-			
-			{"code": "5963", "name_ar": "رواتب الإداريين والمشرفين", "name_en": "Administrators & Supervisors", 
-			 "type": "Expense", "is_group": False, "parent_code": "5960", "level": 4},
-			
-			{"code": "5964", "name_ar": "رواتب طاقم الصيانة", "name_en": "Maintenance Staff Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5960", "level": 4},
-			
-			{"code": "5970", "name_ar": "مصاريف الصيانة والإصلاح", "name_en": "Maintenance & Repair Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5950", "level": 3},
-			
-			{"code": "5971", "name_ar": "مصاريف صيانة المعدات", "name_en": "Equipment Maintenance Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5970", "level": 4},
-			
-			{"code": "5972", "name_ar": "مصاريف إصلاح الأعطال", "name_en": "Breakdown Repair Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5970", "level": 4},
-			
-			{"code": "5973", "name_ar": "مصاريف الصيانة الوقائية", "name_en": "Preventive Maintenance Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5970", "level": 4},
-			
-			{"code": "5974", "name_ar": "مصاريف قطع الغيار", "name_en": "Spare Parts Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5970", "level": 4},
-			
-			{"code": "5980", "name_ar": "مصاريف البيئة والسلامة", "name_en": "Environmental & Safety Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5950", "level": 3},
-			
-			{"code": "5981", "name_ar": "مصاريف الرصد البيئي", "name_en": "Environmental Monitoring Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5980", "level": 4},
-			
-			{"code": "5982", "name_ar": "مصاريف معالجة التلوث", "name_en": "Pollution Treatment Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5980", "level": 4},
-			
-			{"code": "5983", "name_ar": "مصاريف السلامة الصناعية", "name_en": "Industrial Safety Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5980", "level": 4},
-			
-			{"code": "5984", "name_ar": "مصاريف التخلص من النفايات", "name_en": "Waste Disposal Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5980", "level": 4},
-			
-			{"code": "5990", "name_ar": "مصاريف البحث والتطوير", "name_en": "Research & Development Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5950", "level": 3},
-			
-			{"code": "5991", "name_ar": "مصاريف البحوث الطاقية", "name_en": "Energy Research Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5990", "level": 4},
-			
-			{"code": "5992", "name_ar": "مصاريف تطوير التقنيات", "name_en": "Technology Development Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5990", "level": 4},
-			
-			{"code": "5993", "name_ar": "مصاريف اختبارات الجودة", "name_en": "Quality Testing Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5990", "level": 4},
-			
-			{"code": "5994", "name_ar": "مصاريف براءات الاختراع", "name_en": "Patents Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5990", "level": 4},
-			
-			{"code": "6000", "name_ar": "مصاريف التراخيص والامتثال", "name_en": "Licenses & Compliance Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5950", "level": 3},
-			
-			{"code": "6001", "name_ar": "مصاريف التراخيص البيئية", "name_en": "Environmental Licenses Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6000", "level": 4},
-			
-			{"code": "6002", "name_ar": "مصاريف تراخيص التشغيل", "name_en": "Operation Licenses Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6000", "level": 4},
-			
-			{"code": "6003", "name_ar": "مصاريف الامتثال التنظيمي", "name_en": "Regulatory Compliance Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6000", "level": 4},
-			
-			{"code": "6004", "name_ar": "مصاريف التدقيق والمراجعة", "name_en": "Audit & Review Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6000", "level": 4},
-			
-			{"code": "6010", "name_ar": "إهلاك الأصول الطاقية", "name_en": "Energy Assets Depreciation", 
-			 "type": "Expense", "is_group": True, "parent_code": "5950", "level": 3},
-			
-			{"code": "6011", "name_ar": "إهلاك معدات التوليد", "name_en": "Generation Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6010", "level": 4},
-			
-			{"code": "6012", "name_ar": "إهلاك محطات الطاقة", "name_en": "Power Plants Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6010", "level": 4},
-			
-			{"code": "6013", "name_ar": "إهلاك معدات النقل", "name_en": "Transmission Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6010", "level": 4},
-			
-			{"code": "6014", "name_ar": "إهلاك معدات المعالجة", "name_en": "Processing Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6010", "level": 4},
-		]
-    
-    
+        Returns:
+            int: عدد صفوف الأرصدة
+        """
+        if session is None:
+            session = db.session
+        return cls._write_balance_cache(session, project_id, period,
+                                        cls.load_account_tree(project_id, session).rollup(balances))
+
     @classmethod
-    def get_hospitality_extensions(cls) -> List[Dict]:
-        """الضيافة والسياحة"""
-        return [
-			# ============ الأصول الثابتة - ضيافة (تحت 1100) ============
-			{"code": "11137", "name_ar": "الأصول الفندقية والضيافية", "name_en": "Hospitality & Hotel Assets", 
-			 "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-			
-			{"code": "11971", "name_ar": "مباني وأثاث الفنادق", "name_en": "Hotel Buildings & Furniture", 
-			 "type": "Asset", "is_group": False, "parent_code": "11137", "level": 4},
-			
-			{"code": "11972", "name_ar": "تجهيزات المطاعم والكافتيريات", "name_en": "Restaurant & Cafeteria Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11137", "level": 4},
-			
-			{"code": "11973", "name_ar": "أجهزة ومعدات المطابخ", "name_en": "Kitchen Equipment & Appliances", 
-			 "type": "Asset", "is_group": False, "parent_code": "11137", "level": 4},
-			
-			{"code": "11974", "name_ar": "مركبات النقل الفندقي", "name_en": "Hotel Transportation Vehicles", 
-			 "type": "Asset", "is_group": False, "parent_code": "11137", "level": 4},
-			
-			{"code": "11975", "name_ar": "أنظمة الترفيه والترفيه", "name_en": "Entertainment & Recreation Systems", 
-			 "type": "Asset", "is_group": False, "parent_code": "11137", "level": 4},
-			
-			{"code": "11976", "name_ar": "معدات المؤتمرات والفعاليات", "name_en": "Conference & Events Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11137", "level": 4},
-			
-			# ============ الأصول المتداولة - ضيافة (تحت 1200) ============
-			{"code": "12190", "name_ar": "مخزونات الضيافة والفندقة", "name_en": "Hospitality & Hotel Inventory", 
-			 "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-			
-			{"code": "12191", "name_ar": "مخزون المواد الغذائية", "name_en": "Food & Beverage Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12190", "level": 4},
-			
-			{"code": "12192", "name_ar": "مخزون مواد النظافة والتعقيم", "name_en": "Cleaning & Sterilization Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12190", "level": 4},
-			
-			{"code": "12193", "name_ar": "مخزون مستلزمات الغرف", "name_en": "Room Supplies Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12190", "level": 4},
-			
-			{"code": "12194", "name_ar": "مخزون أدوات المطبخ", "name_en": "Kitchen Utensils Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12190", "level": 4},
-			
-			{"code": "12195", "name_ar": "مخزون مواد الترفيه", "name_en": "Entertainment Materials Inventory", 
-			 "type": "Asset", "is_group": False, "parent_code": "12190", "level": 4},
-			
-			# ============ الخصوم - ضيافة (تحت 2100) ============
-			{"code": "21150", "name_ar": "موردو الخدمات الفندقية", "name_en": "Hotel Services Suppliers", 
-			 "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-			
-			{"code": "21150", "name_ar": "موردون مواد غذائية", "name_en": "Food & Beverage Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21150", "level": 4},
-			
-			{"code": "21151", "name_ar": "موردون تجهيزات فندقية", "name_en": "Hotel Equipment Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21150", "level": 4},
-			
-			{"code": "21152", "name_ar": "موردون خدمات النظافة", "name_en": "Cleaning Services Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21150", "level": 4},
-			
-			{"code": "21153", "name_ar": "موردون خدمات الأمن", "name_en": "Security Services Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21150", "level": 4},
-			
-			{"code": "21154", "name_ar": "موردون خدمات الترفيه", "name_en": "Entertainment Services Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21150", "level": 4},
-			
-			# ============ الإيرادات - ضيافة (تحت 4000) ============
-			{"code": "4960", "name_ar": "إيرادات الخدمات الفندقية", "name_en": "Hotel Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-			
-			{"code": "4970", "name_ar": "إيرادات الإقامة", "name_en": "Accommodation Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4960", "level": 3},
-			
-			{"code": "4971", "name_ar": "إيرادات حجز الغرف", "name_en": "Room Booking Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4970", "level": 4},
-			
-			{"code": "4972", "name_ar": "إيرادات الإقامة الطويلة", "name_en": "Long-term Stay Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4970", "level": 4},
-			
-			{"code": "4973", "name_ar": "إيرادات الأجنحة الفاخرة", "name_en": "Luxury Suites Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4970", "level": 4},
-			
-			{"code": "4974", "name_ar": "إيرادات خدمات الغرف", "name_en": "Room Service Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4970", "level": 4},
-			
-			{"code": "4980", "name_ar": "إيرادات الطعام والشراب", "name_en": "Food & Beverage Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4960", "level": 3},
-			
-			{"code": "4981", "name_ar": "إيرادات المطاعم", "name_en": "Restaurant Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4980", "level": 4},
-			
-			{"code": "4982", "name_ar": "إيرادات الكافيهات", "name_en": "Café Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4980", "level": 4},
-			
-			{"code": "4983", "name_ar": "إيرادات الحفلات والمناسبات", "name_en": "Parties & Events Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4980", "level": 4},
-			
-			{"code": "4984", "name_ar": "إيرادات المطابخ الخارجية", "name_en": "Catering Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4980", "level": 4},
-			
-			{"code": "4990", "name_ar": "إيرادات الترفيه والخدمات", "name_en": "Entertainment & Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4960", "level": 3},
-			
-			{"code": "4991", "name_ar": "إيرادات المسابح والمنتجعات", "name_en": "Pools & Resorts Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4990", "level": 4},
-			
-			{"code": "4992", "name_ar": "إيرادات الصالات الرياضية", "name_en": "Gyms & Fitness Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4990", "level": 4},
-			
-			{"code": "4993", "name_ar": "إيرادات السبا والعناية", "name_en": "Spa & Care Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4990", "level": 4},
-			
-			{"code": "4994", "name_ar": "إيرادات خدمات الأعمال", "name_en": "Business Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4990", "level": 4},
-			
-			{"code": "4995", "name_ar": "إيرادات خدمات الغسيل", "name_en": "Laundry Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "4990", "level": 4},
-			
-			{"code": "5001", "name_ar": "إيرادات المؤتمرات والفعاليات", "name_en": "Conferences & Events Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4960", "level": 3},
-			
-			{"code": "5002", "name_ar": "إيرادات قاعات المؤتمرات", "name_en": "Conference Halls Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5001", "level": 4},
-			
-			{"code": "5003", "name_ar": "إيرادات حفلات الزفاف", "name_en": "Wedding Parties Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5001", "level": 4},
-			
-			{"code": "5004", "name_ar": "إيرادات المعارض والعروض", "name_en": "Exhibitions & Shows Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5001", "level": 4},
-			
-			{"code": "5005", "name_ar": "إيرادات خدمات التنظيم", "name_en": "Organization Services Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5001", "level": 4},
-			
-			# ============ التكاليف - ضيافة (تحت 5000) ============
-			{"code": "5820", "name_ar": "تكاليف الخدمات الفندقية", "name_en": "Hotel Services Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5830", "name_ar": "تكاليف المواد الغذائية", "name_en": "Food & Beverage Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5820", "level": 3},
-			
-			{"code": "5831", "name_ar": "تكلفة المواد الغذائية المستخدمة", "name_en": "Food & Beverage Consumed", 
-			 "type": "Expense", "is_group": False, "parent_code": "5830", "level": 4},
-			
-			{"code": "5832", "name_ar": "تكلفة المواد الاستهلاكية", "name_en": "Consumables Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5830", "level": 4},
-			
-			{"code": "5833", "name_ar": "تكلفة المواد الترفيهية", "name_en": "Entertainment Materials Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5830", "level": 4},
-			
-			{"code": "5834", "name_ar": "تكلفة المشروبات والكحوليات", "name_en": "Beverages & Alcohol Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5830", "level": 4},
-			
-			{"code": "5840", "name_ar": "تكاليف التشغيل اليومي", "name_en": "Daily Operation Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5820", "level": 3},
-			
-			{"code": "5841", "name_ar": "تكلفة خدمات النظافة", "name_en": "Cleaning Services Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5840", "level": 4},
-			
-			{"code": "5842", "name_ar": "تكلفة مواد النظافة", "name_en": "Cleaning Materials Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5840", "level": 4},
-			
-			{"code": "5843", "name_ar": "تكلفة خدمات الغسيل", "name_en": "Laundry Services Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5840", "level": 4},
-			
-			{"code": "5844", "name_ar": "تكلفة الأمن والحماية", "name_en": "Security & Protection Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "5840", "level": 4},
-			
-			# ============ المصروفات - ضيافة (تحت 5000) ============
-			{"code": "5850", "name_ar": "مصاريف تشغيلية - فندقية", "name_en": "Operational Expenses - Hotel", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "5860", "name_ar": "رواتب ومكافآت العاملين", "name_en": "Employee Salaries & Bonuses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5850", "level": 3},
-			
-			{"code": "5861", "name_ar": "رواتب طاقم المطبخ", "name_en": "Kitchen Staff Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5860", "level": 4},
-			
-			{"code": "5862", "name_ar": "رواتب طاقم الخدمة", "name_en": "Service Staff Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5860", "level": 4},
-			
-			{"code": "5863", "name_ar": "رواتب الإداريين والمشرفين", "name_en": "Administrators & Supervisors", 
-			 "type": "Expense", "is_group": False, "parent_code": "5860", "level": 4},
-			
-			{"code": "5864", "name_ar": "رواتب طاقم النظافة", "name_en": "Cleaning Staff Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5860", "level": 4},
-			
-			{"code": "5865", "name_ar": "رواتب طاقم الأمن", "name_en": "Security Staff Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "5860", "level": 4},
-			
-			{"code": "5870", "name_ar": "مصاريف التسويق والترويج", "name_en": "Marketing & Promotion Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5850", "level": 3},
-			
-			{"code": "5871", "name_ar": "مصاريف الإعلانات الفندقية", "name_en": "Hotel Advertising Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5870", "level": 4},
-			
-			{"code": "5872", "name_ar": "مصاريف منصات الحجز", "name_en": "Booking Platforms Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5870", "level": 4},
-			
-			{"code": "5873", "name_ar": "مصاريف العلاقات العامة", "name_en": "Public Relations Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5870", "level": 4},
-			
-			{"code": "5874", "name_ar": "مصاريف العروض الترويجية", "name_en": "Promotional Offers Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5870", "level": 4},
-			
-			{"code": "5880", "name_ar": "مصاريف التشغيل والصيانة", "name_en": "Operation & Maintenance Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5850", "level": 3},
-			
-			{"code": "5881", "name_ar": "مصاريف صيانة المباني", "name_en": "Building Maintenance Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5880", "level": 4},
-			
-			{"code": "5882", "name_ar": "مصاريف صيانة المعدات", "name_en": "Equipment Maintenance Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5880", "level": 4},
-			
-			{"code": "5883", "name_ar": "مصاريف المرافق والخدمات", "name_en": "Utilities & Services Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5880", "level": 4},
-			
-			{"code": "5884", "name_ar": "مصاريف قطع الغيار", "name_en": "Spare Parts Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5880", "level": 4},
-			
-			{"code": "5890", "name_ar": "مصاريف الجودة والامتثال", "name_en": "Quality & Compliance Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5850", "level": 3},
-			
-			{"code": "5891", "name_ar": "مصاريف شهادات الجودة", "name_en": "Quality Certificates Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5890", "level": 4},
-			
-			{"code": "5892", "name_ar": "مصاريف التدريب والتأهيل", "name_en": "Training & Qualification Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5890", "level": 4},
-			
-			{"code": "5893", "name_ar": "مصاريف الفحوصات الصحية", "name_en": "Health Inspections Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5890", "level": 4},
-			
-			{"code": "5894", "name_ar": "مصاريف التأمينات والتراخيص", "name_en": "Insurance & Licenses Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5890", "level": 4},
-			
-			{"code": "5900", "name_ar": "مصاريف التكنولوجيا والأنظمة", "name_en": "Technology & Systems Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "5850", "level": 3},
-			
-			{"code": "5901", "name_ar": "مصاريف أنظمة الحجز", "name_en": "Booking Systems Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5900", "level": 4},
-			
-			{"code": "5902", "name_ar": "مصاريف أنظمة إدارة الفنادق", "name_en": "Hotel Management Systems", 
-			 "type": "Expense", "is_group": False, "parent_code": "5900", "level": 4},
-			
-			{"code": "5903", "name_ar": "مصاريف أنظمة الأمن والمراقبة", "name_en": "Security & Surveillance Systems", 
-			 "type": "Expense", "is_group": False, "parent_code": "5900", "level": 4},
-			
-			{"code": "5904", "name_ar": "مصاريف أنظمة الاتصالات", "name_en": "Communication Systems Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "5900", "level": 4},
-			
-			{"code": "5910", "name_ar": "إهلاك الأصول الفندقية", "name_en": "Hotel Assets Depreciation", 
-			 "type": "Expense", "is_group": True, "parent_code": "5850", "level": 3},
-			
-			{"code": "5911", "name_ar": "إهلاك المباني والأثاث", "name_en": "Buildings & Furniture Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5910", "level": 4},
-			
-			{"code": "5912", "name_ar": "إهلاك معدات المطابخ", "name_en": "Kitchen Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5910", "level": 4},
-			
-			{"code": "5913", "name_ar": "إهلاك أنظمة الترفيه", "name_en": "Entertainment Systems Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5910", "level": 4},
-			
-			{"code": "5914", "name_ar": "إهلاك معدات المؤتمرات", "name_en": "Conference Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "5910", "level": 4},
-		]
-    
-    
+    def _write_balance_cache(cls, session: Session, project_id: int, period: str,
+                             totals: Dict[int, object]) -> int:
+        """استبدال صفوف أرصدة المشروع للفترة بالإجماليات (تُحذف الصفرية)"""
+        table = CoaAccountBalance.__table__
+        session.execute(table.delete().where(table.c.project_id == project_id, table.c.period == period))
+        rows = [
+            {'account_id': account_id, 'period': period, 'project_id': project_id, 'balance': total}
+            for account_id, total in totals.items() if total
+        ]
+        for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+            session.execute(table.insert().values(rows[start:start + cls.BULK_INSERT_CHUNK_SIZE]))
+        return len(rows)
+
+    # ==================== النسخ داخل قاعدة البيانات ====================
+    # قواعد البيانات التي تقبل UPDATE على جدول الحسابات باستعلام فرعي من نفس الجدول
+    # (MySQL و MariaDB ترفضه: can't specify target table for update in FROM clause)
+    SERVER_SIDE_DIALECTS: Tuple[str, ...] = ('postgresql', 'sqlite')
+    # بصمات القوالب المنشورة في جدول coa_template (لا حاجة لإعادة التحقق منها)
+    _published_templates: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
     @classmethod
-    def get_media_extensions(cls) -> List[Dict]:
-        """وسائل الإعلام والترفيه"""
-        return [
-			# ============ الأصول الثابتة - إعلامية (تحت 1100) ============
-			{"code": "11149", "name_ar": "الأصول الإعلامية والإنتاجية", "name_en": "Media & Production Assets", 
-			 "type": "Asset", "is_group": True, "parent_code": "1100", "level": 3},
-			
-			{"code": "11991", "name_ar": "معدات الإنتاج والتسجيل", "name_en": "Production & Recording Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			{"code": "11992", "name_ar": "معدات البث والإرسال", "name_en": "Broadcasting & Transmission Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			{"code": "11993", "name_ar": "معدات التصوير والمونتاج", "name_en": "Filming & Editing Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			{"code": "11994", "name_ar": "استوديوهات ومكاتب إنتاج", "name_en": "Studios & Production Offices", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			{"code": "11995", "name_ar": "أنظمة الحوسبة والخوادم", "name_en": "Computing Systems & Servers", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			{"code": "11996", "name_ar": "برامج وتطبيقات إنتاجية", "name_en": "Production Software & Applications", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			{"code": "11997", "name_ar": "معدات الصوت والإضاءة", "name_en": "Sound & Lighting Equipment", 
-			 "type": "Asset", "is_group": False, "parent_code": "11149", "level": 4},
-			
-			# ============ الأصول المتداولة - إعلامية (تحت 1200) ============
-			{"code": "12200", "name_ar": "مخزونات إعلامية وإنتاجية", "name_en": "Media & Production Inventory", 
-			 "type": "Asset", "is_group": True, "parent_code": "1200", "level": 3},
-			
-			{"code": "12201", "name_ar": "مواد وأشرطة تسجيل", "name_en": "Recording Materials & Tapes", 
-			 "type": "Asset", "is_group": False, "parent_code": "12200", "level": 4},
-			
-			{"code": "12202", "name_ar": "مستلزمات إنتاج وأدوات", "name_en": "Production Supplies & Tools", 
-			 "type": "Asset", "is_group": False, "parent_code": "12200", "level": 4},
-			
-			{"code": "12203", "name_ar": "حقوق ملكية فكرية", "name_en": "Intellectual Property Rights", 
-			 "type": "Asset", "is_group": False, "parent_code": "12200", "level": 4},
-			
-			{"code": "12204", "name_ar": "محتوى جاهز للإنتاج", "name_en": "Ready-to-Produce Content", 
-			 "type": "Asset", "is_group": False, "parent_code": "12200", "level": 4},
-			
-			{"code": "12205", "name_ar": "إعلانات ومواد ترويجية", "name_en": "Advertisements & Promotional Materials", 
-			 "type": "Asset", "is_group": False, "parent_code": "12200", "level": 4},
-			
-			# ============ الخصوم - إعلامية (تحت 2100) ============
-			{"code": "21160", "name_ar": "موردو الخدمات الإعلامية", "name_en": "Media Services Suppliers", 
-			 "type": "Liability", "is_group": True, "parent_code": "2100", "level": 3},
-			
-			{"code": "211601", "name_ar": "موردون معدات إنتاجية", "name_en": "Production Equipment Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21160", "level": 4},
-			
-			{"code": "211602", "name_ar": "موردون برامج وتطبيقات", "name_en": "Software & Applications Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "21160", "level": 4},
-			
-			{"code": "211603", "name_ar": "مقاولو إنتاج ومحتوى", "name_en": "Production & Content Contractors", 
-			 "type": "Liability", "is_group": True, "parent_code": "21160", "level": 4},
-			
-			{"code": "2116031", "name_ar": "مقاولو إنتاج أفلام", "name_en": "Film Production Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "211603", "level": 5},
-			
-			{"code": "2116032", "name_ar": "مقاولو إنتاج برامج", "name_en": "Program Production Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "211603", "level": 5},
-			
-			{"code": "2116033", "name_ar": "مقاولو كتابة محتوى", "name_en": "Content Writing Contractors", 
-			 "type": "Liability", "is_group": False, "parent_code": "211603", "level": 5},
-			
-			{"code": "22604", "name_ar": "موردو حقوق واستخدامات", "name_en": "Rights & Usage Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "2260", "level": 4},
-			
-			{"code": "22605", "name_ar": "موردو خدمات فنية", "name_en": "Technical Services Suppliers", 
-			 "type": "Liability", "is_group": False, "parent_code": "2260", "level": 4},
-			
-			# ============ الإيرادات - إعلامية (تحت 4000) ============
-			{"code": "5060", "name_ar": "إيرادات الإعلام والترفيه", "name_en": "Media & Entertainment Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "4000", "level": 2},
-			
-			{"code": "5070", "name_ar": "إيرادات الإعلانات", "name_en": "Advertising Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5060", "level": 3},
-			
-			{"code": "5071", "name_ar": "إيرادات الإعلانات التلفزيونية", "name_en": "TV Advertising Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5070", "level": 4},
-			
-			{"code": "5072", "name_ar": "إيرادات الإعلانات الرقمية", "name_en": "Digital Advertising Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5070", "level": 4},
-			
-			{"code": "5073", "name_ar": "إيرادات الرعايات", "name_en": "Sponsorship Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5070", "level": 4},
-			
-			{"code": "5074", "name_ar": "إيرادات الإعلانات المطبوعة", "name_en": "Print Advertising Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5070", "level": 4},
-			
-			{"code": "5080", "name_ar": "إيرادات المحتوى والإنتاج", "name_en": "Content & Production Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5060", "level": 3},
-			
-			{"code": "5081", "name_ar": "إيرادات بيع المحتوى", "name_en": "Content Sales Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5080", "level": 4},
-			
-			{"code": "5082", "name_ar": "إيرادات تراخيص المحتوى", "name_en": "Content Licensing Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5080", "level": 4},
-			
-			{"code": "5083", "name_ar": "إيرادات إنتاج الأفلام", "name_en": "Film Production Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5080", "level": 4},
-			
-			{"code": "5084", "name_ar": "إيرادات إنتاج البرامج", "name_en": "Program Production Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5080", "level": 4},
-			
-			{"code": "5090", "name_ar": "إيرادات البث والنشر", "name_en": "Broadcasting & Publishing Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5060", "level": 3},
-			
-			{"code": "5091", "name_ar": "إيرادات البث التلفزيوني", "name_en": "TV Broadcasting Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5090", "level": 4},
-			
-			{"code": "5092", "name_ar": "إيرادات البث الإذاعي", "name_en": "Radio Broadcasting Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5090", "level": 4},
-			
-			{"code": "5093", "name_ar": "إيرادات النشر الرقمي", "name_en": "Digital Publishing Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5090", "level": 4},
-			
-			{"code": "5094", "name_ar": "إيرادات النشر المطبوع", "name_en": "Print Publishing Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5090", "level": 4},
-			
-			{"code": "51100", "name_ar": "إيرادات الاشتراكات والتوزيع", "name_en": "Subscriptions & Distribution Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5060", "level": 3},
-			
-			{"code": "5101", "name_ar": "إيرادات اشتراكات القنوات", "name_en": "Channel Subscriptions Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "51100", "level": 4},
-			
-			{"code": "5102", "name_ar": "إيرادات منصات البث", "name_en": "Streaming Platforms Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "51100", "level": 4},
-			
-			{"code": "5103", "name_ar": "إيرادات توزيع المحتوى", "name_en": "Content Distribution Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "51100", "level": 4},
-			
-			{"code": "5104", "name_ar": "إيرادات بيع التذاكر", "name_en": "Ticket Sales Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "51100", "level": 4},
-			
-			{"code": "5110", "name_ar": "إيرادات الخدمات الإعلامية", "name_en": "Media Services Revenue", 
-			 "type": "Revenue", "is_group": True, "parent_code": "5060", "level": 3},
-			
-			{"code": "5111", "name_ar": "إيرادات الاستشارات الإعلامية", "name_en": "Media Consulting Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5110", "level": 4},
-			
-			{"code": "5112", "name_ar": "إيرادات إدارة المحتوى", "name_en": "Content Management Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5110", "level": 4},
-			
-			{"code": "5113", "name_ar": "إيرادات التدريب الإعلامي", "name_en": "Media Training Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5110", "level": 4},
-			
-			{"code": "5114", "name_ar": "إيرادات إنتاج الفعاليات", "name_en": "Events Production Revenue", 
-			 "type": "Revenue", "is_group": False, "parent_code": "5110", "level": 4},
-			
-			# ============ التكاليف - إعلامية (تحت 5000) ============
-			{"code": "6020", "name_ar": "تكاليف الإعلام والترفيه", "name_en": "Media & Entertainment Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "6030", "name_ar": "تكاليف إنتاج المحتوى", "name_en": "Content Production Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "6020", "level": 3},
-			
-			{"code": "6031", "name_ar": "تكلفة إنتاج البرامج", "name_en": "Program Production Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6030", "level": 4},
-			
-			{"code": "6032", "name_ar": "تكلفة إنتاج الأفلام", "name_en": "Film Production Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6030", "level": 4},
-			
-			{"code": "6033", "name_ar": "تكلفة المواد الإنتاجية", "name_en": "Production Materials Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6030", "level": 4},
-			
-			{"code": "6034", "name_ar": "تكلفة الحقوق والملكيات", "name_en": "Rights & Properties Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6030", "level": 4},
-			
-			{"code": "6040", "name_ar": "تكاليف البث والنشر", "name_en": "Broadcasting & Publishing Costs", 
-			 "type": "Expense", "is_group": True, "parent_code": "6020", "level": 3},
-			
-			{"code": "6041", "name_ar": "تكلفة خدمات البث", "name_en": "Broadcasting Services Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6040", "level": 4},
-			
-			{"code": "6042", "name_ar": "تكلفة خدمات النشر", "name_en": "Publishing Services Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6040", "level": 4},
-			
-			{"code": "6043", "name_ar": "تكلفة التوزيع", "name_en": "Distribution Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6040", "level": 4},
-			
-			{"code": "6044", "name_ar": "تكلفة المنصات الرقمية", "name_en": "Digital Platforms Cost", 
-			 "type": "Expense", "is_group": False, "parent_code": "6040", "level": 4},
-			
-			# ============ المصروفات - إعلامية (تحت 5000) ============
-			{"code": "6050", "name_ar": "مصاريف تشغيلية - إعلامية", "name_en": "Operational Expenses - Media", 
-			 "type": "Expense", "is_group": True, "parent_code": "5000", "level": 2},
-			
-			{"code": "6060", "name_ar": "رواتب ومكافآت العاملين", "name_en": "Employee Salaries & Bonuses", 
-			 "type": "Expense", "is_group": True, "parent_code": "6050", "level": 3},
-			
-			{"code": "6061", "name_ar": "رواتب المذيعين والمقدمين", "name_en": "Broadcasters & Presenters Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "6060", "level": 4},
-			
-			{"code": "6062", "name_ar": "رواتب المنتجين والمخرجين", "name_en": "Producers & Directors Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "6060", "level": 4},
-			
-			{"code": "6063", "name_ar": "رواتب الصحفيين والكتاب", "name_en": "Journalists & Writers Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "6060", "level": 4},
-			
-			{"code": "6064", "name_ar": "رواتب الفنيين والمهندسين", "name_en": "Technicians & Engineers Salaries", 
-			 "type": "Expense", "is_group": False, "parent_code": "6060", "level": 4},
-			
-			{"code": "6065", "name_ar": "رواتب الإداريين والمشرفين", "name_en": "Administrators & Supervisors", 
-			 "type": "Expense", "is_group": False, "parent_code": "6060", "level": 4},
-			
-			{"code": "6070", "name_ar": "مصاريف التسويق والترويج", "name_en": "Marketing & Promotion Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "6050", "level": 3},
-			
-			{"code": "6071", "name_ar": "مصاريف الحملات الإعلانية", "name_en": "Advertising Campaigns Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6070", "level": 4},
-			
-			{"code": "6072", "name_ar": "مصاريف العلاقات العامة", "name_en": "Public Relations Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6070", "level": 4},
-			
-			{"code": "6073", "name_ar": "مصاريف البحوث والاستطلاعات", "name_en": "Research & Surveys Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6070", "level": 4},
-			
-			{"code": "6074", "name_ar": "مصاريف الفعاليات والحفلات", "name_en": "Events & Parties Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6070", "level": 4},
-			
-			{"code": "6080", "name_ar": "مصاريف التشغيل والصيانة", "name_en": "Operation & Maintenance Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "6050", "level": 3},
-			
-			{"code": "6081", "name_ar": "مصاريف صيانة المعدات", "name_en": "Equipment Maintenance Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6080", "level": 4},
-			
-			{"code": "6082", "name_ar": "مصاريف تراخيص البرامج", "name_en": "Software Licenses Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6080", "level": 4},
-			
-			{"code": "6083", "name_ar": "مصاريف استضافة وحوسبة", "name_en": "Hosting & Computing Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6080", "level": 4},
-			
-			{"code": "6084", "name_ar": "مصاريف المرافق والخدمات", "name_en": "Utilities & Services Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6080", "level": 4},
-			
-			{"code": "6090", "name_ar": "مصاريف البحث والتطوير", "name_en": "Research & Development Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "6050", "level": 3},
-			
-			{"code": "6091", "name_ar": "مصاريف تطوير المحتوى", "name_en": "Content Development Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6090", "level": 4},
-			
-			{"code": "6092", "name_ar": "مصاريف اختبار التقنيات", "name_en": "Technology Testing Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6090", "level": 4},
-			
-			{"code": "6093", "name_ar": "مصاريف الدراسات والأبحاث", "name_en": "Studies & Research Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6090", "level": 4},
-			
-			{"code": "6094", "name_ar": "مصاريف الابتكار والتجديد", "name_en": "Innovation & Renewal Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6090", "level": 4},
-			
-			{"code": "6100", "name_ar": "مصاريف الحقوق والملكية", "name_en": "Rights & Property Expenses", 
-			 "type": "Expense", "is_group": True, "parent_code": "6050", "level": 3},
-			
-			{"code": "6101", "name_ar": "مصاريف حقوق النشر", "name_en": "Copyright Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6100", "level": 4},
-			
-			{"code": "6102", "name_ar": "مصاريف تراخيص البث", "name_en": "Broadcasting Licenses Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6100", "level": 4},
-			
-			{"code": "6103", "name_ar": "مصاريف ملكية فكرية", "name_en": "Intellectual Property Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6100", "level": 4},
-			
-			{"code": "6104", "name_ar": "مصاريف التسجيل والحماية", "name_en": "Registration & Protection Expenses", 
-			 "type": "Expense", "is_group": False, "parent_code": "6100", "level": 4},
-			
-			{"code": "6110", "name_ar": "إهلاك الأصول الإعلامية", "name_en": "Media Assets Depreciation", 
-			 "type": "Expense", "is_group": True, "parent_code": "6050", "level": 3},
-			
-			{"code": "6111", "name_ar": "إهلاك معدات الإنتاج", "name_en": "Production Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6110", "level": 4},
-			
-			{"code": "6112", "name_ar": "إهلاك معدات البث", "name_en": "Broadcasting Equipment Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6110", "level": 4},
-			
-			{"code": "6113", "name_ar": "إهلاك البرامج والتطبيقات", "name_en": "Software & Applications Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6110", "level": 4},
-			
-			{"code": "6114", "name_ar": "إهلاك الاستوديوهات", "name_en": "Studios Depreciation", 
-			 "type": "Expense", "is_group": False, "parent_code": "6110", "level": 4},
-		]
-    @classmethod
-    def get_industry_extensions(cls, industry_code: str) -> List[Dict]:
-        """توليد الإضافات حسب التخصص"""
-        industry_groups = {
-        # التكنولوجيا والبرمجيات
-        'software_dev': cls.get_tech_software_extensions,
-        'it_services': cls.get_tech_software_extensions,
-        'cybersecurity': cls.get_tech_software_extensions,
-        'data_analytics': cls.get_tech_software_extensions,
-        'data_science': cls.get_tech_software_extensions,
-        'cloud_services': cls.get_tech_software_extensions,
-        'telecom': cls.get_tech_software_extensions,
-        'saas': cls.get_tech_software_extensions,
-        'paas': cls.get_tech_software_extensions,
-        'iaas': cls.get_tech_software_extensions,
-        'hardware': cls.get_tech_software_extensions,
-        'gaming': cls.get_tech_software_extensions,
-        'mobile_apps': cls.get_tech_software_extensions,
-        'web_development': cls.get_tech_software_extensions,
-        'ai_ml': cls.get_tech_software_extensions,
-        
-        # الإنشاءات والمقاولات
-        'construction': cls.get_construction_extensions,
-        'architecture': cls.get_construction_extensions,
-        'civil_engineering': cls.get_construction_extensions,
-        'interior_design': cls.get_construction_extensions,
-        'building_materials': cls.get_construction_extensions,
-        'mep': cls.get_construction_extensions,
-        'infrastructure': cls.get_construction_extensions,
-        'real_estate_dev': cls.get_construction_extensions,
-        'property_management': cls.get_construction_extensions,
-        'facility_management': cls.get_construction_extensions,
-        'urban_planning': cls.get_construction_extensions,
+    def publish_template(cls, template: CompiledTemplate, session: Optional[Session] = None,
+                         force: bool = False) -> str:
+        """
+        نشر قالب مُجمّع في جدول coa_template (مرة واحدة لكل بصمة في كل قاعدة بيانات) وإرجاع معرفه
         
-        # التصنيع والإنتاج
-        'automotive': cls.get_manufacturing_extensions,
-        'textile': cls.get_manufacturing_extensions,
-        'food_production': cls.get_manufacturing_extensions,
-        'chemicals': cls.get_manufacturing_extensions,
-        'pharmaceuticals': cls.get_manufacturing_extensions,
-        'machinery': cls.get_manufacturing_extensions,
-        'plastics': cls.get_manufacturing_extensions,
-        'electronics_mfg': cls.get_manufacturing_extensions,
-        'furniture_mfg': cls.get_manufacturing_extensions,
-        'metal_fabrication': cls.get_manufacturing_extensions,
-        'packaging_mfg': cls.get_manufacturing_extensions,
-        'aerospace': cls.get_manufacturing_extensions,
-        'shipbuilding': cls.get_manufacturing_extensions,
+        force: التحقق من جدول coa_template حتى لو سبق النشر على نفس المحرك
+        """
+        if session is None:
+            session = db.session
+        template_id = template.fingerprint
+        engine = session.get_bind()
+        engine = getattr(engine, 'engine', engine)
+        published_ids = cls._published_templates.setdefault(engine, set())
+        if template_id in published_ids and not force:
+            return template_id
+        
+        published = (
+            session.query(CoaTemplate.position)
+            .filter(CoaTemplate.template_id == template_id)
+            .first()
+        )
+        if published is None:
+            rows = []
+            for position, index in enumerate(template.order):
+                account = template.accounts[index]
+                parent = template.parent_index[index]
+                rows.append({
+                    'template_id': template_id,
+                    'position': position,
+                    'code': account.code,
+                    'name_ar': account.name_ar,
+                    'name_en': account.name_en,
+                    'type': account.type,
+                    'full_code': template.full_codes[index],
+                    'parent_full_code': template.full_codes[parent] if parent >= 0 else None,
+                    'level': template.levels[index],
+                    'is_group': account.is_group,
+                    'tag': account.tag,
+                })
+            try:
+                with session.begin_nested():
+                    session.execute(CoaTemplate.__table__.insert(), rows)
+            except IntegrityError:
+                # نشره طلب آخر في نفس الوقت
+                pass
+        
+        published_ids.add(template_id)
+        return template_id
+
+    @classmethod
+    def _copy_template_server_side(cls, session: Session, project_id: int,
+                                   template: CompiledTemplate, currency_id: int) -> Tuple[Dict[str, int], int]:
+        """
+        نسخ القالب إلى المشروع داخل قاعدة البيانات دون إنشاء كائنات ChartOfAccounts:
+        INSERT ... SELECT للحسابات غير الموجودة، ثم UPDATE واحد لربط parent_account_id
         
-        # الصحة والعناية الشخصية
-        'hospital': cls.get_healthcare_extensions,
-        'pharmacy': cls.get_healthcare_extensions,
-        'dental': cls.get_healthcare_extensions,
-        'medical_labs': cls.get_healthcare_extensions,
-        'fitness': cls.get_healthcare_extensions,
-        'beauty_salon': cls.get_healthcare_extensions,
-        'cosmetics': cls.get_healthcare_extensions,
-        'wellness': cls.get_healthcare_extensions,
-        'spa': cls.get_healthcare_extensions,
-        'nutrition': cls.get_healthcare_extensions,
-        'mental_health': cls.get_healthcare_extensions,
-        'elderly_care': cls.get_healthcare_extensions,
-        'veterinary': cls.get_healthcare_extensions,
-        'medical_devices': cls.get_healthcare_extensions,
+        Returns:
+            (الحسابات الافتراضية، عدد الحسابات المُنشأة)
+        """
+        template_id = cls.publish_template(template, session)
+        accounts = ChartOfAccounts.__table__
+        rows = CoaTemplate.__table__
+        _touch_projects(session, [project_id])
+        
+        # 1. نسخ صفوف القالب (عدا الموجودة مسبقاً بنفس full_code)
+        existing = accounts.alias('existing')
+        source = (
+            select(
+                literal(project_id), rows.c.name_ar, rows.c.name_ar, rows.c.name_en, rows.c.type,
+                rows.c.code, rows.c.full_code, rows.c.level, rows.c.is_group,
+                literal(currency_id), literal(True),
+            )
+            .where(rows.c.template_id == template_id)
+            .where(~exists().where(existing.c.project_id == project_id,
+                                   existing.c.full_code == rows.c.full_code))
+            .order_by(rows.c.position)
+        )
+        copy = accounts.insert().from_select(
+            ['project_id', 'name', 'name_ar', 'name_en', 'type', 'code', 'full_code',
+             'level', 'is_group', 'currency_id', 'is_active'],
+            source,
+        )
+        created = session.execute(copy).rowcount
+        if not created and not session.query(
+            exists().where(accounts.c.project_id == project_id)
+        ).scalar():
+            # مشروع فارغ ولم يُنسخ شيء: صفوف القالب غير موجودة فعلاً (تراجع عن النشر أو قاعدة أخرى)
+            cls.publish_template(template, session, force=True)
+            created = session.execute(copy).rowcount
+        
+        # 2. ربط كل حساب بأبيه عبر parent_full_code في القالب
+        parent = accounts.alias('parent')
+        parent_id = (
+            select(parent.c.id)
+            .where(parent.c.project_id == project_id,
+                   parent.c.full_code == rows.c.parent_full_code,
+                   rows.c.template_id == template_id,
+                   rows.c.full_code == accounts.c.full_code)
+            .scalar_subquery()
+        )
+        session.execute(
+            accounts.update()
+            .where(accounts.c.project_id == project_id,
+                   accounts.c.parent_account_id.is_(None),
+                   accounts.c.full_code.in_(
+                       select(rows.c.full_code)
+                       .where(rows.c.template_id == template_id, rows.c.parent_full_code.isnot(None))
+                   ))
+            .values(parent_account_id=parent_id)
+        )
         
-        # التجارة والتجزئة
-        'ecommerce': cls.get_retail_ecommerce_extensions,
-        'retail': cls.get_retail_ecommerce_extensions,
-        'fashion_retail': cls.get_retail_ecommerce_extensions,
-        'supermarket': cls.get_retail_ecommerce_extensions,
-        'electronics_retail': cls.get_retail_ecommerce_extensions,
-        'home_goods': cls.get_retail_ecommerce_extensions,
-        'jewelry': cls.get_retail_ecommerce_extensions,
-        'automotive_sales': cls.get_retail_ecommerce_extensions,
-        'wholesale': cls.get_retail_ecommerce_extensions,
-        'bookstore': cls.get_retail_ecommerce_extensions,
-        'sports_retail': cls.get_retail_ecommerce_extensions,
-        'toy_store': cls.get_retail_ecommerce_extensions,
-        'pet_supplies': cls.get_retail_ecommerce_extensions,
-        'luxury_retail': cls.get_retail_ecommerce_extensions,
+        # 3. الحسابات الافتراضية من صفوف القالب المعلّمة
+        tagged = session.execute(
+            select(rows.c.tag, accounts.c.id)
+            .where(rows.c.template_id == template_id,
+                   rows.c.tag.isnot(None),
+                   accounts.c.project_id == project_id,
+                   accounts.c.full_code == rows.c.full_code)
+        )
+        defaults = {tag: account_id for tag, account_id in tagged}
         
-        # الخدمات المالية والمصرفية
-        'banking': cls.get_finance_banking_extensions,
-        'investment': cls.get_finance_banking_extensions,
-        'insurance': cls.get_finance_banking_extensions,
-        'accounting': cls.get_finance_banking_extensions,
-        'fintech': cls.get_finance_banking_extensions,
-        'legal': cls.get_finance_banking_extensions,
-        'consulting': cls.get_finance_banking_extensions,
-        'auditing': cls.get_finance_banking_extensions,
-        'venture_capital': cls.get_finance_banking_extensions,
-        'private_equity': cls.get_finance_banking_extensions,
-        'stock_brokerage': cls.get_finance_banking_extensions,
-        'microfinance': cls.get_finance_banking_extensions,
-        'crowdfunding': cls.get_finance_banking_extensions,
+        # 4. فهرس الشجرة (المعرفات الجديدة غير معروفة هنا فيُعاد بناؤه للمشروع)
+        if created:
+            cls.rebuild_account_hierarchy(project_id, session)
+        return defaults, created
+
+    # ==================== الإدراج المتسامح مع التكرار (upsert) ====================
+    @staticmethod
+    def _create_account_index(connection, name: str, columns: List[str], **kwargs):
+        """إنشاء فهرس على جدول الحسابات إذا لم يكن موجوداً (دون إضافته لتعريف الجدول المشترك)"""
+        table = ChartOfAccounts.__table__.to_metadata(MetaData())
+        Index(name, *(table.c[column] for column in columns), **kwargs).create(connection, checkfirst=True)
+
+    # المحركات التي تم التأكد فيها من وجود الفهرس الفريد (project_id, full_code)
+    _upsert_index_engines = weakref.WeakSet()
+
+    @staticmethod
+    def find_duplicate_accounts(engine=None) -> List[Tuple[int, str, List[int]]]:
+        """
+        الحسابات المكررة بنفس (project_id, full_code) التي تمنع إنشاء الفهرس الفريد
         
-        # التعليم والتدريب
-        'education': cls.get_education_extensions,
-        'training': cls.get_education_extensions,
-        'e_learning': cls.get_education_extensions,
-        'language_school': cls.get_education_extensions,
-        'technical_training': cls.get_education_extensions,
-        'university': cls.get_education_extensions,
-        'research_institute': cls.get_education_extensions,
+        Returns:
+            List[Tuple[int, str, List[int]]]: (project_id, full_code, المعرفات من الأقدم)
+        """
+        if engine is None:
+            engine = db.engine
+        accounts = ChartOfAccounts.__table__
+        duplicated = (
+            select(accounts.c.project_id, accounts.c.full_code)
+            .group_by(accounts.c.project_id, accounts.c.full_code)
+            .having(func.count() > 1)
+            .subquery()
+        )
+        duplicates: Dict[Tuple[int, str], List[int]] = {}
+        with engine.connect() as connection:
+            for project_id, full_code, account_id in connection.execute(
+                select(accounts.c.project_id, accounts.c.full_code, accounts.c.id)
+                .join(duplicated, and_(accounts.c.project_id == duplicated.c.project_id,
+                                       accounts.c.full_code == duplicated.c.full_code))
+                .order_by(accounts.c.project_id, accounts.c.full_code, accounts.c.id)
+            ):
+                duplicates.setdefault((project_id, full_code), []).append(account_id)
+        return [(project_id, full_code, ids) for (project_id, full_code), ids in duplicates.items()]
+
+    @classmethod
+    def migrate_upsert_index(cls, engine=None):
+        """
+        ترحيل لمرة واحدة (من سكربت النشر وليس من مسار الطلبات) شرط لوضع upsert:
+        إنشاء الفهرس الفريد uq_coa_project_full_code (لـ ON CONFLICT ولمنع تكرار الحسابات عند التزامن)
         
-        # النقل والخدمات اللوجستية
-        'logistics': cls.get_logistics_extensions,
-        'transportation': cls.get_logistics_extensions,
-        'shipping': cls.get_logistics_extensions,
-        'freight': cls.get_logistics_extensions,
-        'warehousing': cls.get_logistics_extensions,
-        'courier': cls.get_logistics_extensions,
-        'aviation': cls.get_logistics_extensions,
+        لا تُحذف أي حسابات: إذا وُجدت حسابات مكررة يتوقف الترحيل ويعرضها (find_duplicate_accounts)
+        ليدمجها المسؤول بعد نقل القيود وكل ما يشير إليها، لأن الجداول التي تشير للحسابات
+        قد لا تعلن مفاتيح أجنبية (أو لا تُفرض كما في SQLite) فلا يمكن اكتشافها كلها هنا
         
-        # الضيافة والسياحة
-        'hospitality': cls.get_hospitality_extensions,
-        'tourism': cls.get_hospitality_extensions,
-        'hotel': cls.get_hospitality_extensions,
-        'restaurant': cls.get_hospitality_extensions,
-        'catering': cls.get_hospitality_extensions,
-        'event_planning': cls.get_hospitality_extensions,
-        'travel_agency': cls.get_hospitality_extensions,
+        Raises:
+            ValueError: عند وجود حسابات مكررة
+        """
+        if engine is None:
+            engine = db.engine
+        duplicates = cls.find_duplicate_accounts(engine)
+        if duplicates:
+            sample = '، '.join(f"{project_id}/{full_code}: {ids}" for project_id, full_code, ids in duplicates[:10])
+            logger.error("❌ %s حساب مكرر يمنع إنشاء الفهرس الفريد: %s", len(duplicates), sample)
+            raise ValueError(f"يوجد {len(duplicates)} حساب مكرر بنفس (project_id, full_code) "
+                             f"يجب دمجها قبل إنشاء الفهرس الفريد: {sample}")
+        with engine.begin() as connection:
+            cls._create_account_index(connection, 'uq_coa_project_full_code',
+                                      ['project_id', 'full_code'], unique=True)
+
+    @classmethod
+    def _require_upsert_index(cls, session: Session):
+        """التأكد (قراءة فقط، مرة واحدة لكل محرك) من وجود الفهرس الفريد (project_id, full_code)"""
+        engine = session.get_bind()
+        engine = getattr(engine, 'engine', engine)
+        if engine in cls._upsert_index_engines:
+            return
+        inspector = inspect(session.connection())
+        columns = ['project_id', 'full_code']
+        table = ChartOfAccounts.__tablename__
+        if not (
+            any(index['unique'] and index['column_names'] == columns for index in inspector.get_indexes(table))
+            or any(constraint['column_names'] == columns
+                   for constraint in inspector.get_unique_constraints(table))
+        ):
+            raise ValueError("وضع upsert يتطلب الفهرس الفريد (project_id, full_code): "
+                             "شغّل SmartCOAEngine.migrate_upsert_index() مرة واحدة")
+        cls._upsert_index_engines.add(engine)
+
+    @classmethod
+    def _upsert_accounts(cls, session: Session, project_id: int, plan: SeedPlan) -> Tuple[Dict[str, int], int]:
+        """
+        إدراج كل مستوى من خطة الإنشاء مع تجاهل الحسابات الموجودة بنفس full_code،
+        ثم قراءة معرفات الحسابات المتخطاة (إن وُجدت) باستعلام واحد لكل مستوى لربط الأبناء
         
-        # الطاقة والبيئة
-        'energy': cls.get_energy_extensions,
-        'renewable_energy': cls.get_energy_extensions,
-        'oil_gas': cls.get_energy_extensions,
-        'environmental': cls.get_energy_extensions,
-        'waste_management': cls.get_energy_extensions,
-        'water_treatment': cls.get_energy_extensions,
+        Returns:
+            (الحسابات الافتراضية، عدد الحسابات المُنشأة)
+        """
+        ids: List[Optional[int]] = [None] * len(plan)
+        created_indices = set()
+        for indices, parents, base_rows in plan.levels:
+            _raise_if_cancelled()
+            rows = [
+                dict(base, project_id=project_id, parent_account_id=ids[parent] if parent >= 0 else None)
+                for base, parent in zip(base_rows, parents)
+            ]
+            inserted = cls._insert_ignoring_conflicts(session, rows)
+            missing = [base['full_code'] for base in base_rows if base['full_code'] not in inserted]
+            resolved = dict(inserted)
+            if missing:
+                resolved.update(
+                    session.query(ChartOfAccounts.full_code, ChartOfAccounts.id)
+                    .filter(ChartOfAccounts.project_id == project_id,
+                            ChartOfAccounts.full_code.in_(missing))
+                    .all()
+                )
+            for index, base in zip(indices, base_rows):
+                ids[index] = resolved.get(base['full_code'])
+                if base['full_code'] in inserted:
+                    created_indices.add(index)
+        
+        default_accounts = {tag: ids[index] for tag, index in plan.default_tags.items() if ids[index]}
+        parent_index = plan.template.parent_index
+        cls._insert_closure_rows(session, [
+            (project_id, ids[index], ids[parent_index[index]] if parent_index[index] >= 0 else None)
+            for index in plan.template.order if index in created_indices
+        ])
+        return default_accounts, len(created_indices)
+
+    @classmethod
+    def _insert_ignoring_conflicts(cls, session: Session, rows: List[Dict]) -> Dict[str, int]:
+        """
+        إدراج الصفوف مع تجاهل التعارض على (project_id, full_code) وإرجاع full_code -> id للمُدرج فقط
         
-        # وسائل الإعلام والترفيه
-        'media': cls.get_media_extensions,
-        'entertainment': cls.get_media_extensions,
-        'publishing': cls.get_media_extensions,
-        'broadcasting': cls.get_media_extensions,
-        'film_production': cls.get_media_extensions,
-        'music': cls.get_media_extensions,
-        'gaming_entertainment': cls.get_media_extensions,
-        }
-    
-        extension_func = industry_groups.get(industry_code)
-        if extension_func:
+        PostgreSQL و SQLite: INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        باقي قواعد البيانات: قراءة الموجود ثم إدراج الباقي داخل SAVEPOINT، وإعادة المحاولة عند التعارض
+        """
+        if not rows:
+            return {}
+        table = ChartOfAccounts.__table__
+        insert = cls._dialect_insert(session)
+        
+        if insert is not None and cls._supports_insert_returning(session):
+            inserted: Dict[str, int] = {}
+            _touch_projects(session, {row['project_id'] for row in rows})
+            for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+                result = session.execute(
+                    insert(table).values(rows[start:start + cls.BULK_INSERT_CHUNK_SIZE])
+                    .on_conflict_do_nothing(index_elements=['project_id', 'full_code'])
+                    .returning(table.c.full_code, table.c.id)
+                )
+                inserted.update(result.all())
+            return inserted
+        
+        project_ids = {row['project_id'] for row in rows}
+        for attempt in range(3):
+            present = {
+                (project_id, full_code)
+                for project_id, full_code in session.query(ChartOfAccounts.project_id, ChartOfAccounts.full_code)
+                .filter(ChartOfAccounts.project_id.in_(project_ids),
+                        ChartOfAccounts.full_code.in_({row['full_code'] for row in rows}))
+            }
+            pending = [row for row in rows if (row['project_id'], row['full_code']) not in present]
             try:
-                return extension_func()
-            except Exception as e:
-                # تسجيل الخطأ وإرجاع قائمة فارغة في حالة وجود مشكلة
-                print(f"Error loading extensions for industry {industry_code}: {e}")
-                return []
-        else:
-            # إرجاع قائمة فارغة إذا لم يتم العثور على التخصص
-            return []
-    # ==================== دالة الإنشاء الرئيسية ====================
-    
-    @classmethod
-    def seed_chart_of_accounts(cls, project_id: int, industry: Optional[str] = None, 
-                           currency_id: int = 1, company_size: str = "medium") -> Dict[str, int]:
+                with session.begin_nested():
+                    created = cls._bulk_insert_rows(session, pending)
+            except IntegrityError:
+                # أدرج طلب آخر بعض الحسابات في نفس الوقت
+                continue
+            codes = {(row['project_id'], row['code']): row['full_code'] for row in pending}
+            return {codes[key]: account_id for key, account_id in created.items()}
+        raise ValueError("تعذر إدراج الحسابات بسبب تعارض متكرر مع طلب آخر")
+
+    # أقصى عدد صفوف في جملة INSERT واحدة (حدود المتغيرات المربوطة في SQLite/PostgreSQL)
+    BULK_INSERT_CHUNK_SIZE = 500
+
+    @staticmethod
+    def _dialect_insert(session: Session):
         """
-    إنشاء شجرة حسابات متكاملة ومتخصصة
+        insert الخاص بلهجة قاعدة البيانات لجمل ON CONFLICT (PostgreSQL و SQLite)، أو None لباقي القواعد
+        
+        تُستورد اللهجة المستخدمة فقط وعند أول حاجة (تكلفة الاستيراد عند بدء العملية)
         """
-    
-    # التحقق من صحة الإدخال
-        if not project_id or project_id <= 0:
-            raise ValueError("معرف المشروع غير صالح")
-    
-    # التحقق من العملة بأمان
-        try:
-            currency = Currency.query.get(currency_id)
-            if not currency:
-                print(f"⚠️ العملة ID {currency_id} غير موجودة، استخدام العملة الافتراضية (ID: 1)")
-                currency_id = 1
-        except Exception as e:
-            print(f"⚠️ خطأ في الاستعلام عن العملة: {e}، استخدام العملة الافتراضية")
-            currency_id = 1
-    
-    # 1. تجميع القائمة الكاملة
-        all_accounts = cls.STANDARD_FRAMEWORK.copy()
-    
-    # 2. إضافة حسابات التخصص
-        if industry and industry != '1':  # تأكد أن industry ليس '1' فقط
-            extensions = cls.get_industry_extensions(industry)
-            if extensions:
-                print(f"🔧 إضافة {len(extensions)} حساب متخصص لـ '{industry}'")
-                all_accounts.extend(extensions)
-            else:
-                print(f"ℹ️ لا توجد حسابات متخصصة لـ '{industry}'، استخدام الشجرة الأساسية")
+        dialect = session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
         else:
-            print(f"ℹ️ التخصص غير محدد ({industry})، استخدام الشجرة الأساسية")
-    
-    # 3. التحقق من عدم تكرار الأكواد
-        code_set = set()
-        for account in all_accounts:
-            code = account.get('code')
-            if not code:
-                raise ValueError(f"حساب بدون كود: {account.get('name_ar')}")
-            if code in code_set:
-                raise ValueError(f"تكرر كود الحساب: {code}")
-            code_set.add(code)
-    
-    # 4. إنشاء الخرائط المساعدة
-        code_to_id = {}
-        code_to_fullcode = {}
-        default_accounts = {}
-    
-    # 5. إنشاء الحسابات في قاعدة البيانات
-        try:
-        # ترتيب الحسابات حسب المستوى (من المستوى 1 إلى الأعلى)
-            all_accounts.sort(key=lambda x: x.get('level', 1))
+            return None
+        return insert
+
+    @staticmethod
+    def _supports_insert_returning(session: Session) -> bool:
+        """هل تدعم قاعدة البيانات INSERT ... RETURNING متعدد الصفوف؟"""
+        dialect = session.get_bind().dialect
+        # SQLAlchemy 2.x تستخدم insert_returning و 1.4 تستخدم full_returning
+        returning = getattr(dialect, 'insert_returning', getattr(dialect, 'full_returning', False))
+        return bool(returning and dialect.supports_multivalues_insert)
+
+    @classmethod
+    def _bulk_insert_rows(cls, session: Session, rows: List[Dict]) -> Dict[Tuple[int, str], int]:
+        """
+        إدراج الصفوف بجمل INSERT متعددة الصفوف وإرجاع خريطة (project_id, code) -> id
         
-            for account_data in all_accounts:
-                parent_id = None
-                parent_full_code = None
-            
-                parent_code = account_data.get('parent_code')
-                if parent_code:
-                    parent_id = code_to_id.get(parent_code)
-                    parent_full_code = code_to_fullcode.get(parent_code)
-                
-                    if not parent_id:
-                        print(f"⚠️ الحساب الأب {parent_code} غير موجود للحساب {account_data['code']}")
-                    # حاول العثور على الحساب الأب في قاعدة البيانات
-                        parent_acc = ChartOfAccounts.query.filter_by(
-                            project_id=project_id, 
-                            code=parent_code
-                        ).first()
-                        if parent_acc:
-                            parent_id = parent_acc.id
-                            parent_full_code = parent_acc.full_code
-                            code_to_id[parent_code] = parent_id
-                            code_to_fullcode[parent_code] = parent_full_code
-                        else:
-                        # إذا لم يوجد الحساب الأب، تخطى هذا الحساب
-                            print(f"⏭️ تخطي {account_data['code']} لأن الأب غير موجود")
-                            continue
-            
-            # بناء full_code
-                if parent_full_code:
-                    full_code = f"{parent_full_code}.{account_data['code']}"
-                else:
-                    full_code = account_data['code']
-            
-            # التحقق من أن الحساب غير موجود مسبقاً
-                existing = ChartOfAccounts.query.filter_by(
-                    project_id=project_id,
-                    full_code=full_code
-                ).first()
-            
-                if existing:
-                    print(f"⏭️ الحساب {full_code} موجود مسبقاً، تخطي")
-                    code_to_id[account_data['code']] = existing.id
-                    code_to_fullcode[account_data['code']] = full_code
-                    continue
-            
-            # إنشاء كائن الحساب
-                account = ChartOfAccounts(
-                    project_id=project_id,
-                    name=account_data['name_ar'],
-                    name_ar=account_data['name_ar'],
-                    name_en=account_data['name_en'],
-                    type=account_data['type'],
-                    code=account_data['code'],
-                    full_code=full_code,
-                    level=account_data.get('level', 1),
-                    parent_account_id=parent_id,
-                    is_group=account_data['is_group'],
-                    currency_id=currency_id,
-                    is_active=True,
-                    normal_balance=None,
-                    created_by=None
+        تُستخدم RETURNING عند دعمها، وإلا تُقرأ المعرفات الجديدة باستعلام واحد بعد الإدراج
+        """
+        if not rows:
+            return {}
+        
+        table = ChartOfAccounts.__table__
+        ids: Dict[Tuple[int, str], int] = {}
+        _touch_projects(session, {row['project_id'] for row in rows})
+        
+        if cls._supports_insert_returning(session):
+            for start in range(0, len(rows), cls.BULK_INSERT_CHUNK_SIZE):
+                chunk = rows[start:start + cls.BULK_INSERT_CHUNK_SIZE]
+                result = session.execute(
+                    table.insert().values(chunk)
+                    .returning(table.c.id, table.c.project_id, table.c.code)
                 )
-            
-                db.session.add(account)
-                db.session.flush()  # للحصول على ID فوراً
-            
-            # تحديث الخرائط
-                code_to_id[account_data['code']] = account.id
-                code_to_fullcode[account_data['code']] = full_code
-            
-            # التقاط الحسابات الافتراضية المهمة
-                tag = account_data.get('tag')
-                if tag:
-                    default_accounts[tag] = account.id
-        
-            db.session.commit()
-        
-            print(f"✅ تم إنشاء {len(code_set)} حساب بنجاح")
-            print(f"📊 الحسابات الافتراضية: {default_accounts}")
-        
-            return default_accounts
-        
-        except Exception as e:
-            db.session.rollback()
-            print(f"❌ خطأ في إنشاء شجرة الحسابات: {str(e)}")
-            import traceback
-            traceback.print_exc()  # طباعة تفاصيل الخطأ
-            raise
+                for account_id, project_id, code in result:
+                    ids[(project_id, code)] = account_id
+            return ids
+        
+        # بدون RETURNING: executemany ثم قراءة المعرفات باستعلام واحد
+        session.execute(table.insert(), rows)
+        wanted = {(row['project_id'], row['full_code']) for row in rows}
+        result = (
+            session.query(ChartOfAccounts.id, ChartOfAccounts.project_id,
+                             ChartOfAccounts.code, ChartOfAccounts.full_code)
+            .filter(ChartOfAccounts.project_id.in_({row['project_id'] for row in rows}),
+                    ChartOfAccounts.full_code.in_({row['full_code'] for row in rows}))
+            .all()
+        )
+        for account_id, project_id, code, full_code in result:
+            if (project_id, full_code) in wanted:
+                ids[(project_id, code)] = account_id
+        return ids
+# ==================== إبطال الأشجار المؤقتة عند تعديل الحسابات ====================
+
+def _touch_flushed_accounts(session: Session, flush_context):
+    """تسجيل مشاريع حسابات ORM المُضافة أو المعدلة أو المحذوفة (بما فيها المشروع السابق عند نقل حساب)"""
+    project_ids = set()
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, ChartOfAccounts):
+            history = inspect(instance).attrs.project_id.history
+            project_ids.update(history.sum() or [None])
+    if project_ids:
+        _touch_projects(session, project_ids)
+
+
+def _touch_bulk_account_changes(orm_execute_state):
+    """query.update()/delete() على الحسابات لا تحدد مشاريعها فتُبطل كل الأشجار"""
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is ChartOfAccounts for mapper in orm_execute_state.all_mappers
+    ):
+        _touch_projects(orm_execute_state.session, [None])
+
+
+def _invalidate_touched_trees(session: Session, transaction):
+    """عند انتهاء المعاملة الخارجية (حفظ أو تراجع) تُبطل أشجار المشاريع المعدلة فيها"""
+    if transaction.parent is None:
+        touched = session.info.pop(_TOUCHED_PROJECTS_KEY, None)
+        if touched:
+            SmartCOAEngine._invalidate_project_trees(touched)
+
+
+# ==================== تحديث جدول الإغلاق عند حفظ حسابات ORM ====================
+_CLOSURE_MANAGED_KEY = 'coa_closure_managed'
+_RESTRUCTURED_PROJECTS_KEY = 'coa_restructured_projects'
+
+
+def _record_restructured_accounts(session: Session, flush_context, instances):
+    """
+    قبل الحفظ: مشاريع الحسابات المحذوفة أو التي تغير أبوها أو مشروعها (تُعاد سلاسلها بعده)
+    مع أرصدتها المُجمّعة وآباء حساباتها قبل التعديل لإعادة توزيع الأرصدة على الشجرة الجديدة
+    """
+    project_ids = set()
+    for instance in itertools.chain(session.dirty, session.deleted):
+        if isinstance(instance, ChartOfAccounts):
+            attrs = inspect(instance).attrs
+            if instance in session.deleted or attrs.parent_account_id.history.has_changes() \
+                    or attrs.project_id.history.has_changes():
+                # بعد commit تكون الخصائص منتهية فلا يحمل السجل إلا القيمة الجديدة
+                project_ids.add(instance.project_id)
+                project_ids.update(attrs.project_id.history.deleted)
+    project_ids.discard(None)
+    session.info[_RESTRUCTURED_PROJECTS_KEY] = {
+        project_id: SmartCOAEngine._snapshot_balances(session, project_id) for project_id in project_ids
+    }
+
+
+def _index_flushed_accounts(session: Session, flush_context):
+    """بعد الحفظ: صفوف إغلاق الحسابات الجديدة من سلاسل آبائها، وإعادة بناء المشاريع المعاد هيكلتها"""
+    restructured = session.info.pop(_RESTRUCTURED_PROJECTS_KEY, None) or {}
+    if session.info.get(_CLOSURE_MANAGED_KEY):
+        return
+    accounts = [
+        (instance.project_id, instance.id, instance.parent_account_id)
+        for instance in session.new if isinstance(instance, ChartOfAccounts)
+    ]
+    if accounts or restructured:
+        SmartCOAEngine._index_flushed_accounts(session, accounts, restructured)
+
+
+event.listen(Session, 'after_flush', _touch_flushed_accounts)
+event.listen(Session, 'before_flush', _record_restructured_accounts)
+event.listen(Session, 'after_flush', _index_flushed_accounts)
+event.listen(Session, 'do_orm_execute', _touch_bulk_account_changes)
+event.listen(Session, 'after_transaction_end', _invalidate_touched_trees)
+
+
 # ==================== دالة مساعدة للاستخدام ====================
 
 def create_custom_coa(project_id: int, industry: str = None, 
-                     currency_id: int = 1, company_size: str = "medium") -> Dict[str, int]:
+                     currency_id: int = 1, company_size: str = "medium",
+                     bulk: bool = False, server_side: bool = False,
+                     upsert: bool = False) -> Dict[str, int]:
     """
     واجهة مبسطة لإنشاء شجرة حسابات
     
@@ -2871,7 +3177,10 @@ def create_custom_coa(project_id: int, industry: str = None,
         project_id: معرف المشروع
         industry: مجال العمل
         currency_id: العملة
-        company_size: حجم الشركة
+        company_size: حجم الشركة (small / medium / large)
+        bulk: استخدام الإدراج المجمّع لكل مستوى
+        server_side: نسخ القالب داخل قاعدة البيانات (INSERT ... SELECT)
+        upsert: إدراج متسامح مع التكرار (آمن عند إعادة الطلب أو التزامن)
         
     Returns:
         Dict[str, int]: الحسابات الافتراضية
@@ -2881,18 +3190,18 @@ def create_custom_coa(project_id: int, industry: str = None,
             project_id=project_id,
             industry=industry,
             currency_id=currency_id,
-            company_size=company_size
+            company_size=company_size,
+            bulk=bulk,
+            server_side=server_side,
+            upsert=upsert
         )
         
-        # هنا يمكنك تحديث المشروع بالحسابات الافتراضية
-        # update_project_with_defaults(project_id, defaults)
-        
+        # الحسابات الافتراضية مسجلة للمشروع أيضاً (SmartCOAEngine.get_default_accounts)
         return {
             'success': True,
             'message': 'تم إنشاء شجرة الحسابات بنجاح',
             'defaults': defaults,
-            'total_accounts_created': len(SmartCOAEngine.STANDARD_FRAMEWORK) + 
-                                     len(SmartCOAEngine.get_industry_extensions(industry or ''))
+            'total_accounts_created': len(SmartCOAEngine.get_compiled_template(industry, company_size))
         }
         
     except Exception as e:
@@ -2900,3 +3209,49 @@ def create_custom_coa(project_id: int, industry: str = None,
             'success': False,
             'message': f'خطأ في إنشاء شجرة الحسابات: {str(e)}'
         }
+
+
+async def create_custom_coa_async(project_id: int, industry: str = None,
+                                  currency_id: int = 1, company_size: str = "medium",
+                                  session=None, server_side: bool = False) -> Dict[str, int]:
+    """
+    واجهة مبسطة غير متزامنة لإنشاء شجرة حسابات (انظر seed_chart_of_accounts_async)
+    
+    Returns:
+        Dict[str, int]: نفس نتيجة create_custom_coa
+    """
+    try:
+        defaults = await SmartCOAEngine.seed_chart_of_accounts_async(
+            project_id=project_id,
+            industry=industry,
+            currency_id=currency_id,
+            company_size=company_size,
+            session=session,
+            server_side=server_side
+        )
+        return {
+            'success': True,
+            'message': 'تم إنشاء شجرة الحسابات بنجاح',
+            'defaults': defaults,
+            'total_accounts_created': len(SmartCOAEngine.get_compiled_template(industry, company_size))
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'message': f'خطأ في إنشاء شجرة الحسابات: {str(e)}'
+        }
+
+
+if __name__ == '__main__':
+    # التحقق من كل القوالب قبل النشر: python -m <package>.coa_seeder
+    # وبناء حزمة القوالب أيضاً: python -m <package>.coa_seeder --bundle coa_templates.bin
+    report = SmartCOAEngine.validate_templates()
+    for name, issues in report.items():
+        status = '✅' if not issues else f'❌ {len(issues)}'
+        print(f"{status} {name}")
+        for issue in issues:
+            print(f"    - {issue}")
+    if len(sys.argv) > 2 and sys.argv[1] == '--bundle':
+        size = SmartCOAEngine.build_template_bundle(sys.argv[2])
+        print(f"📦 {sys.argv[2]} ({size} bytes)")
+    sys.exit(1 if any(report.values()) else 0)
@@ -0,0 +1,17 @@
+from .database import db
+
+
+class CoaAccountBalance(db.Model):
+    """
+    رصيد مُجمّع لكل حساب في كل فترة: رصيد الحساب نفسه + كل الحسابات تحته
+    
+    يُحدَّث عند كل ترحيل بإضافة الفرق لسلسلة آباء الحساب (جدول الإغلاق)،
+    فقراءة إجمالي أي مجموعة (مثل الأصول المتداولة أو المصروفات) صف واحد
+    """
+    __tablename__ = 'coa_account_balance'
+
+    account_id = db.Column(db.Integer, db.ForeignKey('chart_of_accounts.id', ondelete='CASCADE'),
+                           primary_key=True)
+    period = db.Column(db.String(16), primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False, index=True)
+    balance = db.Column(db.Numeric(20, 4), nullable=False, default=0)
@@ -0,0 +1,18 @@
+from .database import db
+
+
+class CoaAccountClosure(db.Model):
+    """
+    جدول الإغلاق (closure table) لشجرة حسابات كل مشروع: صف لكل (سلف، حساب) بما فيها الحساب نفسه بعمق 0
+    
+    كل الحسابات تحت حساب معين هي استعلام واحد على ancestor_id، وكل آباء حساب هي استعلام واحد
+    على descendant_id، بدون استعلامات متكررة أو LIKE على full_code
+    """
+    __tablename__ = 'coa_account_closure'
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('chart_of_accounts.id', ondelete='CASCADE'),
+                            primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('chart_of_accounts.id', ondelete='CASCADE'),
+                              primary_key=True, index=True)
+    project_id = db.Column(db.Integer, nullable=False, index=True)
+    depth = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,16 @@
+from .database import db
+
+
+class CoaProjectDefaultAccount(db.Model):
+    """
+    الحساب الافتراضي لكل وسم في المشروع (المبيعات، تكلفة المبيعات، الخزينة، الضريبة، الأرصدة الافتتاحية...)
+    
+    يُسجَّل عند إنشاء الشجرة وعند تطبيق فرق القالب، فتقرأ خدمات الإعداد والترحيل
+    حساباتها الافتراضية دون البحث بالأكواد
+    """
+    __tablename__ = 'coa_project_default_account'
+
+    project_id = db.Column(db.Integer, primary_key=True)
+    tag = db.Column(db.String(50), primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('chart_of_accounts.id', ondelete='CASCADE'),
+                           nullable=False)
@@ -0,0 +1,20 @@
+from .database import db
+from datetime import datetime
+
+
+class CoaProjectTemplate(db.Model):
+    """
+    نسخة القالب المُطبّقة على كل مشروع (تُسجّل عند الإنشاء وعند تطبيق فرق القالب)
+    
+    تُستخدم لمعرفة المشاريع التي تعمل على نسخة أقدم من القالب وترقيتها
+    دون فحص شجرة حسابات كل مشروع
+    """
+    __tablename__ = 'coa_project_template'
+
+    project_id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.String(64), nullable=False, index=True)
+    industry = db.Column(db.String(100))
+    version = db.Column(db.String(32))
+    fingerprint = db.Column(db.String(64), nullable=False, index=True)
+    currency_id = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
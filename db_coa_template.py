@@ -0,0 +1,23 @@
+from .database import db
+
+
+class CoaTemplate(db.Model):
+    """
+    صفوف قوالب شجرة الحسابات المُجمّعة داخل قاعدة البيانات
+    
+    مفتاح القالب هو بصمة محتواه، فكل نسخة من القالب لها صفوفها الخاصة،
+    وتُستخدم لنسخ الشجرة إلى المشروع بالكامل داخل قاعدة البيانات (INSERT ... SELECT)
+    """
+    __tablename__ = 'coa_template'
+
+    template_id = db.Column(db.String(64), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(50), nullable=False)
+    name_ar = db.Column(db.String(255), nullable=False)
+    name_en = db.Column(db.String(255))
+    type = db.Column(db.String(50), nullable=False)
+    full_code = db.Column(db.String(255), nullable=False)
+    parent_full_code = db.Column(db.String(255))
+    level = db.Column(db.Integer, nullable=False)
+    is_group = db.Column(db.Boolean, nullable=False, default=False)
+    tag = db.Column(db.String(50))
@@ -0,0 +1,102 @@
+"""
+جدول الإغلاق لحسابات تُضاف أو تُنقل أو تُحذف عبر كائنات ORM بعد إنشاء الشجرة
+
+يستخدم بدائل SQLite من benchmarks/bench_coa_seeder.py
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+import bench_coa_seeder  # noqa: E402
+
+db, ChartOfAccounts, Currency, seeder = bench_coa_seeder.load_seeder()
+SmartCOAEngine = seeder.SmartCOAEngine
+
+
+@pytest.fixture
+def session(tmp_path):
+    bench_coa_seeder.fresh_database(db, Currency, 'memory', str(tmp_path))
+    SmartCOAEngine.seed_chart_of_accounts(1, None, 1, bulk=True)
+    yield db.session
+    db.session.remove()
+
+
+def account(session, code):
+    return session.query(ChartOfAccounts).filter_by(project_id=1, code=code).one()
+
+
+def add_sub_ledger(session, parent, code):
+    sub_ledger = ChartOfAccounts(
+        project_id=1, name=code, code=code, full_code=code, level=parent.level + 1,
+        parent_account_id=parent.id, is_group=False, currency_id=1, is_active=True, type=parent.type,
+    )
+    session.add(sub_ledger)
+    session.commit()
+    return sub_ledger
+
+
+def test_orm_account_under_existing_group(session):
+    clients = account(session, '1241')
+    sub_ledger = add_sub_ledger(session, clients, '12419')
+
+    assert sub_ledger.id in SmartCOAEngine.get_descendant_ids(clients.id)
+    assert SmartCOAEngine.get_ancestor_ids(sub_ledger.id) == (
+        [clients.id] + SmartCOAEngine.get_ancestor_ids(clients.id)
+    )
+
+
+def test_orm_account_with_new_parent_in_same_flush(session):
+    clients = account(session, '1241')
+    group = ChartOfAccounts(project_id=1, name='g', code='12418', full_code='12418', level=5,
+                            parent_account_id=clients.id, is_group=True, currency_id=1,
+                            is_active=True, type=clients.type)
+    session.add(group)
+    session.flush()
+    child = ChartOfAccounts(project_id=1, name='c', code='124181', full_code='124181', level=6,
+                            parent_account_id=group.id, is_group=False, currency_id=1,
+                            is_active=True, type=clients.type)
+    session.add(child)
+    session.commit()
+
+    assert SmartCOAEngine.get_ancestor_ids(child.id)[:2] == [group.id, clients.id]
+
+
+def test_orm_move_and_delete(session):
+    clients, suppliers = account(session, '1241'), account(session, '2111')
+    sub_ledger = add_sub_ledger(session, clients, '12419')
+
+    sub_ledger.parent_account_id = suppliers.id
+    session.commit()
+    assert sub_ledger.id not in SmartCOAEngine.get_descendant_ids(clients.id)
+    assert SmartCOAEngine.get_ancestor_ids(sub_ledger.id) == (
+        [suppliers.id] + SmartCOAEngine.get_ancestor_ids(suppliers.id)
+    )
+
+    sub_ledger_id = sub_ledger.id
+    session.delete(sub_ledger)
+    session.commit()
+    assert sub_ledger_id not in SmartCOAEngine.get_descendant_ids(suppliers.id)
+    assert SmartCOAEngine.get_ancestor_ids(sub_ledger_id) == []
+
+
+def test_posting_follows_orm_move_and_delete(session):
+    clients, suppliers = account(session, '1241'), account(session, '2111')
+    sub_ledger = add_sub_ledger(session, clients, '12419')
+    SmartCOAEngine.post_balance_deltas(1, '2026-10', {sub_ledger.id: 100})
+    session.commit()
+    assert SmartCOAEngine.get_account_balances([sub_ledger.id, clients.id, suppliers.id], '2026-10') == {
+        sub_ledger.id: 100, clients.id: 100, suppliers.id: 0,
+    }
+
+    sub_ledger.parent_account_id = suppliers.id
+    session.commit()
+    assert SmartCOAEngine.get_account_balances([sub_ledger.id, clients.id, suppliers.id], '2026-10') == {
+        sub_ledger.id: 100, clients.id: 0, suppliers.id: 100,
+    }
+
+    session.delete(sub_ledger)
+    session.commit()
+    assert SmartCOAEngine.get_account_balances([suppliers.id], '2026-10') == {suppliers.id: 0}